@@ -0,0 +1,44 @@
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from app.core.config import settings
+from app.core.profiler import get_profiler_switch, list_profiles
+from app.models.file import ProfilerRequest, ProfilerStatus
+
+
+router = APIRouter()
+
+def require_admin(x_admin_token: str | None = Header(None)) -> None:
+    """
+    Allow the request only with the configured admin token.
+    Admin endpoints do not exist while ADMIN_TOKEN is unset.
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def profiler_status() -> ProfilerStatus:
+    return ProfilerStatus(
+        remaining=get_profiler_switch().remaining,
+        profile_dir=settings.PROFILE_DIR,
+        profiles=list_profiles()
+    )
+
+@router.post("/admin/profiler", response_model=ProfilerStatus, dependencies=[Depends(require_admin)])
+async def arm_profiler(request: ProfilerRequest):
+    """
+    Run the sampling profiler over the next N API requests (0 disarms it).
+
+    A profiled upload also profiles the job worker while it processes the
+    resulting job. Profiles are saved to PROFILE_DIR in folded stack format.
+    """
+    get_profiler_switch().arm(request.requests)
+    return profiler_status()
+
+@router.get("/admin/profiler", response_model=ProfilerStatus, dependencies=[Depends(require_admin)])
+async def get_profiler_status():
+    """
+    Get the number of requests left to profile and the saved profiles.
+    """
+    return profiler_status()
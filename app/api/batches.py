@@ -0,0 +1,163 @@
+import io
+import os
+import zipfile
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.tracing import bind_jobs
+from app.db.repository import GenerationBatchRepository
+from app.db.session import get_db
+from app.models.file import BatchFileResult, BatchResponse
+from app.services.voice_registry import requested_voices
+from app.utils.file_processing import extract_grade_from_filename
+
+
+router = APIRouter()
+
+def read_markdown_entry(filename: str, content: bytes) -> dict:
+    """
+    Turn an uploaded Markdown file into a batch entry (or a rejected one).
+    """
+    if not filename.endswith('.md'):
+        return {"filename": filename, "error": "Only Markdown (.md) files are supported"}
+    if len(content) > settings.BATCH_MAX_FILE_BYTES:
+        return {"filename": filename, "error": "File is too large"}
+    try:
+        markdown_text = content.decode('utf-8')
+    except UnicodeDecodeError:
+        return {"filename": filename, "error": "File is not valid UTF-8"}
+
+    return {
+        "filename": filename,
+        "original_filename": os.path.splitext(filename)[0],
+        "grade_level": extract_grade_from_filename(filename),
+        "markdown_text": markdown_text
+    }
+
+def read_zip_entries(filename: str, content: bytes) -> list[dict]:
+    """
+    Extract the Markdown files of an uploaded zip archive as batch entries.
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(content))
+    except zipfile.BadZipFile:
+        return [{"filename": filename, "error": "Not a valid zip archive"}]
+
+    entries = []
+    with archive:
+        for info in archive.infolist():
+            name = os.path.basename(info.filename)
+            # Skip folders, macOS resource forks and anything that is not Markdown
+            if info.is_dir() or not name.endswith('.md') or info.filename.startswith('__MACOSX/'):
+                continue
+            if info.file_size > settings.BATCH_MAX_FILE_BYTES:
+                entries.append({"filename": name, "error": "File is too large"})
+                continue
+            entries.append(read_markdown_entry(name, archive.read(info)))
+    if not entries:
+        entries.append({"filename": filename, "error": "No Markdown (.md) files found in archive"})
+    return entries
+
+def build_batch_status(batch, items) -> BatchResponse:
+    """
+    Build the per-file view of a batch for the batch API.
+    """
+    files = []
+    for item, job in items:
+        if job is None:
+            files.append(BatchFileResult(filename=item.filename, status="failed", error=item.error))
+            continue
+        line_status = job.line_status or {}
+        files.append(BatchFileResult(
+            filename=item.filename,
+            job_id=job.id,
+            status=job.status,
+            stage=job.stage,
+            generated_file_id=job.generated_file_id,
+            total_lines=len(job.conversation or []),
+            completed_lines=sum(1 for value in line_status.values() if value.get("status") == "done"),
+            error=job.error if job.status == "failed" else None
+        ))
+
+    counts = {status: sum(1 for result in files if result.status == status)
+              for status in ("queued", "running", "completed", "failed")}
+    if counts["queued"] + counts["running"] > 0:
+        status = "running" if counts["running"] + counts["completed"] + counts["failed"] > 0 else "queued"
+    elif counts["failed"] == 0:
+        status = "completed"
+    elif counts["completed"] == 0:
+        status = "failed"
+    else:
+        status = "partially_completed"
+
+    return BatchResponse(
+        batch_id=batch.id,
+        status=status,
+        total_files=len(files),
+        files=files,
+        created_at=batch.created_at,
+        **counts
+    )
+
+
+@router.post("/batches", response_model=BatchResponse)
+async def create_batch(
+    files: list[UploadFile] = File(...),
+    fresh: bool = False,
+    voices: str | None = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Queue many Markdown files (or zip archives of them) for conversation generation.
+
+    Every file becomes its own generation job; the job workers overlap the LLM
+    stage of one file with the audio stage of another. Returns a batch id straight
+    away; poll /batches/{batch_id} for per-file results.
+    Pass fresh=true to skip cached LLM responses and force new generations.
+    Pass voices=Student1=<voice>,Student2=<voice> to choose the speakers' voices
+    for every file.
+    """
+    try:
+        voice_overrides = requested_voices(voices)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+
+    entries = []
+    for upload in files:
+        content = await upload.read()
+        if upload.filename.endswith('.zip'):
+            entries.extend(await run_in_threadpool(read_zip_entries, upload.filename, content))
+        else:
+            entries.append(read_markdown_entry(upload.filename, content))
+
+    if len(entries) > settings.BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch can contain at most {settings.BATCH_MAX_FILES} files"
+        )
+
+    batch = GenerationBatchRepository.create(db, entries, bypass_cache=fresh, voices=voice_overrides)
+    items = GenerationBatchRepository.get_items(db, batch.id)
+    bind_jobs([item.job_id for item, _ in items if item.job_id is not None])
+    return build_batch_status(batch, items)
+
+@router.get("/batches/{batch_id}", response_model=BatchResponse)
+async def get_batch_status(
+    batch_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Get the status and per-file results of a batch.
+    """
+    batch = GenerationBatchRepository.get_by_id(db, batch_id)
+    if not batch:
+        raise HTTPException(
+            status_code=404,
+            detail="Batch not found"
+        )
+    return build_batch_status(batch, GenerationBatchRepository.get_items(db, batch_id))
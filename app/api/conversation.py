@@ -1,36 +1,56 @@
 import os
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
 import json
 import re
 import time
+import base64
+from datetime import datetime
+from email.utils import parsedate_to_datetime
 
 from app.core.config import settings
-from app.db.session import get_db
-from app.db.repository import GeneratedFileRepository, GeneratedAudioRepository
-from app.models.file import GeneratedFileCreate, ProcessResponse, ConversationResponse
-from app.services.ollama_service import OllamaService
-from app.utils.file_processing import (
-    extract_grade_from_filename,
-    ensure_output_directory,
-    save_json_response
-)
-from app.utils.audio_generator import process_conversation
+from app.core.tracing import bind_jobs
+from app.db.session import get_db, session_scope
+from app.db.repository import GeneratedFileRepository, GeneratedAudioRepository, GenerationJobRepository
+from app.models.file import ProcessResponse, ConversationResponse, GeneratedFileSummary, GeneratedFileListResponse, VoiceListResponse
+from app.services.conversation_cache import get_conversation_cache
+from app.services.tts_worker_pool import get_tts_pool
+from app.services.voice_registry import list_voices, requested_voices, speaker_voices, voice_for
+from app.utils.audio_generator import clean_text_for_tts, extract_line, line_audio_path
+from app.utils.audio_formats import format_of, media_type_of, negotiate_format, transcode
+from app.utils.audio_stitcher import full_track_paths, stitch_generated_file
+from app.utils.audio_stream import wav_stream_header
+from app.utils.http_range import range_file_response
+from app.utils.file_processing import extract_grade_from_filename
 
 
 router = APIRouter()
-ollama_service = OllamaService()
 
 @router.post("/generate-conversation", response_model=ProcessResponse)
 async def generate_conversation(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    fresh: bool = False,
+    voices: str | None = None,
+    db: Session = Depends(get_db)
 ):
     """
-    Process a Markdown file and generate conversation.
+    Queue a Markdown file for conversation generation.
+    
+    Returns a job id straight away; poll /jobs/{job_id} for progress.
+    Pass fresh=true to skip cached LLM responses and force new generations.
+    Pass voices=Student1=<voice>,Student2=<voice> to choose the speakers' voices
+    (see /voices); unmapped speakers use TTS_SPEAKER_VOICES.
     """
+    try:
+        voice_overrides = requested_voices(voices)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    
     try:
         # Check if file is a Markdown file
         if not file.filename.endswith('.md'):
@@ -45,58 +65,24 @@ async def generate_conversation(
         
         # Extract grade level from filename
         grade_level = extract_grade_from_filename(file.filename)
-        
-        # Create output directory
         file_basename = os.path.splitext(file.filename)[0]
-        output_dir = os.path.join(settings.OUTPUT_DIR, file_basename)
-        ensure_output_directory(output_dir)
-
-        words = ollama_service.pick_words(markdown_text, grade_level)
-        result = ollama_service.generate_conversation_from_words(words, grade_level)
-        
-        combined_results = {
-            "words": words,
-            "conversations": result["conversation"]
-        }
         
-        # Path and filename for the generated JSON file
-        output_filename = f"{file_basename}_generated.json"
-        output_path = os.path.join(output_dir, output_filename)
-        
-        # Save file path to database
-        file_record = GeneratedFileRepository.create(
+        # Persist the job; the job workers pick it up from the database
+        job = GenerationJobRepository.create(
             db=db,
-            file=GeneratedFileCreate(
-                original_filename=file_basename,
-                generated_filepath=output_path,
-                grade_level=grade_level
-            )
+            original_filename=file_basename,
+            grade_level=grade_level,
+            markdown_text=markdown_text,
+            bypass_cache=fresh,
+            voices=voice_overrides
         )
-        
-        # Add conversation_id to each conversation and generate audio
-        conversation_id = 0
-        for conversation in result["conversation"]:
-            conversation_id += 1
-            conversation["conversation_id"] = conversation_id
-            # Generate audio in the background
-            print(f"Generating audio for conversation {conversation_id}")
-            background_tasks.add_task(
-                process_conversation,
-                db=db,
-                file_id=file_record.id,
-                conversation=conversation,
-                output_dir=output_dir,
-                file_basename=file_basename
-            )
-        
-        # Save combined results to JSON file
-        save_json_response(output_path, combined_results)
+        bind_jobs([job.id])
         
         return ProcessResponse(
             success=True,
-            message="File processed successfully",
-            generated_file_id=file_record.id,
-            grade_level=grade_level
+            message="File queued for processing",
+            grade_level=grade_level,
+            job_id=job.id
         )
         
     except Exception as e:
@@ -105,8 +91,110 @@ async def generate_conversation(
             message=f"Error processing file: {str(e)}"
         )
         
-@router.get("/conversation/history/{assignment_name}") 
+def encode_cursor(created_at: datetime, file_id: int) -> str:
+    """Opaque page cursor for the (created_at, id) of the last file of a page."""
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{file_id}".encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, file_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(file_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid cursor"
+        )
+
+@router.get("/voices", response_model=VoiceListResponse)
+def get_voices():
+    """
+    List the available voice presets and the default speaker to voice mapping.
+    """
+    return VoiceListResponse(
+        voices=list_voices(),
+        speakers=speaker_voices(),
+        default_voice=settings.TTS_DEFAULT_VOICE
+    )
+
+@router.get("/conversations", response_model=GeneratedFileListResponse)
+async def list_conversations(
+    grade: int | None = None,
+    prefix: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    """
+    List generated conversations, newest first.
+    
+    Filter by grade level and/or filename prefix. Pass the returned next_cursor
+    as cursor to get the next page; it is null on the last page.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    records = GeneratedFileRepository.list_page(db, limit + 1, after, grade, prefix)
+    has_more = len(records) > limit
+    records = records[:limit]
+    
+    # Audio and line counts of the whole page in one aggregated query each
+    file_ids = [record.id for record in records]
+    audio_counts = GeneratedAudioRepository.count_by_generated_file_ids(db, file_ids)
+    line_counts = GenerationJobRepository.line_counts_by_generated_file_ids(db, file_ids)
+    
+    items = []
+    for record in records:
+        total_lines = line_counts.get(record.id)
+        audio_count = audio_counts.get(record.id, 0)
+        items.append(GeneratedFileSummary(
+            id=record.id,
+            original_filename=record.original_filename,
+            grade_level=record.grade_level,
+            created_at=record.created_at,
+            total_lines=total_lines,
+            audio_count=audio_count,
+            audio_complete=total_lines is not None and audio_count >= total_lines
+        ))
+    
+    next_cursor = encode_cursor(records[-1].created_at, records[-1].id) if has_more else None
+    return GeneratedFileListResponse(items=items, next_cursor=next_cursor)
+
+async def conversation_response(request: Request, conversation_record) -> Response:
+    """
+    Send a conversation from the in-memory response cache, or 304 Not Modified
+    if the client's copy (If-None-Match / If-Modified-Since) is current.
+    """
+    try:
+        # The cache stats (and on a miss reads) the JSON file; keep that off the event loop
+        cached = await run_in_threadpool(get_conversation_cache().get, conversation_record)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail="Conversation not found"
+        )
+    
+    headers = {
+        "ETag": cached.etag,
+        "Last-Modified": cached.last_modified,
+        "Cache-Control": "no-cache"
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in tags or cached.etag in tags:
+            return Response(status_code=304, headers=headers)
+    elif if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            since = None
+        if since is not None and cached.modified_at <= since:
+            return Response(status_code=304, headers=headers)
+    
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+@router.get("/conversation/history/{assignment_name}", response_model=ConversationResponse)
 async def get_conversation_history(
+   request: Request,
    assignment_name: str,
    db: Session = Depends(get_db)
 ):
@@ -122,54 +210,109 @@ async def get_conversation_history(
             detail="Conversation not found"
         )
     
-    with open(conversation_record.generated_filepath, 'r') as f:
-        conversation_data = json.load(f)
-
-    # # Add generated file ID to response
-    # conversation_data["generated_file_id"] = conversation_record.id
-    
-    return ConversationResponse(
-        generated_file_id=conversation_record.id,
-        conversations=conversation_data["conversations"]
-    )   
+    return await conversation_response(request, conversation_record)
     
     
     
-@router.get("/conversation/{generated_file_id}")
+@router.get("/conversation/{generated_file_id}", response_model=ConversationResponse)
 async def get_conversation_by_generated_file_id(
+    request: Request,
     generated_file_id: int, 
     db: Session = Depends(get_db)):
     """
     Get a conversation by its ID.
     """
-    # file_basename = os.path.splitext(file_name)[0] # remove file extension
     conversation_record = GeneratedFileRepository.get_by_generated_file_id(db, generated_file_id)
     if not conversation_record:
         raise HTTPException(
             status_code=404,
             detail="Conversation not found"
         )
-    # Load conversation from generated file
-    with open(conversation_record.generated_filepath, 'r') as f:
-        conversation_data = json.load(f)
     
-    # Add generated file ID to response
-    conversation_data["generated_file_id"] = generated_file_id
+    return await conversation_response(request, conversation_record)
+
+async def serve_audio(request: Request, audio_path: str, requested_format: str | None):
+    """
+    Serve an audio file in the negotiated format with Range support.
+    """
+    stored_format = format_of(audio_path)
+    audio_format = negotiate_format(requested_format, request.headers.get("accept"), stored_format)
+    if audio_format is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported audio format: {requested_format}"
+        )
+    if audio_format != stored_format:
+        audio_path = await run_in_threadpool(transcode, audio_path, audio_format)
+    
+    return range_file_response(request, audio_path, media_type_of(audio_path))
+
+async def ensure_full_track(db: Session, generated_file_id: int) -> tuple[str, str]:
+    """
+    Get the paths of the stitched full-conversation track and its index,
+    stitching it now if every line already has audio.
+    """
+    conversation_record = GeneratedFileRepository.get_by_generated_file_id(db, generated_file_id)
+    if not conversation_record:
+        raise HTTPException(
+            status_code=404,
+            detail="Conversation not found"
+        )
+    
+    audio_path, index_path = full_track_paths(conversation_record)
+    if not (os.path.exists(audio_path) and os.path.exists(index_path)):
+        index = await run_in_threadpool(stitch_generated_file, db, conversation_record)
+        if index is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Full conversation audio is not ready yet"
+            )
+    return audio_path, index_path
+
+@router.get("/conversation/{generated_file_id}/audio/full",
+            response_class=FileResponse)
+async def get_full_conversation_audio(
+    request: Request,
+    generated_file_id: int,
+    format: str | None = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get the whole conversation as a single audio track.
     
-    return ConversationResponse(
-        generated_file_id=generated_file_id,
-        conversations=conversation_data["conversations"]
-    )   
+    Line offsets are available from /conversation/{generated_file_id}/audio/full/index.
+    Supports the same format negotiation and Range requests as line audio.
+    """
+    audio_path, _ = await ensure_full_track(db, generated_file_id)
+    return await serve_audio(request, audio_path, format)
+
+@router.get("/conversation/{generated_file_id}/audio/full/index")
+async def get_full_conversation_audio_index(
+    generated_file_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Get the start/end offsets (in seconds) of each line in the full conversation track.
+    """
+    _, index_path = await ensure_full_track(db, generated_file_id)
+    with open(index_path, 'r') as f:
+        return json.load(f)
 
 @router.get("/conversation/{generated_file_id}/audio/{conversation_id}",
             response_class=FileResponse)
 async def get_audio_file_by_conversation_id(
+    request: Request,
     generated_file_id: int,
     conversation_id: int,
+    format: str | None = None,
     db: Session = Depends(get_db)
 ):
     """
     Get audio for a conversation by its ID.
+    
+    The format (wav, flac, ogg, opus, mp3) is taken from ?format= or the Accept
+    header; other formats than the stored one are transcoded once and kept.
+    Range requests are supported for seeking.
     """
     audio_record = GeneratedAudioRepository.get_by_generated_audio_path_by_file_and_conversation_id(
         db, generated_file_id, conversation_id)
@@ -185,5 +328,86 @@ async def get_audio_file_by_conversation_id(
             status_code=404,
             detail=f"Audio file for conversation {conversation_id} not found"
         )
-    else:
-        return FileResponse(audio_path)
\ No newline at end of file
+    
+    return await serve_audio(request, audio_path, format)
+
+def record_line_audio(generated_file_id: int, conversation_id: int, audio_path: str) -> None:
+    """
+    Record a line's streamed audio file once the stream has sent it. The
+    request session is gone by then, so it uses a new one.
+    """
+    with session_scope() as session:
+        GeneratedAudioRepository.create(
+            db=session,
+            generated_file_id=generated_file_id,
+            generated_filepath=audio_path,
+            conversation_id=conversation_id
+        )
+
+@router.get("/conversation/{generated_file_id}/audio/{conversation_id}/stream")
+async def stream_audio_by_conversation_id(
+    request: Request,
+    generated_file_id: int,
+    conversation_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Stream audio for a conversation line while it is being synthesized.
+    
+    Serves the stored file if the line already has audio. Otherwise the line is
+    synthesized in ChatTTS stream mode and sent as a chunked WAV response; the
+    finished file is stored and recorded when the stream completes.
+    """
+    audio_record = GeneratedAudioRepository.get_by_generated_audio_path_by_file_and_conversation_id(
+        db, generated_file_id, conversation_id)
+    if audio_record and os.path.exists(audio_record.generated_filepath):
+        return range_file_response(request, audio_record.generated_filepath, media_type_of(audio_record.generated_filepath))
+    
+    if settings.API_TTS_WORKERS <= 0:
+        raise HTTPException(
+            status_code=503,
+            detail="Streaming synthesis is disabled"
+        )
+    
+    conversation_record = GeneratedFileRepository.get_by_generated_file_id(db, generated_file_id)
+    if not conversation_record:
+        raise HTTPException(
+            status_code=404,
+            detail="Conversation not found"
+        )
+    try:
+        cached = await run_in_threadpool(get_conversation_cache().get, conversation_record)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail="Conversation not found"
+        )
+    
+    conversation = next(
+        (line for line in cached.conversations if line.get("conversation_id") == conversation_id),
+        None
+    )
+    speaker, text = extract_line(conversation or {})
+    if not text:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Conversation {conversation_id} not found"
+        )
+    
+    audio_path = line_audio_path(
+        conversation,
+        os.path.dirname(conversation_record.generated_filepath),
+        conversation_record.original_filename
+    )
+    
+    async def audio_chunks():
+        yield wav_stream_header()
+        async for chunk in get_tts_pool(settings.API_TTS_WORKERS).stream(
+            text=clean_text_for_tts(text),
+            filePath=audio_path,
+            voice=conversation.get("voice") or voice_for(speaker)
+        ):
+            yield chunk
+        await run_in_threadpool(record_line_audio, generated_file_id, conversation_id, audio_path)
+    
+    return StreamingResponse(audio_chunks(), media_type="audio/wav")
@@ -0,0 +1,38 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+from app.services.tts_worker_pool import tts_pool_failed, tts_pool_ready
+from app.workers.job_worker import job_workers_ready
+
+
+router = APIRouter()
+
+@router.get("/healthz", include_in_schema=False)
+def healthz():
+    """
+    Liveness: the API process is up and serving requests.
+    """
+    return {"status": "ok"}
+
+@router.get("/readyz", include_in_schema=False)
+def readyz():
+    """
+    Readiness: the streaming TTS workers and every job worker have loaded and
+    warmed up their models. 503 until then, and for good if the TTS workers
+    could not load the model (tts_workers: failed).
+    """
+    ready_workers, total_workers = job_workers_ready()
+    if settings.API_TTS_WORKERS <= 0 or tts_pool_ready():
+        tts_workers = "ready"
+    else:
+        tts_workers = "failed" if tts_pool_failed() else "loading"
+    checks = {
+        "job_workers": f"{ready_workers}/{total_workers}",
+        "tts_workers": tts_workers
+    }
+    ready = ready_workers == total_workers and checks["tts_workers"] == "ready"
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "checks": checks}
+    )
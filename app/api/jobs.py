@@ -0,0 +1,259 @@
+import json
+import time
+import asyncio
+from datetime import datetime, timezone
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.db.models import GenerationJob, TraceSpan
+from app.db.repository import GenerationJobRepository, TraceSpanRepository
+from app.db.session import SessionLocal, async_sessions_enabled, get_async_sessionmaker
+from app.models.file import JobLineStatus, JobStatusResponse, JobTraceResponse, TraceSpanResponse
+from app.utils.audio_generator import extract_line
+
+
+router = APIRouter()
+
+def build_job_status(job: GenerationJob) -> JobStatusResponse:
+    """
+    Build the per-line progress view of a job for the status API.
+    """
+    line_status = job.line_status or {}
+    lines = []
+    for conversation in job.conversation or []:
+        conversation_id = conversation.get("conversation_id")
+        speaker, _ = extract_line(conversation)
+        status = line_status.get(str(conversation_id), {})
+        lines.append(JobLineStatus(
+            conversation_id=conversation_id,
+            speaker=speaker,
+            status=status.get("status", "pending"),
+            error=status.get("error")
+        ))
+
+    return JobStatusResponse(
+        job_id=job.id,
+        status=job.status,
+        stage=job.stage,
+        original_filename=job.original_filename,
+        grade_level=job.grade_level,
+        generated_file_id=job.generated_file_id,
+        words=job.words,
+        total_lines=len(lines),
+        completed_lines=sum(1 for line in lines if line.status == "done"),
+        failed_lines=sum(1 for line in lines if line.status == "failed"),
+        lines=lines,
+        error=job.error,
+        attempts=job.attempts,
+        created_at=job.created_at,
+        updated_at=job.updated_at
+    )
+
+
+def load_job(job_id: int) -> GenerationJob | None:
+    with SessionLocal() as db:
+        return GenerationJobRepository.get_by_id(db, job_id)
+
+async def fetch_job(job_id: int) -> GenerationJob | None:
+    """
+    Load a job without blocking the event loop: with an async session when
+    DB_ASYNC_ENABLED, otherwise in the thread pool. Status endpoints are polled
+    often, so they should not tie up the loop on database I/O.
+    """
+    if async_sessions_enabled():
+        async with get_async_sessionmaker()() as db:
+            return await GenerationJobRepository.aget_by_id(db, job_id)
+    return await run_in_threadpool(load_job, job_id)
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(
+    job_id: int
+):
+    """
+    Get the stage, per-line audio progress and errors of a generation job.
+    """
+    job = await fetch_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail="Job not found"
+        )
+    return build_job_status(job)
+
+
+def build_job_trace(job_id: int, spans: list[TraceSpan]) -> JobTraceResponse:
+    """
+    Build the timeline of a job from its spans: offsets from the first span and
+    the total time spent per span name.
+    """
+    if not spans:
+        return JobTraceResponse(job_id=job_id)
+
+    origin = min(span.started_at for span in spans)
+    end = max(span.started_at + span.duration_ms / 1000 for span in spans)
+    stages = {}
+    for span in spans:
+        stages[span.name] = round(stages.get(span.name, 0) + span.duration_ms, 3)
+
+    return JobTraceResponse(
+        job_id=job_id,
+        trace_ids=list(dict.fromkeys(span.trace_id for span in spans)),
+        started_at=datetime.fromtimestamp(origin, timezone.utc),
+        total_ms=round((end - origin) * 1000, 3),
+        stages=stages,
+        spans=[
+            TraceSpanResponse(
+                name=span.name,
+                process=span.process,
+                trace_id=span.trace_id,
+                start_ms=round((span.started_at - origin) * 1000, 3),
+                duration_ms=span.duration_ms,
+                attributes=span.attributes or {}
+            )
+            for span in spans
+        ]
+    )
+
+def load_job_spans(job_id: int) -> list[TraceSpan]:
+    with SessionLocal() as db:
+        return TraceSpanRepository.get_by_job_id(db, job_id)
+
+@router.get("/jobs/{job_id}/trace", response_model=JobTraceResponse)
+async def get_job_trace(
+    job_id: int
+):
+    """
+    Get the trace timeline of a generation job: every timed span (API request,
+    LLM calls, TTS refine/infer, audio writes, database statements) across the
+    API, job worker and TTS worker processes.
+    """
+    job = await fetch_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail="Job not found"
+        )
+    return build_job_trace(job_id, await run_in_threadpool(load_job_spans, job_id))
+
+
+def sse_event(event: str, data: dict) -> str:
+    """
+    Format a Server-Sent Event.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def job_events(request: Request, job_id: int):
+    """
+    Follow a job and yield an event for every change: status/stage, the picked
+    words, each conversation line as soon as the LLM has produced it, and each
+    line's audio as soon as it is synthesized. If a retried generation replaces
+    lines that were already sent, a "reset" event tells the client to drop
+    every line and audio received so far; the current lines follow. Ends with
+    a "done" or "failed" event, or "gone" if the job is deleted meanwhile.
+    """
+    status = None
+    words_sent = False
+    # (speaker, text) of the lines sent so far
+    sent_lines = []
+    audio_sent = set()
+    last_sent = time.monotonic()
+
+    while not await request.is_disconnected():
+        job = await fetch_job(job_id)
+        if job is None:
+            # Deleted or expired while the stream was open
+            yield sse_event("gone", {"job_id": job_id})
+            return
+        events = []
+
+        if (job.status, job.stage) != status:
+            status = (job.status, job.stage)
+            events.append(sse_event("status", {"status": job.status, "stage": job.stage}))
+
+        if job.words and not words_sent:
+            words_sent = True
+            events.append(sse_event("words", {"words": job.words}))
+
+        # The conversation grows line by line while it is being generated; a
+        # retry starts it over and may produce different lines
+        conversation = job.conversation or []
+        lines = [extract_line(line) for line in conversation]
+        common = min(len(lines), len(sent_lines))
+        # A regenerated conversation that is still shorter is only a mismatch once it differs
+        if lines[:common] != sent_lines[:common] or (
+            len(lines) < len(sent_lines) and job.stage != "generate_conversation"
+        ):
+            events.append(sse_event("reset", {"job_id": job.id, "attempt": job.attempts}))
+            sent_lines = []
+            audio_sent = set()
+        for line, (speaker, text) in zip(conversation[len(sent_lines):], lines[len(sent_lines):]):
+            events.append(sse_event("line", {
+                "conversation_id": line.get("conversation_id"),
+                "speaker": speaker,
+                "text": text
+            }))
+        if len(lines) > len(sent_lines):
+            sent_lines = lines
+
+        # Each line's audio is recorded as soon as it is synthesized (TTS stage)
+        for key, value in (job.line_status or {}).items():
+            if job.generated_file_id is None or key in audio_sent or value.get("status") not in ("done", "failed"):
+                continue
+            audio_sent.add(key)
+            if value["status"] == "done":
+                events.append(sse_event("audio", {
+                    "conversation_id": int(key),
+                    "url": f"{settings.API_V1_STR}/conversation/{job.generated_file_id}/audio/{key}"
+                }))
+            else:
+                events.append(sse_event("audio_failed", {"conversation_id": int(key), "error": value.get("error")}))
+
+        if job.status in ("completed", "failed"):
+            events.append(sse_event("done" if job.status == "completed" else "failed", {
+                "job_id": job.id,
+                "generated_file_id": job.generated_file_id,
+                "error": job.error
+            }))
+            yield "".join(events)
+            return
+
+        if events:
+            last_sent = time.monotonic()
+            yield "".join(events)
+        elif time.monotonic() - last_sent > 15:
+            # Comment line keeps proxies from closing an idle stream
+            last_sent = time.monotonic()
+            yield ": keep-alive\n\n"
+
+        await asyncio.sleep(settings.JOB_EVENTS_POLL_INTERVAL)
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(
+    request: Request,
+    job_id: int
+):
+    """
+    Server-Sent Events stream of a job's progress.
+
+    Each conversation line is sent ("line" event) as soon as the LLM has produced
+    it; audio synthesis starts per line while the rest of the conversation is
+    still being generated, and each line's audio URL ("audio" event) follows as
+    soon as that line is synthesized. A "reset" event means a retry replaced
+    the lines sent so far: discard them, the new lines follow. A "gone" event
+    ends the stream if the job is deleted while it is followed.
+    """
+    job = await fetch_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail="Job not found"
+        )
+    return StreamingResponse(
+        job_events(request, job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
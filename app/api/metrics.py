@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.core.metrics import render_metrics
+
+
+router = APIRouter()
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Prometheus metrics of the API, job worker and TTS worker processes.
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -12,12 +12,136 @@ class Settings(BaseSettings):
     
     # Database settings
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./esl_ai.db")
+    DB_SQLITE_WAL: bool = os.getenv("DB_SQLITE_WAL", "true").lower() == "true"
+    DB_BUSY_TIMEOUT_MS: int = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+    # Async sessions for the API's status endpoints (needs aiosqlite or asyncpg)
+    DB_ASYNC_ENABLED: bool = os.getenv("DB_ASYNC_ENABLED", "false").lower() == "true"
     
     # Ollama settings
     OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "llama2")
     OLLAMA_URL: str = os.getenv("OLLAMA_URL", "http://localhost:11434")
+    # Several Ollama hosts (comma-separated) to spread LLM requests over; each
+    # request goes to the least-loaded healthy one. Defaults to OLLAMA_URL alone
+    OLLAMA_URLS: str = os.getenv("OLLAMA_URLS", "")
+    # A host failing this many requests in a row is ejected and probed every
+    # OLLAMA_HEALTH_INTERVAL seconds until it answers again
+    OLLAMA_EJECT_AFTER: int = int(os.getenv("OLLAMA_EJECT_AFTER", "3"))
+    OLLAMA_HEALTH_INTERVAL: float = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "10"))
+    OLLAMA_TIMEOUT: float = float(os.getenv("OLLAMA_TIMEOUT", "120"))
+    OLLAMA_CONNECT_TIMEOUT: float = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+    OLLAMA_MAX_CONNECTIONS: int = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "10"))
+    OLLAMA_KEEPALIVE_EXPIRY: float = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", "30"))
+    # Constrain conversation output: "json" (JSON mode), "schema" (JSON schema,
+    # Ollama 0.5+) or "off" (free text)
+    OLLAMA_STRUCTURED_OUTPUT: str = os.getenv("OLLAMA_STRUCTURED_OUTPUT", "json").lower()
+    
+    # Conversation validation: a conversation needs CONVERSATION_MIN_LINES valid
+    # lines; missing lines or vocabulary words are requested again at most
+    # CONVERSATION_MAX_RETRIES times
+    CONVERSATION_MIN_LINES: int = int(os.getenv("CONVERSATION_MIN_LINES", "4"))
+    CONVERSATION_MAX_RETRIES: int = int(os.getenv("CONVERSATION_MAX_RETRIES", "2"))
+    
+    # Map-reduce word picking over chunks of long lessons (WORD_PICK_MODE "llm"
+    # and "hybrid"; in "hybrid" the local ranker picks each chunk's candidates)
+    WORD_PICK_CHUNK_SIZE: int = int(os.getenv("WORD_PICK_CHUNK_SIZE", "2000"))
+    WORD_PICK_CHUNK_OVERLAP: int = int(os.getenv("WORD_PICK_CHUNK_OVERLAP", "100"))
+    WORD_PICK_CANDIDATES_PER_CHUNK: int = int(os.getenv("WORD_PICK_CANDIDATES_PER_CHUNK", "15"))
+    WORD_PICK_MAP_CONCURRENCY: int = int(os.getenv("WORD_PICK_MAP_CONCURRENCY", "4"))
+    # "llm": model reads the lesson, "hybrid": model picks from the local ranker's
+    # shortlist, "fast": local ranker only, no LLM call
+    WORD_PICK_MODE: str = os.getenv("WORD_PICK_MODE", "hybrid").lower()
+    WORD_PICK_SHORTLIST: int = int(os.getenv("WORD_PICK_SHORTLIST", "40"))
+    
+    # LLM response cache settings
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", "./llm_cache.db")
+    LLM_CACHE_MEMORY_ENTRIES: int = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+    LLM_CACHE_TTL: float = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+    
+    # Conversation responses kept in memory per API process
+    CONVERSATION_CACHE_ENTRIES: int = int(os.getenv("CONVERSATION_CACHE_ENTRIES", "256"))
     
     # Output directory
     OUTPUT_DIR: str = "output"
+    
+    # Generation job queue settings
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "1"))
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+    JOB_HEARTBEAT_INTERVAL: float = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "10"))
+    JOB_STALE_AFTER: float = float(os.getenv("JOB_STALE_AFTER", "60"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    # Jobs a worker runs at once in each stage; the LLM stage of one job
+    # overlaps the TTS stage of another
+    JOB_LLM_CONCURRENCY: int = int(os.getenv("JOB_LLM_CONCURRENCY", "1"))
+    JOB_TTS_CONCURRENCY: int = int(os.getenv("JOB_TTS_CONCURRENCY", "2"))
+    # How often the job event stream checks a job for new lines and audio
+    JOB_EVENTS_POLL_INTERVAL: float = float(os.getenv("JOB_EVENTS_POLL_INTERVAL", "0.25"))
+    
+    # Batch upload limits
+    BATCH_MAX_FILES: int = int(os.getenv("BATCH_MAX_FILES", "200"))
+    BATCH_MAX_FILE_BYTES: int = int(os.getenv("BATCH_MAX_FILE_BYTES", str(5 * 1024 * 1024)))
+    
+    # TTS worker pool settings
+    TTS_WORKERS: int = int(os.getenv("TTS_WORKERS", "1"))
+    # Warm TTS workers kept by the API process for streaming synthesis (0 disables streaming)
+    API_TTS_WORKERS: int = int(os.getenv("API_TTS_WORKERS", "1"))
+    TTS_JOB_MAX_ATTEMPTS: int = int(os.getenv("TTS_JOB_MAX_ATTEMPTS", "2"))
+    TTS_SHUTDOWN_TIMEOUT: float = float(os.getenv("TTS_SHUTDOWN_TIMEOUT", "10"))
+    # Restarts of a TTS worker that keeps exiting before it becomes ready (the
+    # pool fails after that), and the first delay between them (doubled each time)
+    TTS_WORKER_MAX_RESTARTS: int = int(os.getenv("TTS_WORKER_MAX_RESTARTS", "5"))
+    TTS_WORKER_RESTART_BACKOFF: float = float(os.getenv("TTS_WORKER_RESTART_BACKOFF", "1"))
+    # Run one short synthesis and one tiny LLM call when workers start, before
+    # they report ready (/readyz), so the first job does not pay for it
+    WARMUP_ENABLED: bool = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    # Voices (preset names from chattts/voice-presets) per conversation speaker,
+    # and the voice of speakers without a mapping
+    TTS_SPEAKER_VOICES: str = os.getenv("TTS_SPEAKER_VOICES", "Student1=seed_1345_male,Student2=seed_742_female")
+    TTS_DEFAULT_VOICE: str = os.getenv("TTS_DEFAULT_VOICE", "seed_1345_male")
+    # TTS engine: chattts, or stub (tone output without the model, for benchmarks)
+    TTS_BACKEND: str = os.getenv("TTS_BACKEND", "chattts").lower()
+    # Stub engine speed: synthesis seconds per second of audio, and refine time per text
+    TTS_STUB_RTF: float = float(os.getenv("TTS_STUB_RTF", "0.3"))
+    TTS_STUB_REFINE_MS: float = float(os.getenv("TTS_STUB_REFINE_MS", "20"))
+    # CPU inference acceleration profile of the TTS workers: default, tuned
+    # (thread counts and inference mode), int8 (plus dynamic int8 quantization),
+    # compiled (plus torch.compile) or int8-compiled
+    TTS_ACCELERATION: str = os.getenv("TTS_ACCELERATION", "default").lower()
+    # Torch threads per TTS worker for tuned profiles (0: CPU count divided by the number of TTS workers)
+    TTS_INTRA_OP_THREADS: int = int(os.getenv("TTS_INTRA_OP_THREADS", "0"))
+    TTS_INTER_OP_THREADS: int = int(os.getenv("TTS_INTER_OP_THREADS", "1"))
+    # ChatTTS modules whose linear layers the int8 profiles quantize
+    TTS_QUANTIZE_MODULES: str = os.getenv("TTS_QUANTIZE_MODULES", "gpt.gpt,decoder")
+    
+    # TTS micro-batching settings
+    TTS_BATCH_SIZE: int = int(os.getenv("TTS_BATCH_SIZE", "8"))
+    TTS_BATCH_MAX_WAIT_MS: int = int(os.getenv("TTS_BATCH_MAX_WAIT_MS", "50"))
+    
+    # Codec for stored line audio: wav, flac, ogg, opus or mp3
+    AUDIO_STORAGE_FORMAT: str = os.getenv("AUDIO_STORAGE_FORMAT", "wav")
+    
+    # Silence inserted between lines of the stitched full-conversation track
+    STITCH_SILENCE_MS: int = int(os.getenv("STITCH_SILENCE_MS", "400"))
+    
+    # Synthesized audio cache settings
+    TTS_CACHE_ENABLED: bool = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+    TTS_CACHE_DIR: str = os.getenv("TTS_CACHE_DIR", "output/.tts_cache")
+    TTS_CACHE_MAX_BYTES: int = int(os.getenv("TTS_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+    
+    # Prometheus metrics: samples of the API and worker processes are shared through this directory
+    METRICS_DIR: str = os.getenv("METRICS_DIR", "output/.metrics")
+    
+    # Logging: level of the application loggers and output format (json or text)
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+    
+    # Per-job trace timelines (GET /jobs/{job_id}/trace)
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    
+    # Admin endpoints (profiler switch) require this token in X-Admin-Token; empty disables them
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "output/.profiles")
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
 
 settings = Settings() 
\ No newline at end of file
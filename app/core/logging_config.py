@@ -0,0 +1,56 @@
+import json
+import logging
+import sys
+
+from app.core.config import settings
+from app.core.tracing import current_trace
+
+# Loggers of the application are children of this one ("app.services.ollama_service", ...)
+ROOT_LOGGER = "app"
+
+
+class TraceFilter(logging.Filter):
+    """Add the trace id of the current request or job to every record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        trace = current_trace()
+        record.trace_id = trace.trace_id if trace is not None else None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log collectors."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.processName,
+            "message": record.getMessage()
+        }
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def configure_logging() -> None:
+    """
+    Set up the application loggers from LOG_LEVEL and LOG_FORMAT (json or text).
+    Call once per process; safe to call again.
+    """
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(settings.LOG_LEVEL.upper())
+    logger.propagate = False
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    handler = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(trace_id)s] %(message)s"))
+    handler.addFilter(TraceFilter())
+    logger.addHandler(handler)
@@ -0,0 +1,170 @@
+import os
+import time
+from contextlib import contextmanager
+from sqlalchemy import event
+
+from app.core.tracing import current_trace, span
+
+# In the API and its workers every process writes its samples to files in
+# METRICS_DIR and /metrics aggregates them (see app.core.metrics_dir, set up
+# at API startup). Anywhere else (scripts, tools) metrics stay in memory.
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from prometheus_client import CONTENT_TYPE_LATEST
+
+module_name = "metrics"
+
+_STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+_RTF_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10)
+
+# Stages: pick_words, generate_conversation, tts, stitch (job stages),
+# llm_request, tts_refine, tts_infer, audio_write, db_write
+STAGE_SECONDS = Histogram(
+    "esl_stage_duration_seconds",
+    "Time spent in each processing stage",
+    ["stage"],
+    buckets=_STAGE_BUCKETS
+)
+FAILURES = Counter(
+    "esl_failures_total",
+    "Failed operations by stage",
+    ["stage"]
+)
+CACHE_REQUESTS = Counter(
+    "esl_cache_requests_total",
+    "Cache lookups by cache and result (hit/miss)",
+    ["cache", "result"]
+)
+JOBS_IN_FLIGHT = Gauge(
+    "esl_jobs_in_flight",
+    "Generation jobs currently being processed",
+    multiprocess_mode="livesum"
+)
+TTS_BACKLOG = Gauge(
+    "esl_tts_backlog",
+    "Lines waiting in the TTS batching scheduler",
+    multiprocess_mode="livesum"
+)
+TTS_BATCH_SIZE = Histogram(
+    "esl_tts_batch_size",
+    "Lines per dispatched TTS batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+TTS_REAL_TIME_FACTOR = Histogram(
+    "esl_tts_real_time_factor",
+    "Synthesis time divided by the duration of the produced audio (lower is faster), by acceleration profile",
+    ["profile"],
+    buckets=_RTF_BUCKETS
+)
+TTS_AUDIO_SECONDS = Counter(
+    "esl_tts_audio_seconds_total",
+    "Seconds of audio synthesized, by acceleration profile",
+    ["profile"]
+)
+TTS_WORKER_MEMORY = Gauge(
+    "esl_tts_worker_peak_rss_bytes",
+    "Peak resident memory of each live TTS worker process, by acceleration profile",
+    ["profile"],
+    multiprocess_mode="liveall"
+)
+LLM_HOST_REQUESTS = Counter(
+    "esl_llm_host_requests_total",
+    "LLM requests by Ollama host and result (ok/error)",
+    ["host", "result"]
+)
+LLM_HOST_IN_FLIGHT = Gauge(
+    "esl_llm_host_in_flight",
+    "LLM requests in flight by Ollama host",
+    ["host"],
+    multiprocess_mode="livesum"
+)
+LLM_HOST_EJECTIONS = Counter(
+    "esl_llm_host_ejections_total",
+    "Times an Ollama host was taken out of rotation after failing",
+    ["host"]
+)
+
+def _multiprocess_dir() -> str | None:
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+
+def mark_process_dead(pid: int) -> None:
+    """
+    Drop the live gauges of a stopped worker process.
+    """
+    if _multiprocess_dir() is not None:
+        multiprocess.mark_process_dead(pid)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Aggregate the samples of all processes in the Prometheus text format
+    (only this process's without a metrics directory).
+    Returns (body, content type).
+    """
+    if _multiprocess_dir() is None:
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+@contextmanager
+def observe(stage: str):
+    """
+    Time a block as the given stage and count it as failed if it raises.
+    The block is also recorded as a span of the current trace.
+    """
+    start = time.perf_counter()
+    try:
+        with span(stage):
+            yield
+    except Exception:
+        FAILURES.labels(stage).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count a cache lookup."""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_synthesis(seconds: float, audio_seconds: float, profile: str = "default") -> None:
+    """
+    Record the real-time factor of a synthesis call under an acceleration profile.
+    """
+    if audio_seconds <= 0:
+        return
+    TTS_AUDIO_SECONDS.labels(profile).inc(audio_seconds)
+    TTS_REAL_TIME_FACTOR.labels(profile).observe(seconds / audio_seconds)
+
+
+def record_worker_memory(profile: str, peak_rss_bytes: int) -> None:
+    """
+    Record the peak resident memory of this TTS worker process.
+    """
+    TTS_WORKER_MEMORY.labels(profile).set(peak_rss_bytes)
+
+
+def instrument_engine(engine) -> None:
+    """
+    Time the INSERT/UPDATE/DELETE statements of an SQLAlchemy engine as db_write,
+    and record every statement run inside a trace as a "db" span.
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = (time.time(), time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("query_start", None)
+        if started is None:
+            return
+        started_at, start = started
+        duration = time.perf_counter() - start
+        if statement.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE"):
+            STAGE_SECONDS.labels("db_write").observe(duration)
+        trace = current_trace()
+        if trace is not None:
+            trace.add("db", started_at, duration, {"statement": " ".join(statement.split())[:120]})
@@ -0,0 +1,49 @@
+import os
+import sys
+import glob
+import fcntl
+
+from app.core.config import settings
+
+# Open for the life of the process; its shared lock marks the directory as in use
+_lock_file = None
+
+
+def setup_metrics_dir(clear: bool = False) -> str:
+    """
+    Share Prometheus samples between processes through METRICS_DIR.
+
+    prometheus_client picks its storage when it is imported, so call this
+    before anything imports app.core.metrics; processes started afterwards
+    inherit the setting. Every process that calls this holds a shared lock
+    on the directory while it runs. With clear, the samples of an earlier
+    run are removed, but only if no other process holds that lock, so API
+    processes started next to each other (uvicorn --workers, gunicorn) or
+    after a separately started job worker keep the samples of the others.
+    """
+    global _lock_file
+    if "prometheus_client" in sys.modules and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        raise RuntimeError("setup_metrics_dir() must run before prometheus_client is imported")
+    directory = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.METRICS_DIR)
+    os.makedirs(directory, exist_ok=True)
+    if _lock_file is not None:
+        return directory
+
+    _lock_file = open(os.path.join(directory, ".lock"), "a")
+    if clear and _lock_alone():
+        for path in glob.glob(os.path.join(directory, "*.db")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    fcntl.flock(_lock_file, fcntl.LOCK_SH)
+    return directory
+
+
+def _lock_alone() -> bool:
+    """Take the directory lock exclusively, if no other process holds it."""
+    try:
+        fcntl.flock(_lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from app.core.config import settings
+
+module_name = "profiler"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler: a background thread samples the stacks of all other
+    threads of the process every PROFILE_INTERVAL_MS and counts identical stacks.
+
+    Results are saved in the folded stack format ("frame;frame;frame count" per
+    line), which flamegraph.pl and speedscope read directly.
+    """
+
+    def __init__(self, interval_ms: float | None = None):
+        self.interval = (settings.PROFILE_INTERVAL_MS if interval_ms is None else interval_ms) / 1000
+        self.samples: Counter[str] = Counter()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=module_name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stopping.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def save(self, name: str) -> str:
+        """
+        Write the samples to PROFILE_DIR and return the file path.
+        """
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        path = os.path.join(settings.PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+@contextmanager
+def profile(name: str):
+    """
+    Profile a block and save the result as name.
+    """
+    profiler = SamplingProfiler()
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        profiler.save(name)
+
+
+class ProfilerSwitch:
+    """
+    Arms the profiler for the next N requests of this process.
+    """
+
+    def __init__(self):
+        self.remaining = 0
+        self._lock = threading.Lock()
+
+    def arm(self, requests: int) -> None:
+        with self._lock:
+            self.remaining = max(0, requests)
+
+    def take(self) -> bool:
+        """Claim one profiled request, if any are left."""
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+_switch = ProfilerSwitch()
+
+
+def get_profiler_switch() -> ProfilerSwitch:
+    """
+    Get the process-wide profiler switch.
+    """
+    return _switch
+
+
+def list_profiles() -> list[str]:
+    """
+    Saved profile files, newest first.
+    """
+    if not os.path.isdir(settings.PROFILE_DIR):
+        return []
+    return sorted((name for name in os.listdir(settings.PROFILE_DIR) if name.endswith(".folded")), reverse=True)
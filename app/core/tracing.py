@@ -0,0 +1,138 @@
+import os
+import time
+import uuid
+import threading
+import multiprocessing as mp
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app.core.config import settings
+
+module_name = "tracing"
+
+
+class Trace:
+    """
+    Timed spans of one generation request, collected in memory and saved per job.
+
+    A trace is carried in a context variable, so asyncio tasks and threads started
+    from a traced request or job record into the same trace. Spans can also be
+    added from other threads (e.g. results of TTS worker processes).
+    """
+
+    def __init__(self, trace_id: str | None = None, profile: bool = False):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.profile = profile
+        self.job_ids: list[int] = []
+        self.spans: list[dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, started_at: float, duration: float, attributes: dict | None = None) -> None:
+        """Record a finished span; started_at is a Unix timestamp, duration in seconds."""
+        record = {
+            "name": name,
+            "process": process_name(),
+            "started_at": started_at,
+            "duration_ms": round(duration * 1000, 3),
+            "attributes": attributes or {}
+        }
+        with self._lock:
+            self.spans.append(record)
+
+    def extend(self, spans: list[dict]) -> None:
+        """Add spans recorded elsewhere (another process)."""
+        with self._lock:
+            self.spans.extend(spans)
+
+    def drain(self) -> list[dict]:
+        """Take the spans recorded since the last drain."""
+        with self._lock:
+            spans, self.spans = self.spans, []
+        return spans
+
+
+_current: ContextVar[Trace | None] = ContextVar("trace", default=None)
+
+
+def process_name() -> str:
+    return f"{mp.current_process().name}:{os.getpid()}"
+
+
+def current_trace() -> Trace | None:
+    """The trace of the running request or job, if any."""
+    return _current.get()
+
+
+def start_trace(trace_id: str | None = None, profile: bool = False) -> Trace | None:
+    """
+    Create a trace, or None when tracing is disabled.
+    """
+    if not settings.TRACING_ENABLED:
+        return None
+    return Trace(trace_id, profile=profile)
+
+
+@contextmanager
+def use_trace(trace: Trace | None):
+    """
+    Make trace the current trace for the block.
+    """
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a block as a span of the current trace. Does nothing outside a trace.
+    """
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started_at = time.time()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        attributes["error"] = str(e)[:200]
+        raise
+    finally:
+        trace.add(name, started_at, time.perf_counter() - start, attributes)
+
+
+def bind_jobs(job_ids: list[int]) -> None:
+    """
+    Attach the current trace to jobs created by the request, so its spans show up
+    in the jobs' timelines and the job worker continues the same trace.
+    """
+    trace = _current.get()
+    if trace is None or not job_ids:
+        return
+    trace.job_ids.extend(job_ids)
+    # Saved right away so a worker claiming a job finds the trace id (and the
+    # profiling flag) before the request has finished
+    trace.add("job_queued", time.time(), 0.0, {"job_ids": list(job_ids), "profile": trace.profile})
+    save_trace(trace)
+
+
+def save_trace(trace: Trace | None) -> None:
+    """
+    Store the spans recorded since the last save for every job of the trace.
+    Spans of traces without a job are dropped.
+    """
+    if trace is None:
+        return
+    spans = trace.drain()
+    if not spans or not trace.job_ids:
+        return
+    # Imported here: the database layer is instrumented by this module
+    from app.db.session import session_scope
+    from app.db.repository import TraceSpanRepository
+
+    # The inserts themselves must not be recorded into the trace being saved
+    with use_trace(None), session_scope() as db:
+        TraceSpanRepository.bulk_create(db, trace.trace_id, trace.job_ids, spans)
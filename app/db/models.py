@@ -1,8 +1,15 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Boolean, Index, Float
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 
 from app.db.base import Base
 
+# SQLite stores server_default timestamps as "YYYY-MM-DD HH:MM:SS"; bind
+# parameters in the same format so comparisons on them (keyset pagination) are exact
+SQLITE_TIMESTAMP = sqlite.DATETIME(
+    storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+)
+
 class GeneratedFile(Base):
     """Model for storing information about generated files."""
     __tablename__ = "generated_files"
@@ -11,7 +18,13 @@ class GeneratedFile(Base):
     original_filename = Column(String, index=True)
     generated_filepath = Column(String, unique=True, index=True)
     grade_level = Column(Integer)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True).with_variant(SQLITE_TIMESTAMP, "sqlite"), server_default=func.now())
+    
+    # Keyset pagination of the catalog, newest first, optionally by grade
+    __table_args__ = (
+        Index("ix_generated_files_created_id", "created_at", "id"),
+        Index("ix_generated_files_grade_created_id", "grade_level", "created_at", "id"),
+    )
     
     def __repr__(self):
         return f"<GeneratedFile(id={self.id}, original_filename='{self.original_filename}')>" 
@@ -26,6 +39,86 @@ class GeneratedAudio(Base):
     conversation_id = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    # Serves the per-line audio lookup (file id + conversation id)
+    __table_args__ = (
+        Index("ix_generated_audios_file_conversation", "generated_file_id", "conversation_id"),
+    )
+    
+    def __repr__(self):
+        return f"<GeneratedAudio(id={self.id}, generated_file_id='{self.generated_file_id}')>"
+
+class GenerationJob(Base):
+    """Model for a queued conversation generation job and its progress."""
+    __tablename__ = "generation_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    original_filename = Column(String, index=True)
+    grade_level = Column(Integer)
+    markdown_text = Column(Text)
+    bypass_cache = Column(Boolean, default=False)
+    status = Column(String, default="queued", index=True)
+    stage = Column(String, default="pick_words")
+    words = Column(JSON, nullable=True)
+    conversation = Column(JSON, nullable=True)
+    line_status = Column(JSON, nullable=True)
+    generated_file_id = Column(Integer, ForeignKey("generated_files.id"), nullable=True, index=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+    worker_id = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<GenerationJob(id={self.id}, status='{self.status}', stage='{self.stage}')>"
+
+class GenerationBatch(Base):
+    """Model for a group of generation jobs uploaded together."""
+    __tablename__ = "generation_batches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<GenerationBatch(id={self.id})>"
+
+class GenerationBatchItem(Base):
+    """Model for one uploaded file of a batch and the job created for it."""
+    __tablename__ = "generation_batch_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(Integer, ForeignKey("generation_batches.id"), index=True)
+    filename = Column(String)
+    job_id = Column(Integer, ForeignKey("generation_jobs.id"), nullable=True)
+    error = Column(Text, nullable=True)
+    
+    def __repr__(self):
+        return f"<GenerationBatchItem(id={self.id}, batch_id={self.batch_id}, filename='{self.filename}')>"
+
+class TraceSpan(Base):
+    """Model for a timed span of a generation job's trace."""
+    __tablename__ = "trace_spans"
+
+    id = Column(Integer, primary_key=True, index=True)
+    trace_id = Column(String, index=True)
+    job_id = Column(Integer, ForeignKey("generation_jobs.id"), index=True)
+    name = Column(String)
+    process = Column(String)
+    started_at = Column(Float)
+    duration_ms = Column(Float)
+    attributes = Column(JSON, nullable=True)
+    
+    def __repr__(self):
+        return f"<TraceSpan(id={self.id}, job_id={self.job_id}, name='{self.name}')>"
+
+class GenerationJobVoice(Base):
+    """Model for a per-request speaker to voice mapping of a generation job."""
+    __tablename__ = "generation_job_voices"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("generation_jobs.id"), index=True)
+    speaker = Column(String)
+    voice = Column(String)
+    
     def __repr__(self):
-        return f"<GeneratedAudio(id={self.id}, generated_file_id='{self.generated_file_id}')>" 
-    
\ No newline at end of file
+        return f"<GenerationJobVoice(job_id={self.job_id}, speaker='{self.speaker}', voice='{self.voice}')>"
@@ -1,6 +1,9 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import or_, and_, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.models import GeneratedFile, GeneratedAudio
+from app.db.models import GeneratedFile, GeneratedAudio, GenerationJob, GenerationBatch, GenerationBatchItem, GenerationJobVoice, TraceSpan
 from app.models.file import GeneratedFileCreate
 
 class GeneratedFileRepository:
@@ -25,6 +28,33 @@ class GeneratedFileRepository:
             db.refresh(db_file)
         return db_file
     
+    @staticmethod
+    def create_or_replace(db: Session, file: GeneratedFileCreate) -> GeneratedFile:
+        """
+        Create the generated file record of a (re)generated conversation.
+        
+        A file that already exists takes the new path and grade level, and its
+        audio records, which belong to the previous conversation, are deleted in
+        the same transaction.
+        """
+        db_file = db.query(GeneratedFile).filter(GeneratedFile.original_filename == file.original_filename).first()
+        if db_file:
+            db.query(GeneratedAudio).filter(
+                GeneratedAudio.generated_file_id == db_file.id
+            ).delete(synchronize_session=False)
+            db_file.generated_filepath = file.generated_filepath
+            db_file.grade_level = file.grade_level
+        else:
+            db_file = GeneratedFile(
+                original_filename=file.original_filename,
+                generated_filepath=file.generated_filepath,
+                grade_level=file.grade_level
+            )
+            db.add(db_file)
+        db.commit()
+        db.refresh(db_file)
+        return db_file
+    
     @staticmethod
     def get_by_generated_file_id(db: Session, generated_file_id: int) -> GeneratedFile:
         """
@@ -45,6 +75,34 @@ class GeneratedFileRepository:
         Get all generated file records.
         """
         return db.query(GeneratedFile).offset(skip).limit(limit).all()
+    
+    @staticmethod
+    def list_page(db: Session,
+                  limit: int,
+                  after: tuple[datetime, int] | None = None,
+                  grade_level: int | None = None,
+                  prefix: str | None = None) -> list[GeneratedFile]:
+        """
+        Get a page of generated files, newest first, using keyset pagination.
+        
+        after is the (created_at, id) of the last file of the previous page.
+        """
+        query = db.query(GeneratedFile)
+        if grade_level is not None:
+            query = query.filter(GeneratedFile.grade_level == grade_level)
+        if prefix:
+            # Range instead of LIKE so the filename index is used on every backend
+            query = query.filter(
+                GeneratedFile.original_filename >= prefix,
+                GeneratedFile.original_filename < prefix + "\U0010ffff"
+            )
+        if after is not None:
+            created_at, file_id = after
+            query = query.filter(or_(
+                GeneratedFile.created_at < created_at,
+                and_(GeneratedFile.created_at == created_at, GeneratedFile.id < file_id)
+            ))
+        return query.order_by(GeneratedFile.created_at.desc(), GeneratedFile.id.desc()).limit(limit).all()
 
 class GeneratedAudioRepository:
     """Repository for generated audio operations."""
@@ -53,11 +111,15 @@ class GeneratedAudioRepository:
     def create(db: Session, generated_file_id: int, generated_filepath: str, conversation_id: int | None = None) -> GeneratedAudio:
         """
         Create a new generated audio record.
+        
+        An earlier record of the same line under another path is replaced.
         """
         audio_record = db.query(GeneratedAudio).filter(GeneratedAudio.generated_filepath == generated_filepath).first()
         if audio_record:
             return audio_record
         else:
+            if conversation_id is not None:
+                GeneratedAudioRepository._delete_lines(db, generated_file_id, [conversation_id])
             db_audio = GeneratedAudio(
                 generated_file_id=generated_file_id,
                 generated_filepath=generated_filepath,
@@ -68,9 +130,314 @@ class GeneratedAudioRepository:
             db.refresh(db_audio)
             return db_audio
     
+    @staticmethod
+    def bulk_create(db: Session, generated_file_id: int, audios: list[tuple[int, str]]) -> int:
+        """
+        Create the audio records of a conversation in one transaction.
+        
+        audios holds (conversation_id, generated_filepath) pairs; paths that are
+        already recorded are skipped, and earlier records of the same lines under
+        other paths are replaced. Returns the number of new records.
+        """
+        paths = [path for _, path in audios]
+        existing = {
+            path for (path,) in db.query(GeneratedAudio.generated_filepath).filter(
+                GeneratedAudio.generated_filepath.in_(paths)
+            )
+        }
+        new_records = []
+        for conversation_id, path in audios:
+            if path in existing:
+                continue
+            existing.add(path)
+            new_records.append(GeneratedAudio(
+                generated_file_id=generated_file_id,
+                generated_filepath=path,
+                conversation_id=conversation_id
+            ))
+        GeneratedAudioRepository._delete_lines(
+            db, generated_file_id, [record.conversation_id for record in new_records if record.conversation_id is not None]
+        )
+        db.add_all(new_records)
+        db.commit()
+        return len(new_records)
+    
+    @staticmethod
+    def _delete_lines(db: Session, generated_file_id: int, conversation_ids: list[int]) -> None:
+        """Delete the audio records of some lines of a generated file, without committing."""
+        if conversation_ids:
+            db.query(GeneratedAudio).filter(
+                GeneratedAudio.generated_file_id == generated_file_id,
+                GeneratedAudio.conversation_id.in_(conversation_ids)
+            ).delete(synchronize_session=False)
+    
+    @staticmethod
+    def count_by_generated_file_ids(db: Session, generated_file_ids: list[int]) -> dict[int, int]:
+        """
+        Count the audio records of several generated files in one query.
+        """
+        if not generated_file_ids:
+            return {}
+        rows = db.query(GeneratedAudio.generated_file_id, func.count(GeneratedAudio.id)).filter(
+            GeneratedAudio.generated_file_id.in_(generated_file_ids)
+        ).group_by(GeneratedAudio.generated_file_id).all()
+        return dict(rows)
+    
+    @staticmethod
+    def get_by_generated_file_id(db: Session, generated_file_id: int) -> list[GeneratedAudio]:
+        """
+        Get all generated audio records of a generated file.
+        """
+        return db.query(GeneratedAudio).filter(GeneratedAudio.generated_file_id == generated_file_id).all()
+    
     @staticmethod
     def get_by_generated_audio_path_by_file_and_conversation_id(db: Session, generated_file_id: int, conversation_id: int) -> GeneratedAudio:
         """
         Get generated audio records by generated filepath.
         """
         return db.query(GeneratedAudio).filter(GeneratedAudio.generated_file_id == generated_file_id, GeneratedAudio.conversation_id == conversation_id).first()
+
+class GenerationJobRepository:
+    """Repository for generation job operations."""
+    
+    @staticmethod
+    def create(db: Session, original_filename: str, grade_level: int, markdown_text: str,
+               bypass_cache: bool = False, voices: dict[str, str] | None = None) -> GenerationJob:
+        """
+        Create a new queued generation job, with optional per-speaker voices.
+        """
+        db_job = GenerationJob(
+            original_filename=original_filename,
+            grade_level=grade_level,
+            markdown_text=markdown_text,
+            bypass_cache=bypass_cache,
+            status="queued",
+            stage="pick_words",
+            attempts=0
+        )
+        db.add(db_job)
+        db.flush()
+        # Stored with the job so a worker never claims it without its voices
+        GenerationJobVoiceRepository.add_voices(db, db_job.id, voices)
+        db.commit()
+        db.refresh(db_job)
+        return db_job
+    
+    @staticmethod
+    def get_by_id(db: Session, job_id: int) -> GenerationJob:
+        """
+        Get a generation job by its ID.
+        """
+        return db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+    
+    @staticmethod
+    async def aget_by_id(db: AsyncSession, job_id: int) -> GenerationJob | None:
+        """
+        Get a generation job by its ID with an async session.
+        """
+        result = await db.execute(select(GenerationJob).where(GenerationJob.id == job_id))
+        return result.scalar_one_or_none()
+    
+    @staticmethod
+    def line_counts_by_generated_file_ids(db: Session, generated_file_ids: list[int]) -> dict[int, int]:
+        """
+        Number of conversation lines of several generated files, from their jobs,
+        in one query.
+        """
+        if not generated_file_ids:
+            return {}
+        rows = db.query(
+            GenerationJob.generated_file_id, func.max(func.json_array_length(GenerationJob.conversation))
+        ).filter(
+            GenerationJob.generated_file_id.in_(generated_file_ids)
+        ).group_by(GenerationJob.generated_file_id).all()
+        return {file_id: count for file_id, count in rows if count is not None}
+    
+    @staticmethod
+    def get_unfinished_by_filename(db: Session, original_filename: str) -> GenerationJob | None:
+        """
+        Get the queued or running job of a file, if there is one.
+        """
+        return db.query(GenerationJob).filter(
+            GenerationJob.original_filename == original_filename,
+            GenerationJob.status.in_(("queued", "running"))
+        ).order_by(GenerationJob.id).first()
+    
+    @staticmethod
+    def claim_next(db: Session, worker_id: str, stale_after: float) -> GenerationJob | None:
+        """
+        Atomically claim the oldest queued job, or a running job whose worker
+        stopped sending heartbeats. Returns None if there is nothing to do.
+        """
+        now = datetime.now(timezone.utc)
+        claimable = or_(
+            GenerationJob.status == "queued",
+            and_(
+                GenerationJob.status == "running",
+                or_(
+                    GenerationJob.heartbeat_at.is_(None),
+                    GenerationJob.heartbeat_at < now - timedelta(seconds=stale_after)
+                )
+            )
+        )
+        candidate = db.query(GenerationJob.id).filter(claimable).order_by(GenerationJob.id).first()
+        if candidate is None:
+            return None
+        
+        # Conditional update so two workers can never claim the same job
+        claimed = db.query(GenerationJob).filter(GenerationJob.id == candidate.id, claimable).update(
+            {
+                GenerationJob.status: "running",
+                GenerationJob.worker_id: worker_id,
+                GenerationJob.heartbeat_at: now,
+                GenerationJob.attempts: GenerationJob.attempts + 1
+            },
+            synchronize_session=False
+        )
+        db.commit()
+        if claimed != 1:
+            return None
+        return GenerationJobRepository.get_by_id(db, candidate.id)
+    
+    @staticmethod
+    def update(db: Session, job_id: int, **fields) -> None:
+        """
+        Update fields of a generation job.
+        """
+        db.query(GenerationJob).filter(GenerationJob.id == job_id).update(
+            {getattr(GenerationJob, name): value for name, value in fields.items()},
+            synchronize_session=False
+        )
+        db.commit()
+    
+    @staticmethod
+    def heartbeat(db: Session, job_id: int, worker_id: str) -> None:
+        """
+        Record that the worker owning a job is still alive.
+        """
+        db.query(GenerationJob).filter(
+            GenerationJob.id == job_id, GenerationJob.worker_id == worker_id
+        ).update({GenerationJob.heartbeat_at: datetime.now(timezone.utc)}, synchronize_session=False)
+        db.commit()
+
+class GenerationJobVoiceRepository:
+    """Repository for per-job speaker voice operations."""
+    
+    @staticmethod
+    def add_voices(db: Session, job_id: int, voices: dict[str, str] | None) -> None:
+        """
+        Add the speaker to voice mapping requested for a job to the session
+        (committed by the caller, together with the job).
+        """
+        db.add_all([
+            GenerationJobVoice(job_id=job_id, speaker=speaker, voice=voice)
+            for speaker, voice in (voices or {}).items()
+        ])
+    
+    @staticmethod
+    def get_voices(db: Session, job_id: int) -> dict[str, str]:
+        """
+        Get the speaker to voice mapping requested for a job (empty if none).
+        """
+        rows = db.query(GenerationJobVoice).filter(GenerationJobVoice.job_id == job_id).all()
+        return {row.speaker: row.voice for row in rows}
+
+class GenerationBatchRepository:
+    """Repository for generation batch operations."""
+    
+    @staticmethod
+    def create(db: Session, files: list[dict], bypass_cache: bool = False,
+               voices: dict[str, str] | None = None) -> GenerationBatch:
+        """
+        Create a batch with one queued job per accepted file, in a single transaction.
+        
+        Each entry has a filename and either original_filename, grade_level and
+        markdown_text, or an error for files that were rejected.
+        """
+        db_batch = GenerationBatch()
+        db.add(db_batch)
+        db.flush()
+        for entry in files:
+            db_job = None
+            if entry.get("error") is None:
+                db_job = GenerationJob(
+                    original_filename=entry["original_filename"],
+                    grade_level=entry["grade_level"],
+                    markdown_text=entry["markdown_text"],
+                    bypass_cache=bypass_cache,
+                    status="queued",
+                    stage="pick_words",
+                    attempts=0
+                )
+                db.add(db_job)
+                db.flush()
+                GenerationJobVoiceRepository.add_voices(db, db_job.id, voices)
+            db.add(GenerationBatchItem(
+                batch_id=db_batch.id,
+                filename=entry["filename"],
+                job_id=db_job.id if db_job is not None else None,
+                error=entry.get("error")
+            ))
+        db.commit()
+        db.refresh(db_batch)
+        return db_batch
+    
+    @staticmethod
+    def get_by_id(db: Session, batch_id: int) -> GenerationBatch:
+        """
+        Get a generation batch by its ID.
+        """
+        return db.query(GenerationBatch).filter(GenerationBatch.id == batch_id).first()
+    
+    @staticmethod
+    def get_items(db: Session, batch_id: int) -> list[tuple[GenerationBatchItem, GenerationJob | None]]:
+        """
+        Get the files of a batch with their jobs, in upload order.
+        """
+        return (
+            db.query(GenerationBatchItem, GenerationJob)
+            .outerjoin(GenerationJob, GenerationBatchItem.job_id == GenerationJob.id)
+            .filter(GenerationBatchItem.batch_id == batch_id)
+            .order_by(GenerationBatchItem.id)
+            .all()
+        )
+
+class TraceSpanRepository:
+    """Repository for trace span operations."""
+    
+    @staticmethod
+    def bulk_create(db: Session, trace_id: str, job_ids: list[int], spans: list[dict]) -> None:
+        """
+        Store spans of a trace for each of its jobs in one transaction.
+        """
+        db.add_all([
+            TraceSpan(
+                trace_id=trace_id,
+                job_id=job_id,
+                name=span["name"],
+                process=span["process"],
+                started_at=span["started_at"],
+                duration_ms=span["duration_ms"],
+                attributes=span["attributes"]
+            )
+            for job_id in job_ids
+            for span in spans
+        ])
+        db.commit()
+    
+    @staticmethod
+    def get_by_job_id(db: Session, job_id: int) -> list[TraceSpan]:
+        """
+        Get the spans of a job in start order.
+        """
+        return db.query(TraceSpan).filter(TraceSpan.job_id == job_id).order_by(TraceSpan.started_at, TraceSpan.id).all()
+    
+    @staticmethod
+    def get_first_by_job_id(db: Session, job_id: int, name: str | None = None) -> TraceSpan | None:
+        """
+        Get the first stored span of a job, optionally with the given name.
+        """
+        query = db.query(TraceSpan).filter(TraceSpan.job_id == job_id)
+        if name is not None:
+            query = query.filter(TraceSpan.name == name)
+        return query.order_by(TraceSpan.id).first()
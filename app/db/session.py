@@ -1,17 +1,138 @@
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.db.base import Base
 
-engine = create_engine(
-    settings.DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def _engine_options(url: str) -> dict:
+    if _is_sqlite(url):
+        # Connections are shared across threads by the API and job workers;
+        # wait for locks held by other processes instead of failing at once
+        return {
+            "connect_args": {
+                "check_same_thread": False,
+                "timeout": settings.DB_BUSY_TIMEOUT_MS / 1000
+            }
+        }
+    return {"pool_pre_ping": True}
+
+def _configure_sqlite(dbapi_connection, connection_record) -> None:
+    """
+    Per-connection SQLite settings: WAL lets readers (API) run alongside the
+    writer (job workers), and busy_timeout makes writers queue for the lock.
+    """
+    cursor = dbapi_connection.cursor()
+    if settings.DB_SQLITE_WAL:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.DB_BUSY_TIMEOUT_MS)}")
+    cursor.close()
+
+engine = create_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
+if _is_sqlite(settings.DATABASE_URL):
+    event.listen(engine, "connect", _configure_sqlite)
+instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def init_db() -> None:
+    """
+    Create missing tables, and missing indexes of existing tables
+    (create_all only adds indexes together with a new table).
+    """
+    # Register the tables on Base.metadata
+    from app.db import models
+    Base.metadata.create_all(bind=engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
 def get_db():
     """Get database session."""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+@contextmanager
+def session_scope():
+    """
+    Session for work outside a request (job workers, streaming responses, scripts).
+    Commits on success, rolls back on error and always closes. Loaded objects stay
+    usable after the scope ends.
+    """
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+# Optional async sessions for the API (DB_ASYNC_ENABLED), created on first use.
+# Needs an async driver: aiosqlite for SQLite, asyncpg for PostgreSQL.
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+_async_engine = None
+_async_session_factory = None
+
+def async_database_url(url: str) -> str:
+    """
+    The async driver variant of a database URL.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if parsed.get_driver_name() in ("aiosqlite", "asyncpg") or backend not in _ASYNC_DRIVERS:
+        return url
+    return parsed.set(drivername=_ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def async_sessions_enabled() -> bool:
+    """Whether the API should use async sessions."""
+    return settings.DB_ASYNC_ENABLED
+
+def get_async_sessionmaker():
+    """
+    Get the async session factory, creating the async engine on first use.
+    """
+    global _async_engine, _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        url = async_database_url(settings.DATABASE_URL)
+        options = {"pool_pre_ping": True}
+        if _is_sqlite(url):
+            options = {"connect_args": {"timeout": settings.DB_BUSY_TIMEOUT_MS / 1000}}
+        try:
+            _async_engine = create_async_engine(url, **options)
+        except ModuleNotFoundError as e:
+            raise RuntimeError(
+                f"DB_ASYNC_ENABLED needs the async driver for {make_url(url).drivername}: "
+                f"install {e.name} or set DB_ASYNC_ENABLED=false"
+            ) from e
+        if _is_sqlite(url):
+            event.listen(_async_engine.sync_engine, "connect", _configure_sqlite)
+        instrument_engine(_async_engine.sync_engine)
+        _async_session_factory = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_session_factory
+
+async def get_async_db():
+    """Get async database session."""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+async def dispose_async_engine() -> None:
+    """
+    Close the async engine's connections, if it was created.
+    """
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
@@ -1,13 +1,35 @@
-from fastapi import FastAPI
+import re
+from contextlib import nullcontext
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.metrics_dir import setup_metrics_dir
+
+# prometheus_client picks its storage on import, so this runs before the app
+# modules below are imported. Samples left by a previous run are dropped
+# unless another process still uses the directory; the workers are started
+# later and inherit it.
+setup_metrics_dir(clear=True)
+
 from app.api.conversation import router as api_router
+from app.api.jobs import router as jobs_router
+from app.api.batches import router as batches_router
+from app.api.metrics import router as metrics_router
+from app.api.admin import router as admin_router
+from app.api.health import router as health_router
 from app.core.config import settings
-from app.db.base import Base
-from app.db.session import engine
+from app.core.logging_config import configure_logging
+from app.core.profiler import get_profiler_switch, profile
+from app.core.tracing import save_trace, span, start_trace, use_trace
+from app.db.session import async_sessions_enabled, dispose_async_engine, get_async_sessionmaker, init_db
+from app.services.tts_worker_pool import get_tts_pool, shutdown_tts_pool
+from app.workers.job_worker import start_job_workers, stop_job_workers
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+configure_logging()
+
+# Create database tables and indexes
+init_db()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -25,6 +47,64 @@ app.add_middleware(
 
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
+app.include_router(jobs_router, prefix=settings.API_V1_STR)
+app.include_router(batches_router, prefix=settings.API_V1_STR)
+app.include_router(admin_router, prefix=settings.API_V1_STR)
+app.include_router(metrics_router)
+app.include_router(health_router)
+
+# Probes and scrapes do not use up armed profiler requests
+UNPROFILED_PATHS = ("/healthz", "/readyz", "/metrics")
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    """
+    Run every request in a trace (id from X-Trace-Id, or a new one) and profile
+    it while the admin profiler switch is armed. Spans of requests that queued
+    jobs are saved to the jobs' timelines.
+    """
+    profiled = (
+        not request.url.path.startswith(f"{settings.API_V1_STR}/admin")
+        and request.url.path not in UNPROFILED_PATHS
+        and get_profiler_switch().take()
+    )
+    trace = start_trace(request.headers.get("X-Trace-Id"), profile=profiled)
+    profile_name = re.sub(r"[^\w.-]+", "_", f"{request.method}{request.url.path}")
+    with use_trace(trace):
+        with profile(profile_name) if profiled else nullcontext():
+            with span("http_request", method=request.method, path=request.url.path):
+                response = await call_next(request)
+    if trace is not None:
+        response.headers["X-Trace-Id"] = trace.trace_id
+        if trace.job_ids:
+            await run_in_threadpool(save_trace, trace)
+    return response
+
+@app.on_event("startup")
+def start_workers():
+    """
+    Start the generation job workers (LLM and TTS run in those processes) and
+    keep warm TTS workers for streaming synthesis. Models load in the worker
+    processes, so the API serves requests right away; /readyz reports when
+    they are warm.
+    """
+    # Fail at startup, not on the first request, if the async driver is missing
+    if async_sessions_enabled():
+        get_async_sessionmaker()
+    start_job_workers()
+    if settings.API_TTS_WORKERS > 0:
+        get_tts_pool(settings.API_TTS_WORKERS)
+
+@app.on_event("shutdown")
+def stop_workers():
+    """Stop the generation job workers and the streaming TTS workers."""
+    stop_job_workers()
+    shutdown_tts_pool()
+
+@app.on_event("shutdown")
+async def close_database():
+    """Close the async database engine, if it was used."""
+    await dispose_async_engine()
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field, field_validator
+
+class ConversationLine(BaseModel):
+    """A single line of a generated conversation."""
+    speaker: str = Field(min_length=1)
+    text: str = Field(min_length=1)
+
+    @field_validator("speaker", "text", mode="before")
+    @classmethod
+    def strip_whitespace(cls, value):
+        return value.strip() if isinstance(value, str) else value
+
+class GeneratedConversation(BaseModel):
+    """Schema the LLM output for a conversation must follow."""
+    conversation: list[ConversationLine] = Field(min_length=1)
@@ -19,12 +19,28 @@ class GeneratedFileInDB(GeneratedFileBase):
     class Config:
         from_attributes = True
 
+class GeneratedFileSummary(BaseModel):
+    """Catalog entry of a generated file."""
+    id: int
+    original_filename: str
+    grade_level: int | None = None
+    created_at: datetime | None = None
+    total_lines: int | None = None
+    audio_count: int = 0
+    audio_complete: bool = False
+
+class GeneratedFileListResponse(BaseModel):
+    """Response model for a page of the generated file catalog."""
+    items: list[GeneratedFileSummary]
+    next_cursor: str | None = None
+
 class ProcessResponse(BaseModel):
     """Response model for file processing."""
     success: bool
     message: str
     generated_file_id: int | None = None
     grade_level: int | None = None 
+    job_id: int | None = None
     
 class ConversationResponse(BaseModel):
     """Response model for conversation."""
@@ -33,3 +49,85 @@ class ConversationResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+class JobLineStatus(BaseModel):
+    """Audio progress of a single conversation line."""
+    conversation_id: int
+    speaker: str | None = None
+    status: str
+    error: str | None = None
+
+class JobStatusResponse(BaseModel):
+    """Response model for generation job status."""
+    job_id: int
+    status: str
+    stage: str
+    original_filename: str
+    grade_level: int | None = None
+    generated_file_id: int | None = None
+    words: list[str] | None = None
+    total_lines: int = 0
+    completed_lines: int = 0
+    failed_lines: int = 0
+    lines: list[JobLineStatus] = []
+    error: str | None = None
+    attempts: int = 0
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+
+class TraceSpanResponse(BaseModel):
+    """A timed span of a job's trace."""
+    name: str
+    process: str | None = None
+    trace_id: str
+    start_ms: float
+    duration_ms: float
+    attributes: dict = {}
+
+class JobTraceResponse(BaseModel):
+    """Response model for the trace timeline of a generation job."""
+    job_id: int
+    trace_ids: list[str] = []
+    started_at: datetime | None = None
+    total_ms: float = 0
+    stages: dict[str, float] = {}
+    spans: list[TraceSpanResponse] = []
+
+class ProfilerRequest(BaseModel):
+    """Request model for arming the sampling profiler."""
+    requests: int = Field(1, ge=0, le=100)
+
+class ProfilerStatus(BaseModel):
+    """Response model for the profiler switch."""
+    remaining: int
+    profile_dir: str
+    profiles: list[str] = []
+
+class VoiceListResponse(BaseModel):
+    """Response model for the available voices and the speaker mapping."""
+    voices: list[str]
+    speakers: dict[str, str]
+    default_voice: str
+
+class BatchFileResult(BaseModel):
+    """Result of one file of a batch upload."""
+    filename: str
+    job_id: int | None = None
+    status: str
+    stage: str | None = None
+    generated_file_id: int | None = None
+    total_lines: int = 0
+    completed_lines: int = 0
+    error: str | None = None
+
+class BatchResponse(BaseModel):
+    """Response model for a batch of generation jobs."""
+    batch_id: int
+    status: str
+    total_files: int = 0
+    queued: int = 0
+    running: int = 0
+    completed: int = 0
+    failed: int = 0
+    files: list[BatchFileResult] = []
+    created_at: datetime | None = None
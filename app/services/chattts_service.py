@@ -1,173 +1,87 @@
 import ChatTTS
 import os
+import logging
 import torch
-import torchaudio
-import soundfile
-import numpy as np
 import time
-import random
 from huggingface_hub import snapshot_download
 
+from app.core.config import settings
+from app.core.metrics import record_worker_memory
+from app.services.tts_acceleration import accelerate_model, configure_threads, get_profile, peak_rss_bytes
+from app.services.tts_cache import TTSAudioCache
+from app.services.tts_service import TTSService
+from app.services.voice_registry import VoiceRegistry
+
 module_name = "chattts_service"
+logger = logging.getLogger(__name__)
 
 # Model path for ChatTTS (text to speech model)
 MODELPATH = "./chattts/ChatTTS/asset"
-VOICE_MODEL_PATH = "./chattts/voice-presets"
  
-class ChatttsService:
+class ChatttsService(TTSService):
     def __init__(self,
                  modelPath=MODELPATH,
                  saveFilePath="output/",
-                 gender="male",
-                 fixSpkStyle=True):
+                 voice=None,
+                 fixSpkStyle=True,
+                 acceleration=None):
         
         # Download the model from Huggingface if not exists
         if not os.path.exists(modelPath):
             repo_id = "2Noise/ChatTTS"
             destination_path = "./chattts/ChatTTS"  
             snapshot_download(repo_id=repo_id, local_dir=destination_path)
-            print(f"Repository cloned to: {destination_path}")
+            logger.info("Repository cloned to: %s", destination_path)
             
         self.modelPath = modelPath
         self.wavfilePath = saveFilePath
         self.fixSpkStyle = fixSpkStyle
+        self.cache = TTSAudioCache() if settings.TTS_CACHE_ENABLED else None
+        # CPU inference profile (default TTS_ACCELERATION); threads have to be set before loading
+        self.acceleration = get_profile(acceleration)
+        configure_threads(self.acceleration)
         
         # Initialize ChatTTS
-        print("Initializing ChatTTS...")
+        logger.info("Initializing ChatTTS (acceleration profile: %s)...", self.acceleration.name)
+        start = time.perf_counter()
         self.chat = ChatTTS.Chat()
         try:
             self.chat.load(custom_path=modelPath)
-            print("ChatTTS initialized successfully")
+            accelerate_model(self.chat, self.acceleration)
+            self.loadSeconds = time.perf_counter() - start
+            record_worker_memory(self.acceleration.name, peak_rss_bytes())
+            logger.info(
+                "ChatTTS initialized successfully in %.1fs (profile %s, %s intra-op / %s inter-op threads, peak RSS %.0f MB)",
+                self.loadSeconds, self.acceleration.name, torch.get_num_threads(), torch.get_num_interop_threads(),
+                peak_rss_bytes() / 2**20
+            )
         except Exception as e:
-            print(f"Error initializing ChatTTS: {str(e)}")
+            logger.error("Error initializing ChatTTS: %s", e)
             raise
         
         # Set up text refinement parameters
-        self.params_refine_text = ChatTTS.Chat.RefineTextParams(
-            prompt='[oral_0][laugh_0][break_0]',
-            top_P=0.7,
-            top_K=20
-        )
+        self.params_refine_text = self.buildRefineTextConf()
         
         try:
-            # Load voice model based on gender
-            if gender == "male":
-                spk_path = f"{VOICE_MODEL_PATH}/seed_1345_male.pt"
-            else:
-                spk_path = f"{VOICE_MODEL_PATH}/seed_742_female.pt"
-                
-            print(f"Loading voice model from: {spk_path}")
-            spk = torch.load(spk_path, map_location=torch.device('cpu'))
+            # Load every voice preset once; calls pick the voice per line
+            self.voices = VoiceRegistry()
             
-            # Set up inference parameters
-            self.params_infer_code = ChatTTS.Chat.InferCodeParams(
-                spk_emb=spk,
+            # Set up inference parameters (default voice: TTS_DEFAULT_VOICE)
+            self.params_infer_code = self.newInferCodeParams(
+                spk_emb=self.voices.get(voice),
                 temperature=0.3,
                 prompt="[speed_5]"
             )
-            print("Voice model loaded successfully")
             
         except Exception as e:
-            print(f"Error loading voice model: {str(e)}")
+            logger.error("Error loading voice presets: %s", e)
             raise
 
-    def setRefineTextConf(self, oralConf="[oral_0]", laughConf="[laugh_0]", breakConf="[break_0]"):
-        self.params_refine_text = ChatTTS.Chat.RefineTextParams(
-            prompt=f"{oralConf}{laughConf}{breakConf}",
-            top_P=0.7,
-            top_K=20
-        )
+    def newRefineTextParams(self, **kwargs):
+        return ChatTTS.Chat.RefineTextParams(**kwargs)
 
-    # Optional: Config the speech style with random generation
-    def setInferCode(self, temperature=0.3, top_P=0.7, top_K=20, speed="[speed_5]"):
-        self.params_infer_code = ChatTTS.Chat.InferCodeParams(
-            spk_emb=self.params_infer_code.spk_emb,
-            temperature=temperature,
-            prompt=speed
-        )
-
-    def generateSound(self, texts, savePath="output/", filePrefix="output"):
-        """
-        Generate audio files from text.
-        
-        Args:
-            texts: List of text strings to convert to audio
-            savePath: Directory to save the audio files
-            filePrefix: Prefix for the audio file names
-            
-        Returns:
-            List of paths to the generated audio files
-        """
-        # Ensure the save directory exists
-        os.makedirs(savePath, exist_ok=True)
-        
-        # Validate input
-        if not texts or not isinstance(texts, list):
-            print(f"Warning: Invalid texts input: {texts}")
-            return []
-            
-        # Print debug information
-        print(f"Generating audio for texts: {texts}")
-        print(f"Save path: {savePath}")
-        print(f"File prefix: {filePrefix}")
-        
-        try:
-            # Generate audio using ChatTTS
-            wavs = self.chat.infer(
-                text=texts,
-                stream=False,
-                use_decoder=True,
-                params_refine_text=self.params_refine_text,
-                params_infer_code=self.params_infer_code
-            )
-            
-            # Print debug information about the generated wavs
-            print(f"Generated {len(wavs)} audio segments")
-            
-            # Save each audio file and collect paths
-            wavFilePath = []
-            for (index, wave) in enumerate(wavs):
-                try:
-                    # Debug the wave structure
-                    print(f"Wave {index} type: {type(wave)}")
-                    
-                    # Handle different possible wave structures
-                    if isinstance(wave, np.ndarray):
-                        # If it's a NumPy array, use it directly
-                        audio_data = wave
-                        print(f"NumPy array shape: {wave.shape}")
-                    elif isinstance(wave, (list, tuple)) and len(wave) > 0:
-                        # If it's a list or tuple, use the first element
-                        audio_data = wave[0]
-                        print(f"Using first element of sequence, type: {type(audio_data)}")
-                    else:
-                        # Fallback
-                        audio_data = wave
-                        print(f"Using wave directly, type: {type(audio_data)}")
-                    
-                    # Create the full file path
-                    file_path = os.path.join(savePath, f"{filePrefix}{index}.wav")
-                    
-                    # Save the audio file
-                    print(f"Saving audio to: {file_path}")
-                    soundfile.write(file_path, audio_data, 24000)
-                    
-                    # Add the file path to the list
-                    wavFilePath.append(file_path)
-                    
-                except Exception as e:
-                    print(f"Error processing wave {index}: {str(e)}")
-                    print(f"Wave data type: {type(wave)}")
-                    if isinstance(wave, np.ndarray):
-                        print(f"Wave shape: {wave.shape}, dtype: {wave.dtype}")
-                    continue
-                
-            return wavFilePath
-            
-        except Exception as e:
-            print(f"Error in generateSound: {str(e)}")
-            print(f"Texts: {texts}")
-            return []
+    def newInferCodeParams(self, **kwargs):
+        return ChatTTS.Chat.InferCodeParams(**kwargs)
 
 # if __name__ == "__main__":
 #     chUtil = ChatttsService()
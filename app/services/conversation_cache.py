@@ -0,0 +1,103 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import formatdate
+
+from app.core.config import settings
+from app.core.metrics import record_cache
+from app.db.models import GeneratedFile
+from app.models.file import ConversationResponse
+
+
+@dataclass
+class CachedConversation:
+    """A conversation response ready to be sent, and its parsed lines."""
+    conversations: list
+    body: bytes
+    etag: str
+    last_modified: str
+    modified_at: int
+    version: tuple[int, int]
+
+
+class ConversationResponseCache:
+    """
+    Bounded LRU of conversation responses, parsed and serialized once.
+
+    Entries are keyed by generated file id and validated against the JSON file's
+    modification time and size, so a regenerated conversation is picked up by
+    the next request while unchanged ones are served without reading or
+    re-serializing the file.
+    """
+
+    def __init__(self, max_entries: int | None = None):
+        self.max_entries = settings.CONVERSATION_CACHE_ENTRIES if max_entries is None else max_entries
+        self._entries: OrderedDict[int, CachedConversation] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, file_record: GeneratedFile) -> CachedConversation:
+        """
+        Get the response for a generated file, loading it on a miss.
+        Raises FileNotFoundError if the conversation file is gone.
+        """
+        stat = os.stat(file_record.generated_filepath)
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(file_record.id)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(file_record.id)
+                self.hits += 1
+                record_cache("conversation", True)
+                return entry
+            self.misses += 1
+        record_cache("conversation", False)
+
+        entry = self._load(file_record)
+        with self._lock:
+            if self.max_entries > 0:
+                self._entries[file_record.id] = entry
+                self._entries.move_to_end(file_record.id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def _load(self, file_record: GeneratedFile) -> CachedConversation:
+        # The file is replaced atomically when rewritten; the version comes from
+        # the copy actually read
+        with open(file_record.generated_filepath, 'r', encoding='utf-8') as f:
+            stat = os.fstat(f.fileno())
+            conversation_data = json.load(f)
+        version = (stat.st_mtime_ns, stat.st_size)
+        mtime = stat.st_mtime
+
+        body = ConversationResponse(
+            generated_file_id=file_record.id,
+            conversations=conversation_data["conversations"]
+        ).model_dump_json().encode("utf-8")
+        return CachedConversation(
+            conversations=conversation_data["conversations"],
+            body=body,
+            etag=f'"{hashlib.sha1(body).hexdigest()}"',
+            last_modified=formatdate(mtime, usegmt=True),
+            modified_at=int(mtime),
+            version=version
+        )
+
+
+_cache: ConversationResponseCache | None = None
+
+
+def get_conversation_cache() -> ConversationResponseCache:
+    """
+    Get the process-wide conversation response cache.
+    """
+    global _cache
+    if _cache is None:
+        _cache = ConversationResponseCache()
+    return _cache
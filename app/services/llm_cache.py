@@ -0,0 +1,161 @@
+import copy
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from app.core.config import settings
+
+
+def hash_text(text: str) -> str:
+    """SHA-256 hex digest of a text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache for parsed LLM responses.
+
+    Tier 1 is an in-process LRU; tier 2 is a SQLite file shared by every process
+    (API and job workers). Entries expire after a TTL and each tier is bounded by
+    entry count, evicting the least recently used entries first.
+    """
+
+    def __init__(self,
+                 path: str | None = None,
+                 max_memory_entries: int | None = None,
+                 max_disk_entries: int | None = None,
+                 ttl: float | None = None):
+        self.path = path or settings.LLM_CACHE_PATH
+        self.max_memory_entries = settings.LLM_CACHE_MEMORY_ENTRIES if max_memory_entries is None else max_memory_entries
+        self.max_disk_entries = settings.LLM_CACHE_MAX_ENTRIES if max_disk_entries is None else max_disk_entries
+        self.ttl = settings.LLM_CACHE_TTL if ttl is None else ttl
+
+        self._memory: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+
+        self._init_db()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """
+        Build a cache key from JSON-serializable parts.
+        """
+        return hash_text(json.dumps(parts, sort_keys=True, ensure_ascii=False))
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache (last_access)")
+        conn.close()
+
+    def get(self, key: str) -> Any | None:
+        """
+        Look up a cached value, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    # Callers may mutate the result; keep the cached copy intact
+                    return copy.deepcopy(value)
+                del self._memory[key]
+
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute(
+                    "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] > self.ttl:
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    row = None
+                if row is not None:
+                    conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        finally:
+            conn.close()
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            value = json.loads(row[0])
+            self._remember(key, row[1], copy.deepcopy(value))
+            self.hits += 1
+            self.disk_hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store a value in both tiers.
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, copy.deepcopy(value))
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), now, now)
+                )
+                # Expire old entries, then trim to the size bound by LRU order
+                conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+                conn.execute(
+                    """
+                    DELETE FROM llm_cache WHERE key IN (
+                        SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_disk_entries,)
+                )
+        finally:
+            conn.close()
+
+    def _remember(self, key: str, created_at: float, value: Any) -> None:
+        if self.max_memory_entries <= 0:
+            return
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters of this process.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "memory_entries": len(self._memory)
+            }
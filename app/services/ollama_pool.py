@@ -0,0 +1,201 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import LLM_HOST_EJECTIONS, LLM_HOST_IN_FLIGHT, LLM_HOST_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+module_name = "ollama_pool"
+
+# Weight of the newest request in a host's moving average latency
+LATENCY_ALPHA = 0.3
+
+
+def configured_urls() -> List[str]:
+    """
+    Ollama endpoints from OLLAMA_URLS (comma-separated), or OLLAMA_URL.
+    """
+    urls = [url.strip().rstrip("/") for url in settings.OLLAMA_URLS.split(",") if url.strip()]
+    return urls or [settings.OLLAMA_URL.rstrip("/")]
+
+
+def is_host_failure(error: BaseException) -> bool:
+    """
+    Whether an error says something about the host (unreachable, timed out,
+    overloaded) rather than about the request.
+    """
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return False
+
+
+class OllamaHost:
+    """Load and health of one Ollama endpoint."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.in_flight = 0
+        # Moving average of request durations in seconds, None until the first request
+        self.latency: float | None = None
+        self.failures = 0
+        self.healthy = True
+        self.ejected_at: float | None = None
+
+    def load(self, default_latency: float) -> float:
+        """
+        Expected wait for one more request: requests in flight (plus this one)
+        times the recent latency, or default_latency before the first request.
+        """
+        return (self.in_flight + 1) * (self.latency if self.latency is not None else default_latency)
+
+    def status(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "failures": self.failures
+        }
+
+
+class OllamaHostPool:
+    """
+    Routes LLM requests over several Ollama endpoints.
+
+    Every request goes to the healthy host with the least expected wait. A host
+    that fails OLLAMA_EJECT_AFTER requests in a row is ejected; a background
+    thread probes ejected hosts every OLLAMA_HEALTH_INTERVAL seconds and takes
+    them back once they answer. When every host is ejected, requests are still
+    sent (to the host ejected longest ago) instead of failing outright.
+
+    The bookkeeping is thread-safe, so several threads and event loops can
+    share one pool.
+    """
+
+    def __init__(self, urls: List[str] | None = None):
+        self.hosts = [OllamaHost(url) for url in (urls or configured_urls())]
+        self._lock = threading.Lock()
+        self._prober: threading.Thread | None = None
+
+    def choose(self, exclude: tuple[str, ...] = ()) -> OllamaHost:
+        """
+        The host the next request should go to, skipping the urls in exclude
+        (hosts that already failed this request) while others are left.
+        """
+        with self._lock:
+            candidates = [host for host in self.hosts if host.url not in exclude] or self.hosts
+            healthy = [host for host in candidates if host.healthy]
+            if healthy:
+                # Hosts without latency data are assumed to be as fast as the average
+                known = [host.latency for host in healthy if host.latency is not None]
+                default_latency = sum(known) / len(known) if known else 1.0
+                return min(healthy, key=lambda host: host.load(default_latency))
+            return min(candidates, key=lambda host: host.ejected_at or 0.0)
+
+    @contextmanager
+    def lease(self, exclude: tuple[str, ...] = ()) -> Iterator[OllamaHost]:
+        """
+        Pick a host and account the request made within the block to it: in-flight
+        count, latency on success, failures (and ejection) on host errors.
+        """
+        host = self.choose(exclude)
+        with self._lock:
+            host.in_flight += 1
+        LLM_HOST_IN_FLIGHT.labels(host.url).inc()
+        start = time.perf_counter()
+        try:
+            yield host
+        except Exception as e:
+            if is_host_failure(e):
+                self.record_failure(host, e)
+            else:
+                LLM_HOST_REQUESTS.labels(host.url, "error").inc()
+            raise
+        else:
+            self.record_success(host, time.perf_counter() - start)
+        finally:
+            with self._lock:
+                host.in_flight -= 1
+            LLM_HOST_IN_FLIGHT.labels(host.url).dec()
+
+    def record_success(self, host: OllamaHost, duration: float) -> None:
+        with self._lock:
+            host.latency = duration if host.latency is None else (
+                LATENCY_ALPHA * duration + (1 - LATENCY_ALPHA) * host.latency
+            )
+            host.failures = 0
+        LLM_HOST_REQUESTS.labels(host.url, "ok").inc()
+
+    def record_failure(self, host: OllamaHost, error: BaseException) -> None:
+        LLM_HOST_REQUESTS.labels(host.url, "error").inc()
+        with self._lock:
+            host.failures += 1
+            if not host.healthy or host.failures < settings.OLLAMA_EJECT_AFTER:
+                return
+            host.healthy = False
+            host.ejected_at = time.time()
+        LLM_HOST_EJECTIONS.labels(host.url).inc()
+        logger.warning("Ejected Ollama host %s after %s failures: %s", host.url, host.failures, error)
+        self._start_prober()
+
+    def _start_prober(self) -> None:
+        with self._lock:
+            if self._prober is None:
+                self._prober = threading.Thread(target=self._probe_loop, name=module_name, daemon=True)
+                self._prober.start()
+
+    def _probe_loop(self) -> None:
+        """
+        Probe ejected hosts until all of them are back.
+        """
+        with httpx.Client(timeout=settings.OLLAMA_CONNECT_TIMEOUT) as client:
+            while True:
+                time.sleep(settings.OLLAMA_HEALTH_INTERVAL)
+                with self._lock:
+                    ejected = [host for host in self.hosts if not host.healthy]
+                    if not ejected:
+                        self._prober = None
+                        return
+                for host in ejected:
+                    if self.probe(client, host):
+                        with self._lock:
+                            host.healthy = True
+                            host.failures = 0
+                            host.ejected_at = None
+                        logger.info("Ollama host %s is healthy again", host.url)
+
+    def probe(self, client: httpx.Client, host: OllamaHost) -> bool:
+        """
+        Whether the host answers its model list.
+        """
+        try:
+            return client.get(f"{host.url}/api/tags").status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    def status(self) -> List[dict]:
+        """
+        Health and load of every host.
+        """
+        with self._lock:
+            return [host.status() for host in self.hosts]
+
+
+_pool: OllamaHostPool | None = None
+
+
+def get_ollama_pool() -> OllamaHostPool:
+    """
+    Get the process-wide pool of Ollama hosts.
+    """
+    global _pool
+    if _pool is None:
+        _pool = OllamaHostPool()
+    return _pool
@@ -1,62 +1,330 @@
 import json
-from typing import Dict, Any, List
-from langchain.llms import Ollama
-from langchain.callbacks.manager import CallbackManager
-from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict, Any, List, AsyncIterator, Callable
+import httpx
 
 from app.core.config import settings
+from app.core.metrics import observe, record_cache
+from app.models.conversation import GeneratedConversation
+from app.services.llm_cache import LLMResponseCache, hash_text
+from app.services.ollama_pool import OllamaHost, get_ollama_pool, is_host_failure
+from app.services.vocabulary_ranker import get_vocabulary_ranker
+from app.utils.file_processing import process_markdown_text
+from app.utils.json_stream import ConversationStreamParser
+
+logger = logging.getLogger(__name__)
+
+# Bump when a prompt template changes so cached responses of the old prompt are not reused
+PICK_WORDS_PROMPT_VERSION = "3"
+CONVERSATION_PROMPT_VERSION = "1"
+
+class ConversationGenerationError(RuntimeError):
+    """Raised when no valid conversation could be generated within the retry budget."""
 
 class OllamaService:
     """Service for interacting with Ollama LLM."""
-    
+
     def __init__(self):
         """Initialize the Ollama service."""
-        self.llm = Ollama(
-            model=settings.OLLAMA_MODEL,
-            callback_manager=CallbackManager([StreamingStdOutCallbackHandler()]),
+        # Requests are spread over the hosts of OLLAMA_URLS (or OLLAMA_URL)
+        self.pool = get_ollama_pool()
+        # Pooled keep-alive HTTP client per host, created on first use
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self.cache = LLMResponseCache() if settings.LLM_CACHE_ENABLED else None
+
+    def _words_cache_key(self, text: str, grade: int, mode: str = "llm") -> str:
+        return LLMResponseCache.make_key(
+            "pick_words", settings.OLLAMA_MODEL, PICK_WORDS_PROMPT_VERSION, mode, grade, hash_text(text)
+        )
+
+    def _conversation_cache_key(self, words: List[str], grade: int) -> str:
+        return LLMResponseCache.make_key(
+            "conversation", settings.OLLAMA_MODEL, CONVERSATION_PROMPT_VERSION, grade, hash_text(json.dumps(words))
         )
-        
-    def pick_words(self, text: str, grade: int) -> List[str]:
+
+    def _cache_get(self, key: str, use_cache: bool) -> Any | None:
+        if self.cache is None or not use_cache:
+            return None
+        value = self.cache.get(key)
+        record_cache("llm", value is not None)
+        return value
+
+    def _cache_set(self, key: str, value: Any) -> None:
+        if self.cache is not None:
+            self.cache.set(key, value)
+
+    def _get_client(self, url: str) -> httpx.AsyncClient:
+        """
+        Get the shared async HTTP client for an Ollama host.
+        """
+        client = self._clients.get(url)
+        if client is None or client.is_closed:
+            client = self._clients[url] = httpx.AsyncClient(
+                base_url=url,
+                timeout=httpx.Timeout(settings.OLLAMA_TIMEOUT, connect=settings.OLLAMA_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.OLLAMA_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.OLLAMA_MAX_CONNECTIONS,
+                    keepalive_expiry=settings.OLLAMA_KEEPALIVE_EXPIRY
+                )
+            )
+        return client
+
+    async def aclose(self) -> None:
+        """
+        Close the async HTTP clients and their pooled connections.
+        """
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    def _fail_over(self, host: OllamaHost, error: Exception, failed: tuple[str, ...]) -> bool:
+        """
+        Whether a failed request should be sent again to another host: only for
+        host errors, and only while there are hosts it has not failed on.
+        """
+        if not is_host_failure(error) or len(failed) >= len(self.pool.hosts):
+            return False
+        logger.warning("Ollama host %s failed, retrying on another host: %s", host.url, error)
+        return True
+
+    def _payload(self, prompt: str, stream: bool, format: str | dict | None) -> dict:
+        payload = {
+            "model": settings.OLLAMA_MODEL,
+            "prompt": prompt,
+            "stream": stream
+        }
+        if format is not None:
+            payload["format"] = format
+        return payload
+
+    async def agenerate(self, prompt: str, timeout: float | None = None, format: str | dict | None = None) -> str:
+        """
+        Run a single non-streaming generation against the Ollama API without
+        blocking the event loop.
+        """
+        with observe("llm_request"):
+            failed: tuple[str, ...] = ()
+            while True:
+                try:
+                    with self.pool.lease(failed) as host:
+                        response = await self._get_client(host.url).post(
+                            "/api/generate",
+                            json=self._payload(prompt, False, format),
+                            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+                        )
+                        response.raise_for_status()
+                        return response.json().get("response", "")
+                except Exception as e:
+                    failed += (host.url,)
+                    if not self._fail_over(host, e, failed):
+                        raise
+
+    async def astream(self, prompt: str, timeout: float | None = None, format: str | dict | None = None) -> AsyncIterator[str]:
+        """
+        Run a streaming generation against the Ollama API, yielding the
+        response text piece by piece as the model produces it.
+        A request is moved to another host only before its first piece.
+        """
+        with observe("llm_request"):
+            failed: tuple[str, ...] = ()
+            while True:
+                streamed = False
+                try:
+                    with self.pool.lease(failed) as host:
+                        async with self._get_client(host.url).stream(
+                            "POST",
+                            "/api/generate",
+                            json=self._payload(prompt, True, format),
+                            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+                        ) as response:
+                            response.raise_for_status()
+                            async for line in response.aiter_lines():
+                                if not line.strip():
+                                    continue
+                                data = json.loads(line)
+                                if data.get("error"):
+                                    raise RuntimeError(data["error"])
+                                streamed = True
+                                yield data.get("response", "")
+                                if data.get("done"):
+                                    break
+                        return
+                except Exception as e:
+                    failed += (host.url,)
+                    if streamed or not self._fail_over(host, e, failed):
+                        raise
+
+    def _conversation_format(self) -> str | dict | None:
         """
-        Pick 10 words from the text.
+        The Ollama "format" option for conversations, from OLLAMA_STRUCTURED_OUTPUT.
         """
-        
-        print("Using model", settings.OLLAMA_MODEL)
-        prompt = f"""
+        if settings.OLLAMA_STRUCTURED_OUTPUT == "schema":
+            return GeneratedConversation.model_json_schema()
+        if settings.OLLAMA_STRUCTURED_OUTPUT == "json":
+            return "json"
+        return None
+
+    def _pick_words_prompt(self, text: str, grade: int) -> str:
+        return f"""
             Given the following text from grade {grade}, please:
             1. Select exactly 10 words that would be appropriately challenging for a grade {grade} student
             2. Choose words that are important for vocabulary building and academic success
             3. Return only the selected words as a comma-separated list, with no other text
             4. Format example: word1, word2, word3, word4, word5, word6, word7, word8, word9, word10
-            
+
             Text: {text}
         """
+
+    def _candidate_words_prompt(self, text: str, grade: int, count: int) -> str:
+        return f"""
+            Given the following excerpt from a grade {grade} lesson, please:
+            1. List up to {count} words that would be appropriately challenging for a grade {grade} student
+            2. Choose words that are important for vocabulary building and academic success
+            3. Return only the selected words as a comma-separated list, with no other text
+
+            Text: {text}
+        """
+
+    def _merge_words_prompt(self, candidates: List[str], grade: int) -> str:
+        return f"""
+            The following candidate vocabulary words were collected from a grade {grade} lesson.
+            1. Select exactly 10 words that would be appropriately challenging for a grade {grade} student
+            2. Prefer words that are important for vocabulary building and academic success
+            3. Return only the selected words as a comma-separated list, with no other text
+            4. Format example: word1, word2, word3, word4, word5, word6, word7, word8, word9, word10
+
+            Candidates: {', '.join(candidates)}
+        """
+
+    def _parse_word_list(self, response: str, limit: int) -> List[str]:
+        # Clean and process the response
+        words = [word.strip() for word in response.strip('[]"\' ').split(',')]
+        words = [word for word in words if word]
+        return words[:limit] if len(words) > limit else words
+
+    def _parse_words(self, response: str) -> List[str]:
+        # Ensure we have exactly 10 words
+        return self._parse_word_list(response, 10)
+
+    async def apick_words(self, text: str, grade: int, timeout: float | None = None, use_cache: bool = True) -> List[str]:
+        """
+        Pick 10 words from the text without blocking the event loop.
+        How much of the work is left to the model depends on WORD_PICK_MODE.
+        Set use_cache=False to force a fresh generation.
+        """
+
+        mode = settings.WORD_PICK_MODE
+        if mode == "fast":
+            # Local ranking is cheap enough that caching it is not worth it
+            return await asyncio.to_thread(get_vocabulary_ranker().rank, text, grade, 10)
+
+        cache_key = self._words_cache_key(text, grade, mode)
+        cached = self._cache_get(cache_key, use_cache)
+        if cached is not None:
+            return cached
+
+        logger.debug("Using model %s", settings.OLLAMA_MODEL)
         try:
-            response = self.llm.invoke(prompt)
-            # Clean and process the response
-            words = [word.strip() for word in response.strip('[]"\' ').split(',')]
-            # Ensure we have exactly 10 words
-            words = words[:10] if len(words) > 10 else words
+            chunks = process_markdown_text(text)
+            if len(chunks) > 1:
+                # Long lessons are picked per chunk in both modes, so every part of the lesson is represented
+                words = await self._map_reduce_words(chunks, grade, timeout, local=mode == "hybrid")
+            elif mode == "hybrid":
+                words = await self._shortlist_words(text, grade, timeout)
+            else:
+                prompt = self._pick_words_prompt(chunks[0] if chunks else text, grade)
+                words = self._parse_words(await self.agenerate(prompt, timeout=timeout))
+            if words:
+                self._cache_set(cache_key, words)
             return words
         except Exception as e:
-            print(f"Error picking words: {str(e)}")
+            logger.error("Error picking words: %s", e)
             return []
-    
-    def generate_conversation_from_words(self, words: List[str], grade: int) -> Dict[str, Any]:
+
+    async def _shortlist_words(self, text: str, grade: int, timeout: float | None = None) -> List[str]:
         """
-        Generate conversation for practice using Ollama.
+        Rank the lesson's words locally and let the model choose the final 10
+        from the shortlist only, instead of sending it the whole lesson.
         """
-        
-        prompt = f"""
+        shortlist = await asyncio.to_thread(
+            get_vocabulary_ranker().rank, text, grade, settings.WORD_PICK_SHORTLIST
+        )
+        if len(shortlist) <= 10:
+            return shortlist
+
+        try:
+            response = await self.agenerate(self._merge_words_prompt(shortlist, grade), timeout=timeout)
+            words = self._parse_words(response)
+        except Exception as e:
+            logger.error("Error picking words from shortlist: %s", e)
+            words = []
+        return words or shortlist[:10]
+
+    async def _map_reduce_words(self, chunks: List[str], grade: int, timeout: float | None = None,
+                                local: bool = False) -> List[str]:
+        """
+        Pick words from a long lesson: collect candidates from every chunk
+        concurrently (map), then let the model choose the final 10 (reduce).
+        With local, the local ranker picks each chunk's candidates instead of
+        the model (WORD_PICK_MODE=hybrid).
+        """
+        logger.debug("Picking words from %s chunks", len(chunks))
+        semaphore = asyncio.Semaphore(settings.WORD_PICK_MAP_CONCURRENCY)
+        count = settings.WORD_PICK_CANDIDATES_PER_CHUNK
+
+        async def candidates_for(chunk: str) -> List[str]:
+            if local:
+                return await asyncio.to_thread(get_vocabulary_ranker().rank, chunk, grade, count)
+            async with semaphore:
+                try:
+                    response = await self.agenerate(self._candidate_words_prompt(chunk, grade, count), timeout=timeout)
+                    return self._parse_word_list(response, count)
+                except Exception as e:
+                    logger.error("Error picking candidate words from chunk: %s", e)
+                    return []
+
+        chunk_candidates = await asyncio.gather(*[candidates_for(chunk) for chunk in chunks])
+
+        # Words suggested for several chunks come first; ties keep document order
+        counts = Counter()
+        spelling = {}
+        for candidates in chunk_candidates:
+            for word in candidates:
+                key = word.lower()
+                counts[key] += 1
+                spelling.setdefault(key, word)
+        if not counts:
+            raise RuntimeError("No candidate words found in any chunk")
+        order = {key: position for position, key in enumerate(spelling)}
+        ranked = sorted(counts, key=lambda key: (-counts[key], order[key]))
+        merged = [spelling[key] for key in ranked]
+        if len(merged) <= 10:
+            return merged
+
+        # Bound the reduce prompt regardless of document length
+        shortlist = merged[:count * 4]
+        try:
+            response = await self.agenerate(self._merge_words_prompt(shortlist, grade), timeout=timeout)
+            words = self._parse_words(response)
+        except Exception as e:
+            logger.error("Error merging candidate words: %s", e)
+            words = []
+        return words or merged[:10]
+
+    def _conversation_prompt(self, words: List[str], grade: int) -> str:
+        return f"""
             You are helping create educational content for grade {grade} students.
             Given these vocabulary words: {', '.join(words)}
-            
+
             Create a natural conversation between two students that:
-            1. Uses all the vocabulary words naturally and appropriately 
+            1. Uses all the vocabulary words naturally and appropriately
             2. Has at least 5 sentences for each student
             3. Focuses on topics relevant to grade {grade} students
             4. Includes subtle context clues for the vocabulary words
-            
+
             Return ONLY a JSON object with this exact format:
             {{
                 "conversation": [
@@ -66,36 +334,138 @@ class OllamaService:
                     {{"speaker": "Student2", "text": "Response"}}
                 ]
             }}
-            
+
             The conversation should flow naturally while incorporating the vocabulary words. Do not include any other text or explanation.
         """
-        
-        try:
-            # Get response from Ollama
-            response = self.llm.invoke(prompt)
-            
-            # Extract JSON from the response
-            # Find the first occurrence of '{' and the last occurrence of '}'
-            start_idx = response.find('{')
-            end_idx = response.rfind('}') + 1
-            
-            if start_idx != -1 and end_idx != -1:
-                json_str = response[start_idx:end_idx]
-                result = json.loads(json_str)
-                return result
-            else:
-                # If JSON parsing fails, create a structured response
-                return {
-                    "conversation": {
-                        "system": "Failed to generate a proper conversation. Please try again."
-                    },
-                    "raw_response": response
-                }
-                
-        except Exception as e:
-            # Handle any exceptions
-            return {
-                "conversation": {
-                    "system": f"An error occurred: {str(e)}"
-                }
-            } 
\ No newline at end of file
+
+    def _continue_conversation_prompt(self, grade: int, lines: List[dict], missing_words: List[str], count: int) -> str:
+        words_instruction = (
+            f"3. Naturally uses these vocabulary words that have not been used yet: {', '.join(missing_words)}"
+            if missing_words else "3. Keeps using the vocabulary words naturally"
+        )
+        return f"""
+            You are helping create educational content for grade {grade} students.
+            Here is a conversation between two students so far:
+            {json.dumps({"conversation": lines}, ensure_ascii=False)}
+
+            Write the next {count} lines of this conversation. The new lines:
+            1. Continue naturally from the last line
+            2. Alternate between the speakers Student1 and Student2
+            {words_instruction}
+
+            Return ONLY a JSON object with the new lines in this exact format:
+            {{
+                "conversation": [
+                    {{"speaker": "Student1", "text": "Next line"}},
+                    {{"speaker": "Student2", "text": "Response"}}
+                ]
+            }}
+
+            Do not repeat earlier lines and do not include any other text or explanation.
+        """
+
+    def _missing_words(self, words: List[str], lines: List[dict]) -> List[str]:
+        text = " ".join(line["text"] for line in lines).lower()
+        return [word for word in words if word.lower() not in text]
+
+    def _next_conversation_prompt(self, words: List[str], grade: int, lines: List[dict], attempt: int) -> str | None:
+        """
+        Prompt for the part of the conversation that is still missing (too few
+        valid lines, or unused vocabulary words), or None when the conversation
+        is complete or the retry budget is spent.
+        """
+        missing_lines = settings.CONVERSATION_MIN_LINES - len(lines)
+        missing_words = self._missing_words(words, lines)
+        if (missing_lines <= 0 and not missing_words) or attempt >= settings.CONVERSATION_MAX_RETRIES:
+            return None
+
+        logger.info("Conversation incomplete (%s valid lines, %s unused words), requesting the rest", len(lines), len(missing_words))
+        if not lines:
+            return self._conversation_prompt(words, grade)
+        return self._continue_conversation_prompt(grade, lines, missing_words, max(missing_lines, 2))
+
+    def _conversation_result(self, lines: List[dict]) -> Dict[str, Any]:
+        if len(lines) < settings.CONVERSATION_MIN_LINES:
+            raise ConversationGenerationError(
+                f"Generated only {len(lines)} valid conversation line(s), "
+                f"at least {settings.CONVERSATION_MIN_LINES} are required"
+            )
+        return {"conversation": lines}
+
+    async def agenerate_conversation_from_words(self,
+                                                words: List[str],
+                                                grade: int,
+                                                timeout: float | None = None,
+                                                use_cache: bool = True,
+                                                on_line: Callable[[dict], None] | None = None) -> Dict[str, Any]:
+        """
+        Generate conversation for practice using Ollama without blocking the event loop.
+
+        The response is constrained to JSON (OLLAMA_STRUCTURED_OUTPUT), streamed and
+        validated line by line, so a malformed line or a truncated response only
+        costs the missing part: it is requested again with a continuation prompt,
+        at most CONVERSATION_MAX_RETRIES times. Raises ConversationGenerationError
+        if no valid conversation comes out.
+
+        on_line is called with each valid line as soon as it has been generated
+        (not on a cache hit); every line passed to it is part of the final result.
+        Set use_cache=False to force a fresh generation.
+        """
+
+        cache_key = self._conversation_cache_key(words, grade)
+        cached = self._cache_get(cache_key, use_cache)
+        if cached is not None:
+            return cached
+
+        lines = []
+        prompt = self._conversation_prompt(words, grade)
+        attempt = 0
+        while prompt is not None:
+            parser = ConversationStreamParser()
+            try:
+                async for piece in self.astream(prompt, timeout=timeout, format=self._conversation_format()):
+                    for line in parser.feed(piece):
+                        if on_line is not None:
+                            on_line(line)
+            except Exception as e:
+                # Lines parsed before the failure are kept
+                logger.error("Error generating conversation: %s", e)
+            for error in parser.errors:
+                logger.warning("%s", error)
+            lines.extend(parser.lines)
+            prompt = self._next_conversation_prompt(words, grade, lines, attempt)
+            attempt += 1
+
+        result = self._conversation_result(lines)
+        self._cache_set(cache_key, result)
+        return result
+
+    async def awarm_up(self, timeout: float | None = None) -> None:
+        """
+        Make one tiny generation on every Ollama host, so each has the model
+        loaded before the first job. Failures are logged, not raised.
+        """
+        async def warm_up(url: str) -> None:
+            try:
+                response = await self._get_client(url).post(
+                    "/api/generate",
+                    json=self._payload("Reply with OK.", False, None),
+                    timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+                )
+                response.raise_for_status()
+            except Exception as e:
+                logger.warning("Ollama warm-up on %s failed: %s", url, e)
+
+        with observe("llm_warmup"):
+            await asyncio.gather(*[warm_up(host.url) for host in self.pool.hosts])
+
+_service: OllamaService | None = None
+
+def get_ollama_service() -> OllamaService:
+    """
+    Get the process-wide Ollama service, created on first use.
+    """
+    global _service
+    if _service is None:
+        _service = OllamaService()
+    return _service
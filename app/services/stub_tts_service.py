@@ -0,0 +1,108 @@
+import time
+import logging
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any
+import numpy as np
+
+from app.core.config import settings
+from app.services.tts_acceleration import get_profile
+from app.services.tts_cache import TTSAudioCache
+from app.services.tts_service import TTSService
+from app.services.voice_registry import VoiceRegistry
+
+module_name = "stub_tts_service"
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 24000
+# Roughly 150 words per minute of speech
+WORDS_PER_SECOND = 2.5
+
+
+class StubChat:
+    """
+    Stand-in for ChatTTS.Chat that produces a tone instead of speech.
+
+    Refinement takes TTS_STUB_REFINE_MS per text. Inference sleeps TTS_STUB_RTF
+    times the duration of the longest audio of the batch, like batched inference
+    on the real model, so throughput and batching behave realistically without
+    loading the model.
+    """
+
+    def __init__(self, rtf: float | None = None, refine_ms: float | None = None):
+        self.rtf = settings.TTS_STUB_RTF if rtf is None else rtf
+        self.refine_seconds = (settings.TTS_STUB_REFINE_MS if refine_ms is None else refine_ms) / 1000
+
+    def _wave(self, text: str) -> np.ndarray:
+        seconds = max(0.5, len(text.split()) / WORDS_PER_SECOND)
+        samples = np.arange(int(seconds * SAMPLE_RATE), dtype=np.float32)
+        return (0.1 * np.sin(2 * np.pi * 220 * samples / SAMPLE_RATE)).astype(np.float32)
+
+    def infer(self, text, stream=False, refine_text_only=False, **kwargs):
+        if refine_text_only:
+            time.sleep(self.refine_seconds * len(text))
+            return list(text)
+
+        waves = [self._wave(item) for item in text]
+        longest = max((len(wave) for wave in waves), default=0) / SAMPLE_RATE
+        if not stream:
+            time.sleep(self.rtf * longest)
+            return waves
+        return self._stream(waves, longest)
+
+    def _stream(self, waves: list[np.ndarray], longest: float, parts: int = 4):
+        for part in range(parts):
+            time.sleep(self.rtf * longest / parts)
+            yield [wave[part * len(wave) // parts:(part + 1) * len(wave) // parts] for wave in waves]
+
+
+@dataclass
+class StubRefineTextParams:
+    """Stand-in for ChatTTS.Chat.RefineTextParams."""
+    prompt: str = ""
+    top_P: float = 0.7
+    top_K: int = 20
+
+
+@dataclass
+class StubInferCodeParams:
+    """Stand-in for ChatTTS.Chat.InferCodeParams."""
+    prompt: str = ""
+    spk_emb: Any = None
+    temperature: float = 0.3
+
+
+class StubTTSService(TTSService):
+    """
+    TTS service without the model (TTS_BACKEND=stub), for benchmarks and
+    development. Caching, file writing and metrics are the real code paths;
+    neither torch nor ChatTTS is imported.
+    """
+
+    def __init__(self, saveFilePath="output/", voice=None, fixSpkStyle=True, acceleration=None, **kwargs):
+        self.modelPath = None
+        self.wavfilePath = saveFilePath
+        self.fixSpkStyle = fixSpkStyle
+        self.cache = TTSAudioCache() if settings.TTS_CACHE_ENABLED else None
+        # Validated and reported like the real service, but there is no model to apply it to
+        self.acceleration = get_profile(acceleration)
+        self.loadSeconds = 0.0
+        self.chat = StubChat()
+        self.params_refine_text = self.buildRefineTextConf()
+        # Voice names stand in for the embeddings, so cache keys still differ per voice
+        self.voices = VoiceRegistry(load=False)
+        self.params_infer_code = self.newInferCodeParams(
+            spk_emb=self.voices.get(voice),
+            temperature=0.3,
+            prompt="[speed_5]"
+        )
+        logger.info("Using the stub TTS backend (real-time factor %s)", self.chat.rtf)
+
+    def newRefineTextParams(self, **kwargs):
+        return StubRefineTextParams(**kwargs)
+
+    def newInferCodeParams(self, **kwargs):
+        return StubInferCodeParams(**kwargs)
+
+    def inferenceContext(self):
+        return nullcontext()
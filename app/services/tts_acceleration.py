@@ -0,0 +1,131 @@
+import os
+import sys
+import logging
+import resource
+from contextlib import nullcontext
+from dataclasses import dataclass
+
+from app.core.config import settings
+
+module_name = "tts_acceleration"
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AccelerationProfile:
+    """CPU inference settings a TTS worker applies to ChatTTS."""
+    name: str
+    # Set torch intra/inter-op thread counts (TTS_INTRA_OP_THREADS, TTS_INTER_OP_THREADS)
+    tune_threads: bool = False
+    # Run inference under torch.inference_mode
+    inference_mode: bool = False
+    # Dynamic int8 quantization of the linear layers (TTS_QUANTIZE_MODULES)
+    quantize: bool = False
+    # torch.compile the GPT backbone (falls back to eager if compilation fails)
+    compile: bool = False
+
+
+PROFILES = {profile.name: profile for profile in (
+    AccelerationProfile("default"),
+    AccelerationProfile("tuned", tune_threads=True, inference_mode=True),
+    AccelerationProfile("int8", tune_threads=True, inference_mode=True, quantize=True),
+    AccelerationProfile("compiled", tune_threads=True, inference_mode=True, compile=True),
+    AccelerationProfile("int8-compiled", tune_threads=True, inference_mode=True, quantize=True, compile=True),
+)}
+
+
+def get_profile(name: str | None = None) -> AccelerationProfile:
+    """
+    Get an acceleration profile by name (default TTS_ACCELERATION).
+    Raises ValueError for unknown profiles.
+    """
+    name = name or settings.TTS_ACCELERATION
+    if name not in PROFILES:
+        raise ValueError(f"Unknown TTS acceleration profile: {name}. Available: {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+def thread_counts() -> tuple[int, int]:
+    """
+    (intra-op, inter-op) torch threads per TTS worker. Without
+    TTS_INTRA_OP_THREADS the CPUs are split evenly over all TTS workers
+    (job workers' and the API's), so workers do not oversubscribe the cores.
+    """
+    intra = settings.TTS_INTRA_OP_THREADS
+    if intra <= 0:
+        workers = max(1, settings.JOB_WORKERS * settings.TTS_WORKERS + settings.API_TTS_WORKERS)
+        intra = max(1, (os.cpu_count() or 1) // workers)
+    return intra, max(1, settings.TTS_INTER_OP_THREADS)
+
+
+def configure_threads(profile: AccelerationProfile) -> None:
+    """
+    Apply the profile's thread counts. Call before the model is loaded: torch
+    only accepts the inter-op count before its first parallel work.
+    """
+    if not profile.tune_threads:
+        return
+    import torch
+    intra, inter = thread_counts()
+    torch.set_num_threads(intra)
+    try:
+        torch.set_num_interop_threads(inter)
+    except RuntimeError as e:
+        logger.warning("Could not set inter-op threads to %s: %s", inter, e)
+
+
+def accelerate_model(chat, profile: AccelerationProfile) -> None:
+    """
+    Quantize and/or compile the modules of a loaded ChatTTS.Chat in place.
+    """
+    import torch
+    if profile.quantize:
+        if "cpu" not in str(chat.device):
+            logger.warning("Dynamic int8 quantization only runs on CPU, not on %s; skipped", chat.device)
+        else:
+            for name in filter(None, (name.strip() for name in settings.TTS_QUANTIZE_MODULES.split(","))):
+                module = _submodule(chat, name)
+                if module is None:
+                    logger.warning("No module %s to quantize", name)
+                    continue
+                try:
+                    torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+                except Exception as e:
+                    logger.warning("Could not quantize %s: %s", name, e)
+    if profile.compile:
+        import torch._dynamo
+        # Compilation happens on the first call; run those calls eagerly if it fails
+        torch._dynamo.config.suppress_errors = True
+        try:
+            chat.gpt.gpt.compile(backend="inductor", dynamic=True)
+        except Exception as e:
+            logger.warning("Could not compile the GPT backbone: %s", e)
+
+
+def _submodule(chat, name: str):
+    """Module at a dotted path of the Chat object ("gpt.gpt", "decoder"), if any."""
+    module = chat
+    for part in name.split("."):
+        module = getattr(module, part, None)
+        if module is None:
+            return None
+    return module
+
+
+def inference_context(profile: AccelerationProfile):
+    """
+    Context manager for inference calls under the profile.
+    """
+    if not profile.inference_mode:
+        return nullcontext()
+    import torch
+    return torch.inference_mode()
+
+
+def peak_rss_bytes() -> int:
+    """
+    Peak resident memory of this process.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
@@ -0,0 +1,13 @@
+from app.core.config import settings
+
+
+def create_tts_service(**kwargs):
+    """
+    Create the TTS service selected by TTS_BACKEND: chattts (default) or stub.
+    Keyword arguments are passed to the service.
+    """
+    if settings.TTS_BACKEND == "stub":
+        from app.services.stub_tts_service import StubTTSService
+        return StubTTSService(**kwargs)
+    from app.services.chattts_service import ChatttsService
+    return ChatttsService(**kwargs)
@@ -0,0 +1,194 @@
+import os
+import re
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+from typing import Any
+
+from app.core.config import settings
+from app.utils.audio_formats import remove_derived
+
+# Bump when the stored audio layout changes so old entries are not served
+CACHE_FORMAT_VERSION = "24000-1"
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different copies of a line share an entry."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _hash_value(value: Any) -> str:
+    """Stable hash of a speaker embedding (string, tensor or array)."""
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+    elif hasattr(value, "detach"):
+        data = value.detach().cpu().numpy().tobytes()
+    elif hasattr(value, "tobytes"):
+        data = value.tobytes()
+    else:
+        data = repr(value).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def describe_params(params: Any) -> dict:
+    """
+    Turn ChatTTS infer/refine parameter objects into a JSON-serializable dict,
+    replacing the speaker embedding by its hash.
+    """
+    if params is None:
+        return {}
+    fields = dict(vars(params)) if hasattr(params, "__dict__") else {"repr": repr(params)}
+    description = {}
+    for name, value in sorted(fields.items()):
+        if name == "spk_emb" and value is not None:
+            description[name] = _hash_value(value)
+        elif isinstance(value, (str, int, float, bool)) or value is None:
+            description[name] = value
+        else:
+            description[name] = repr(value)
+    return description
+
+
+class TTSAudioCache:
+    """
+    On-disk cache of synthesized lines shared by all TTS worker processes.
+
+    Audio files live in TTS_CACHE_DIR and are indexed in a SQLite database there.
+    Files are written to a temporary name and renamed into place, and the index is
+    updated in SQLite transactions, so concurrent workers never see partial entries.
+    The total size is bounded by TTS_CACHE_MAX_BYTES with least-recently-used eviction.
+    """
+
+    def __init__(self, directory: str | None = None, max_bytes: int | None = None):
+        self.directory = directory or settings.TTS_CACHE_DIR
+        self.max_bytes = settings.TTS_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._index_path = os.path.join(self.directory, "index.db")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Recreated on demand, the cache directory may be wiped while workers are running
+        os.makedirs(self.directory, exist_ok=True)
+        conn = sqlite3.connect(self._index_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tts_cache (
+                    key TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_tts_cache_last_access ON tts_cache (last_access)")
+        return conn
+
+    @staticmethod
+    def make_key(text: str, params_infer_code: Any, params_refine_text: Any, audio_format: str = "wav") -> str:
+        """
+        Build the cache key from the cleaned text, speaker embedding, inference
+        parameters and the codec the audio is stored in.
+        """
+        payload = json.dumps(
+            [CACHE_FORMAT_VERSION, audio_format, normalize_text(text), describe_params(params_infer_code), describe_params(params_refine_text)],
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def fetch(self, key: str, dest_path: str) -> bool:
+        """
+        Materialize a cached entry at dest_path (hard link, or copy across devices).
+        Returns False on a miss.
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT filename FROM tts_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE tts_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+        finally:
+            conn.close()
+
+        if row is None:
+            self.misses += 1
+            return False
+
+        cached_path = os.path.join(self.directory, row[0])
+        try:
+            os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+            if os.path.lexists(dest_path):
+                os.remove(dest_path)
+            try:
+                os.link(cached_path, dest_path)
+            except OSError:
+                shutil.copyfile(cached_path, dest_path)
+            remove_derived(dest_path)
+        except FileNotFoundError:
+            # Evicted by another process between the lookup and the link
+            self.misses += 1
+            return False
+
+        self.hits += 1
+        return True
+
+    def store(self, key: str, src_path: str) -> None:
+        """
+        Add a freshly synthesized file to the cache and evict old entries if needed.
+        """
+        filename = f"{key}{os.path.splitext(src_path)[1]}"
+        cached_path = os.path.join(self.directory, filename)
+
+        # Copy (not link) so later writes to src_path can never alter the cached audio
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(src_path, tmp_path)
+            # mkstemp creates owner-only files; cached audio is served like any other output
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, cached_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        size = os.path.getsize(cached_path)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO tts_cache (key, filename, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, filename, size, time.time())
+                )
+                evicted = self._evict(conn)
+        finally:
+            conn.close()
+
+        for name in evicted:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self, conn: sqlite3.Connection) -> list[str]:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM tts_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return []
+
+        evicted = []
+        for key, filename, size in conn.execute(
+            "SELECT key, filename, size FROM tts_cache ORDER BY last_access"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM tts_cache WHERE key = ?", (key,))
+            evicted.append(filename)
+            total -= size
+        return evicted
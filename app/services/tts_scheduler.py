@@ -0,0 +1,262 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+
+from app.core.config import settings
+from app.core.metrics import TTS_BACKLOG, TTS_BATCH_SIZE, FAILURES
+from app.core.tracing import Trace, current_trace
+from app.services.tts_worker_pool import TTSWorkerPool, get_tts_pool
+
+module_name = "tts_scheduler"
+logger = logging.getLogger(__name__)
+
+
+def _freeze(params: dict | None) -> tuple:
+    """Turn an optional parameter dict into a hashable grouping key."""
+    return tuple(sorted((params or {}).items()))
+
+
+@dataclass
+class SynthesisRequest:
+    """A single line waiting to be synthesized."""
+    text: str
+    file_path: str
+    voice: str | None = None
+    infer_code: dict | None = None
+    refine_text: dict | None = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    future: asyncio.Future | None = None
+    # Trace of the job (or request) the line belongs to
+    trace: Trace | None = field(default_factory=current_trace)
+
+    @property
+    def key(self) -> tuple:
+        return (self.voice, _freeze(self.infer_code), _freeze(self.refine_text))
+
+
+class TTSBatchScheduler:
+    """
+    Dynamic micro-batching scheduler in front of the TTS worker pool.
+
+    Lines from every in-flight conversation are collected, grouped by voice and
+    inference parameters (each batch is synthesized with one speaker embedding), sorted by length so batches contain similarly sized
+    texts (less padding in chat.infer), and sent to the pool as one batch.
+
+    A group is dispatched when it reaches TTS_BATCH_SIZE lines or its oldest line
+    has waited TTS_BATCH_MAX_WAIT_MS. At most one batch per pool worker is in
+    flight, so lines keep accumulating into bigger batches while workers are busy.
+    """
+
+    def __init__(self,
+                 pool: TTSWorkerPool | None = None,
+                 max_batch_size: int | None = None,
+                 max_wait_ms: int | None = None):
+        self.pool = pool
+        self.max_batch_size = max(1, max_batch_size or settings.TTS_BATCH_SIZE)
+        self.max_wait = (settings.TTS_BATCH_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000
+
+        self._groups: dict[tuple, list[SynthesisRequest]] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._task: asyncio.Task | None = None
+        self._inflight: set[asyncio.Task] = set()
+
+    @property
+    def backlog(self) -> int:
+        """Number of lines waiting to be batched."""
+        return sum(len(group) for group in self._groups.values())
+
+    def start(self) -> None:
+        """
+        Start the batching loop on the running event loop.
+        """
+        if self._task is not None and not self._task.done():
+            return
+        if self.pool is None:
+            self.pool = get_tts_pool()
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.pool.num_workers)
+        self._task = asyncio.create_task(self._run(), name=module_name)
+
+    async def stop(self, timeout: float | None = None) -> None:
+        """
+        Stop the batching loop and fail any lines that were never dispatched.
+        Batches in flight get up to timeout seconds (default
+        TTS_SHUTDOWN_TIMEOUT) to finish; the rest are cancelled and their
+        lines failed.
+        """
+        timeout = settings.TTS_SHUTDOWN_TIMEOUT if timeout is None else timeout
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        for group in self._groups.values():
+            for request in group:
+                if not request.future.done():
+                    request.future.set_exception(RuntimeError("TTS scheduler stopped"))
+        self._groups.clear()
+        TTS_BACKLOG.set(0)
+
+        if self._inflight:
+            inflight = list(self._inflight)
+            _, pending = await asyncio.wait(inflight, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*inflight, return_exceptions=True)
+
+    async def synthesize(self,
+                         text: str,
+                         file_path: str,
+                         voice: str | None = None,
+                         infer_code: dict | None = None,
+                         refine_text: dict | None = None) -> str | None:
+        """
+        Queue one line for synthesis and wait for it.
+
+        Returns the path of the written audio file, or None if synthesis failed.
+        """
+        self.start()
+        request = SynthesisRequest(
+            text=text,
+            file_path=file_path,
+            voice=voice,
+            infer_code=infer_code,
+            refine_text=refine_text,
+            future=asyncio.get_running_loop().create_future()
+        )
+        self._groups.setdefault(request.key, []).append(request)
+        TTS_BACKLOG.set(self.backlog)
+        self._wakeup.set()
+        return await request.future
+
+    async def _run(self) -> None:
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._next_batch()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _next_batch(self) -> list[SynthesisRequest]:
+        """
+        Wait until some group is full or its oldest line is due, then take a batch from it.
+        """
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            due_key = None
+            next_deadline = None
+
+            for key, group in self._groups.items():
+                if len(group) >= self.max_batch_size:
+                    due_key = key
+                    break
+                deadline = group[0].enqueued_at + self.max_wait
+                if deadline <= now:
+                    due_key = key
+                    break
+                if next_deadline is None or deadline < next_deadline:
+                    next_deadline = deadline
+
+            if due_key is not None:
+                batch = self._take_batch(due_key)
+                TTS_BACKLOG.set(self.backlog)
+                return batch
+
+            timeout = None if next_deadline is None else next_deadline - now
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _take_batch(self, key: tuple) -> list[SynthesisRequest]:
+        group = self._groups.pop(key)
+        if len(group) <= self.max_batch_size:
+            return group
+
+        # Length bucketing: pick the run of similarly sized texts around the
+        # oldest request so it is never starved by newer arrivals.
+        oldest = group[0]
+        by_length = sorted(group, key=lambda request: len(request.text))
+        position = by_length.index(oldest)
+        start = min(max(0, position - self.max_batch_size // 2), len(by_length) - self.max_batch_size)
+        batch = by_length[start:start + self.max_batch_size]
+
+        taken = set(map(id, batch))
+        self._groups[key] = [request for request in group if id(request) not in taken]
+        return batch
+
+    async def _dispatch(self, batch: list[SynthesisRequest]) -> None:
+        first = batch[0]
+        # A batch mixes lines of several jobs: the batch's spans go to each of their traces
+        traces = list({id(request.trace): request.trace for request in batch if request.trace is not None}.values())
+        now = time.monotonic()
+        for request in batch:
+            if request.trace is not None:
+                request.trace.add("tts_queue_wait", time.time() - (now - request.enqueued_at), now - request.enqueued_at)
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            logger.debug("Dispatching TTS batch of %s line(s)", len(batch))
+            TTS_BATCH_SIZE.observe(len(batch))
+            wav_paths = await self.pool.run(
+                traces=traces,
+                texts=[request.text for request in batch],
+                filePaths=[request.file_path for request in batch],
+                inferCode=first.infer_code,
+                refineText=first.refine_text,
+                voice=first.voice
+            )
+            written = set(wav_paths)
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_result(request.file_path if request.file_path in written else None)
+        except Exception as e:
+            FAILURES.labels("tts_batch").inc()
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+        except asyncio.CancelledError:
+            # Cancelled by stop(): the waiting lines must not hang
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(RuntimeError("TTS scheduler stopped"))
+            raise
+        finally:
+            for trace in traces:
+                trace.add("tts_batch", started_at, time.perf_counter() - start, {"lines": len(batch)})
+            self._slots.release()
+            if self._groups:
+                self._wakeup.set()
+
+
+_scheduler: TTSBatchScheduler | None = None
+
+
+def get_tts_scheduler() -> TTSBatchScheduler:
+    """
+    Get the process-wide TTS batching scheduler.
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = TTSBatchScheduler()
+    return _scheduler
+
+
+async def shutdown_tts_scheduler() -> None:
+    """
+    Stop the process-wide TTS batching scheduler if it was created.
+    """
+    global _scheduler
+    if _scheduler is not None:
+        await _scheduler.stop()
+        _scheduler = None
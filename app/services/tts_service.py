@@ -0,0 +1,293 @@
+import os
+import time
+import logging
+from abc import ABC, abstractmethod
+import soundfile
+import numpy as np
+
+from app.core.metrics import observe, record_cache, record_synthesis, record_worker_memory
+from app.services.tts_acceleration import inference_context, peak_rss_bytes
+from app.utils.audio_formats import format_of, storage_extension, write_audio
+from app.utils.audio_stream import to_pcm16
+
+module_name = "tts_service"
+logger = logging.getLogger(__name__)
+
+# Synthesized once when a worker starts (WARMUP_ENABLED)
+WARMUP_TEXT = "Hello, let us practice."
+
+
+class TTSService(ABC):
+    """
+    Synthesis shared by the TTS backends: parameters and voices per call, the
+    audio cache, writing and streaming. Does not import the model stack.
+
+    Backends set chat (an object with ChatTTS's infer()), cache, voices,
+    acceleration, params_refine_text and params_infer_code, and build the
+    engine's parameter objects in newRefineTextParams/newInferCodeParams.
+    """
+
+    @abstractmethod
+    def newRefineTextParams(self, **kwargs):
+        """Text refinement parameters of the engine."""
+
+    @abstractmethod
+    def newInferCodeParams(self, **kwargs):
+        """Inference parameters of the engine."""
+
+    def inferenceContext(self):
+        """Context manager the engine's inference calls run in (acceleration profile)."""
+        return inference_context(self.acceleration)
+
+    def setRefineTextConf(self, oralConf="[oral_0]", laughConf="[laugh_0]", breakConf="[break_0]"):
+        self.params_refine_text = self.buildRefineTextConf(oralConf, laughConf, breakConf)
+
+    def buildRefineTextConf(self, oralConf="[oral_0]", laughConf="[laugh_0]", breakConf="[break_0]"):
+        return self.newRefineTextParams(
+            prompt=f"{oralConf}{laughConf}{breakConf}",
+            top_P=0.7,
+            top_K=20
+        )
+
+    # Optional: Config the speech style with random generation
+    def setInferCode(self, temperature=0.3, top_P=0.7, top_K=20, speed="[speed_5]"):
+        self.params_infer_code = self.buildInferCode(temperature, top_P, top_K, speed)
+
+    def buildInferCode(self, temperature=0.3, top_P=0.7, top_K=20, speed="[speed_5]", voice=None):
+        return self.newInferCodeParams(
+            spk_emb=self.voices.get(voice) if voice else self.params_infer_code.spk_emb,
+            temperature=temperature,
+            prompt=speed
+        )
+
+    def inferParams(self, inferCode=None, voice=None):
+        """
+        Inference parameters for one call: the defaults, or built from
+        setInferCode keyword arguments and a voice preset name.
+        """
+        if not inferCode and not voice:
+            return self.params_infer_code
+        return self.buildInferCode(**(inferCode or {}), voice=voice)
+
+    def refineTexts(self, texts, params_refine_text):
+        """
+        Run only the ChatTTS text refinement step (adds oral/laugh/break tokens),
+        so refinement and code inference can be timed separately.
+        """
+        with observe("tts_refine"), self.inferenceContext():
+            return self.chat.infer(
+                text=texts,
+                refine_text_only=True,
+                params_refine_text=params_refine_text
+            )
+
+    def warmUp(self, text=WARMUP_TEXT):
+        """
+        Run one short synthesis (refine and infer) without writing or caching it,
+        so the first real request does not pay for lazy initialization.
+        
+        Returns the time it took in seconds.
+        """
+        start = time.perf_counter()
+        with observe("tts_warmup"), self.inferenceContext():
+            refined = self.chat.infer(
+                text=[text],
+                refine_text_only=True,
+                params_refine_text=self.params_refine_text
+            )
+            self.chat.infer(
+                text=refined,
+                skip_refine_text=True,
+                stream=False,
+                use_decoder=True,
+                params_infer_code=self.params_infer_code
+            )
+        record_worker_memory(self.acceleration.name, peak_rss_bytes())
+        return time.perf_counter() - start
+
+    def generateSound(self, texts, savePath="output/", filePrefix="output",
+                      filePaths=None, inferCode=None, refineText=None, voice=None):
+        """
+        Generate audio files from text.
+        
+        Args:
+            texts: List of text strings to convert to audio
+            savePath: Directory to save the audio files
+            filePrefix: Prefix for the audio file names
+            filePaths: Optional explicit output path for each text (overrides savePath/filePrefix)
+            inferCode: Optional setInferCode keyword arguments for this call only
+            refineText: Optional setRefineTextConf keyword arguments for this call only
+            voice: Optional voice preset name for this call (default TTS_DEFAULT_VOICE)
+            
+        Returns:
+            List of paths to the generated audio files
+        """
+        # Ensure the save directory exists
+        os.makedirs(savePath, exist_ok=True)
+        
+        # Validate input
+        if not texts or not isinstance(texts, list):
+            logger.warning("Invalid texts input: %s", texts)
+            return []
+        if filePaths is not None and len(filePaths) != len(texts):
+            logger.warning("Got %s file paths for %s texts", len(filePaths), len(texts))
+            return []
+        
+        params_infer_code = self.inferParams(inferCode, voice)
+        params_refine_text = self.buildRefineTextConf(**refineText) if refineText else self.params_refine_text
+            
+        logger.debug("Generating audio for texts: %s (save path: %s, file prefix: %s)", texts, savePath, filePrefix)
+        
+        # Create the full file paths
+        if filePaths is None:
+            filePaths = [os.path.join(savePath, f"{filePrefix}{index}.{storage_extension()}") for index in range(len(texts))]
+        
+        # Serve repeated lines from the audio cache and only synthesize the rest
+        generated = {}
+        cacheKeys = None
+        if self.cache is not None:
+            cacheKeys = [
+                self.cache.make_key(text, params_infer_code, params_refine_text, format_of(filePaths[index]))
+                for index, text in enumerate(texts)
+            ]
+            for index, key in enumerate(cacheKeys):
+                hit = self.cache.fetch(key, filePaths[index])
+                record_cache("tts", hit)
+                if hit:
+                    logger.debug("Audio cache hit for text %s: %s", index, filePaths[index])
+                    generated[index] = filePaths[index]
+        pending = [index for index in range(len(texts)) if index not in generated]
+        
+        try:
+            if pending:
+                # Generate audio using ChatTTS
+                refined = self.refineTexts([texts[index] for index in pending], params_refine_text)
+                start = time.perf_counter()
+                with observe("tts_infer"), self.inferenceContext():
+                    wavs = self.chat.infer(
+                        text=refined,
+                        skip_refine_text=True,
+                        stream=False,
+                        use_decoder=True,
+                        params_infer_code=params_infer_code
+                    )
+                record_synthesis(
+                    time.perf_counter() - start,
+                    sum(np.size(wave) for wave in wavs) / 24000,
+                    self.acceleration.name
+                )
+                record_worker_memory(self.acceleration.name, peak_rss_bytes())
+            else:
+                wavs = []
+            
+            logger.debug("Generated %s audio segments", len(wavs))
+            
+            # Save each audio file and collect paths
+            for (index, wave) in zip(pending, wavs):
+                try:
+                    # Handle different possible wave structures
+                    if isinstance(wave, np.ndarray):
+                        # If it's a NumPy array, use it directly
+                        audio_data = wave
+                    elif isinstance(wave, (list, tuple)) and len(wave) > 0:
+                        # If it's a list or tuple, use the first element
+                        audio_data = wave[0]
+                    else:
+                        # Fallback
+                        audio_data = wave
+                        logger.debug("Using wave %s directly, type: %s", index, type(wave))
+                    
+                    file_path = filePaths[index]
+                    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+                    # The path may be a hard link into the audio cache; never write through it
+                    if os.path.lexists(file_path):
+                        os.remove(file_path)
+                    
+                    # Save the audio file
+                    logger.debug("Saving audio to: %s", file_path)
+                    with observe("audio_write"):
+                        write_audio(file_path, audio_data, 24000)
+                    generated[index] = file_path
+                    
+                    if cacheKeys is not None:
+                        self.cache.store(cacheKeys[index], file_path)
+                    
+                except Exception as e:
+                    logger.error(
+                        "Error processing wave %s (type: %s, shape: %s, dtype: %s): %s",
+                        index, type(wave), getattr(wave, "shape", None), getattr(wave, "dtype", None), e
+                    )
+                    continue
+                
+            return [generated[index] for index in sorted(generated)]
+            
+        except Exception as e:
+            logger.error("Error in generateSound: %s (texts: %s)", e, texts)
+            return [generated[index] for index in sorted(generated)]
+
+    def streamSound(self, text, filePath, inferCode=None, refineText=None, voice=None):
+        """
+        Generate audio for one text in ChatTTS stream mode.
+        
+        Args:
+            text: Text to convert to audio
+            filePath: Path the complete audio file is written to once generation finishes
+            inferCode: Optional setInferCode keyword arguments for this call only
+            refineText: Optional setRefineTextConf keyword arguments for this call only
+            voice: Optional voice preset name for this call (default TTS_DEFAULT_VOICE)
+            
+        Yields:
+            16-bit PCM chunks (bytes) as soon as ChatTTS produces them
+        """
+        params_infer_code = self.inferParams(inferCode, voice)
+        params_refine_text = self.buildRefineTextConf(**refineText) if refineText else self.params_refine_text
+        os.makedirs(os.path.dirname(filePath) or ".", exist_ok=True)
+        
+        cacheKey = None
+        if self.cache is not None:
+            cacheKey = self.cache.make_key(text, params_infer_code, params_refine_text, format_of(filePath))
+            hit = self.cache.fetch(cacheKey, filePath)
+            record_cache("tts", hit)
+            if hit:
+                logger.debug("Audio cache hit for streamed text: %s", filePath)
+                audio_data, _ = soundfile.read(filePath, dtype="float32")
+                yield to_pcm16(audio_data)
+                return
+        
+        logger.debug("Streaming audio for text: %s", text)
+        chunks = []
+        refined = self.refineTexts([text], params_refine_text)
+        stream = self.chat.infer(
+            text=refined,
+            skip_refine_text=True,
+            stream=True,
+            use_decoder=True,
+            params_infer_code=params_infer_code
+        )
+        finished = object()
+        while True:
+            # Inference mode is thread-local state, so only hold it while advancing the
+            # generator, not across the yield to the consumer
+            with self.inferenceContext():
+                wavs = next(stream, finished)
+            if wavs is finished:
+                break
+            if wavs is None or len(wavs) == 0 or wavs[0] is None:
+                continue
+            chunk = np.asarray(wavs[0], dtype=np.float32).reshape(-1)
+            if chunk.size == 0:
+                continue
+            chunks.append(chunk)
+            yield to_pcm16(chunk)
+        
+        if not chunks:
+            raise RuntimeError(f"No audio generated for text: {text}")
+        
+        # Persist the finished utterance like generateSound would
+        if os.path.lexists(filePath):
+            os.remove(filePath)
+        logger.debug("Saving streamed audio to: %s", filePath)
+        with observe("audio_write"):
+            write_audio(filePath, np.concatenate(chunks), 24000)
+        if cacheKey is not None:
+            self.cache.store(cacheKey, filePath)
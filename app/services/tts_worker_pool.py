@@ -0,0 +1,439 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from typing import AsyncIterator, Callable
+import multiprocessing as mp
+import queue
+import threading
+from concurrent.futures import Future
+
+from app.core.config import settings
+from app.core.logging_config import configure_logging
+from app.core.metrics import STAGE_SECONDS
+from app.core.tracing import Trace, current_trace, use_trace
+from app.services.tts_acceleration import peak_rss_bytes
+
+module_name = "tts_worker_pool"
+logger = logging.getLogger(__name__)
+
+# Upper bound of the delay between restarts of a crashing worker, in seconds
+MAX_RESTART_BACKOFF = 60
+
+
+def _worker_main(worker_id: int, job_queue, result_queue, service_kwargs: dict):
+    """
+    Entry point of a TTS worker process.
+
+    Loads the TTS service (ChatttsService, or the stub for TTS_BACKEND=stub)
+    once, warms it up with a short synthesis (WARMUP_ENABLED) and then serves
+    the synthesis jobs the pool assigns to it over its own job queue until it
+    receives the shutdown sentinel (None). "generate" jobs run generateSound; "stream"
+    jobs run streamSound and send each PCM chunk back as it is produced. For
+    traced jobs the spans recorded while running them are sent back before
+    the result.
+    """
+    configure_logging()
+    # Imported here so the parent process never loads torch/ChatTTS for the pool
+    from app.services.tts_backend import create_tts_service
+
+    start = time.perf_counter()
+    try:
+        service = create_tts_service(**service_kwargs)
+    except Exception as e:
+        result_queue.put(("init_error", worker_id, str(e)))
+        return
+    load_seconds = time.perf_counter() - start
+    STAGE_SECONDS.labels("tts_model_load").observe(load_seconds)
+    logger.info(
+        "TTS worker %s loaded the model in %.2fs (acceleration profile %s)",
+        worker_id, load_seconds, service.acceleration.name
+    )
+
+    if settings.WARMUP_ENABLED:
+        try:
+            logger.info(
+                "TTS worker %s warmed up in %.2fs (peak RSS %.0f MB)",
+                worker_id, service.warmUp(), peak_rss_bytes() / 2**20
+            )
+        except Exception as e:
+            # Real jobs may still succeed; they report their own errors
+            logger.warning("TTS worker %s warm-up failed: %s", worker_id, e)
+
+    result_queue.put(("ready", worker_id, None))
+
+    while True:
+        job = job_queue.get()
+        if job is None:
+            break
+
+        job_id, method, kwargs, traced = job
+        trace = Trace() if traced else None
+        try:
+            with use_trace(trace):
+                if method == "stream":
+                    for chunk in service.streamSound(**kwargs):
+                        result_queue.put(("chunk", job_id, chunk))
+                    result = [kwargs["filePath"]]
+                else:
+                    result = service.generateSound(**kwargs)
+        except Exception as e:
+            kind, result = "error", str(e)
+        else:
+            kind = "done"
+        if trace is not None:
+            result_queue.put(("spans", job_id, trace.drain()))
+        result_queue.put((kind, job_id, result))
+
+
+class TTSWorkerPool:
+    """
+    Long-lived pool of warm ChatTTS worker processes.
+
+    Each worker loads the model and voice preset once at startup. Jobs wait in
+    the parent until a worker is idle and are then handed to that worker's own
+    queue, so the pool always knows which job each worker holds. Crashed
+    workers are restarted with exponential backoff and the job they held is
+    re-queued (up to TTS_JOB_MAX_ATTEMPTS attempts). A worker that keeps dying
+    without becoming ready (TTS_WORKER_MAX_RESTARTS) fails the pool.
+    """
+
+    def __init__(self, num_workers: int | None = None, service_kwargs: dict | None = None):
+        self.num_workers = max(1, num_workers or settings.TTS_WORKERS)
+        self.service_kwargs = service_kwargs or {}
+
+        # spawn keeps torch state out of forked children
+        self._ctx = mp.get_context("spawn")
+        self._result_queue = None
+        self._workers: dict[int, mp.Process] = {}
+        # worker_id -> that worker's job queue
+        self._job_queues: dict[int, mp.Queue] = {}
+        self._ready_workers: set[int] = set()
+        # Ready workers without a job
+        self._idle: set[int] = set()
+        # worker_id -> consecutive restarts without becoming ready, and when the next restart is due
+        self._restarts: dict[int, int] = {}
+        self._restart_at: dict[int, float] = {}
+        self._failure: str | None = None
+
+        self._job_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        # job_id -> (future, method, kwargs, attempts, chunk callback, traces)
+        self._pending: dict[int, tuple[Future, str, dict, int, Callable | None, list[Trace]]] = {}
+        # Job ids waiting for an idle worker
+        self._queued: deque[int] = deque()
+        # worker_id -> job_id handed to that worker
+        self._running: dict[int, int] = {}
+
+        self._stopping = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._started = False
+
+    @property
+    def ready(self) -> bool:
+        """True once every worker has loaded (and warmed up) the model."""
+        return self._started and len(self._ready_workers) == self.num_workers
+
+    @property
+    def failed(self) -> bool:
+        """True once a worker exceeded TTS_WORKER_MAX_RESTARTS; the pool takes no more jobs."""
+        return self._failure is not None
+
+    def start(self) -> None:
+        """
+        Start worker processes and the result/monitor threads.
+        """
+        if self._started:
+            return
+
+        self._result_queue = self._ctx.Queue()
+        self._stopping.clear()
+        self._failure = None
+
+        for worker_id in range(self.num_workers):
+            self._spawn_worker(worker_id)
+
+        for target in (self._result_loop, self._monitor_loop):
+            thread = threading.Thread(target=target, name=f"{module_name}-{target.__name__}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        self._started = True
+        logger.info("TTS worker pool started with %s worker(s)", self.num_workers)
+
+    def _spawn_worker(self, worker_id: int) -> None:
+        # A fresh queue, so nothing meant for a dead process is picked up by its successor
+        old_queue = self._job_queues.get(worker_id)
+        if old_queue is not None:
+            old_queue.close()
+        self._job_queues[worker_id] = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self._job_queues[worker_id], self._result_queue, self.service_kwargs),
+            name=f"tts-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        self._workers[worker_id] = process
+
+    def submit(self, traces: list[Trace] | None = None, **kwargs) -> Future:
+        """
+        Queue a synthesis job. Keyword arguments are passed to ChatttsService.generateSound.
+        Spans recorded by the worker are added to traces (default: the current trace).
+        """
+        return self._submit("generate", kwargs, traces=traces)
+
+    def _submit(self, method: str, kwargs: dict, on_chunk: Callable | None = None,
+                traces: list[Trace] | None = None) -> Future:
+        if self._failure is not None:
+            raise RuntimeError(f"TTS worker pool failed: {self._failure}")
+        if not self._started or self._stopping.is_set():
+            raise RuntimeError("TTS worker pool is not running")
+
+        if traces is None:
+            traces = [trace for trace in (current_trace(),) if trace is not None]
+        future: Future = Future()
+        job_id = next(self._job_ids)
+        # A stream that already sent chunks to the client cannot be replayed
+        attempts = settings.TTS_JOB_MAX_ATTEMPTS if method == "stream" else 1
+        with self._lock:
+            self._pending[job_id] = (future, method, kwargs, attempts, on_chunk, traces)
+            self._queued.append(job_id)
+            self._dispatch()
+        return future
+
+    def _dispatch(self) -> None:
+        """
+        Hand queued jobs to idle workers. Call with _lock held: the assignment
+        is recorded before the job leaves the parent, so a worker crash can
+        always re-queue it.
+        """
+        while self._queued and self._idle:
+            job_id = self._queued.popleft()
+            entry = self._pending.get(job_id)
+            if entry is None:
+                continue
+            worker_id = self._idle.pop()
+            _, method, kwargs, _, _, traces = entry
+            self._running[worker_id] = job_id
+            self._job_queues[worker_id].put((job_id, method, kwargs, bool(traces)))
+
+    async def run(self, traces: list[Trace] | None = None, **kwargs) -> list[str]:
+        """
+        Submit a synthesis job and await its result from asyncio code.
+        """
+        return await asyncio.wrap_future(self.submit(traces=traces, **kwargs))
+
+    async def stream(self, **kwargs) -> AsyncIterator[bytes]:
+        """
+        Synthesize one line in stream mode, yielding 16-bit PCM chunks as they
+        are generated. Keyword arguments are passed to ChatttsService.streamSound;
+        the finished file is written to filePath by the worker.
+        """
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+
+        def on_chunk(chunk: bytes) -> None:
+            loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+
+        future = asyncio.wrap_future(self._submit("stream", kwargs, on_chunk))
+        future.add_done_callback(lambda _: chunks.put_nowait(None))
+
+        while True:
+            chunk = await chunks.get()
+            if chunk is None:
+                break
+            yield chunk
+        # Re-raise worker errors after all received chunks were delivered
+        await future
+
+    def _result_loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                kind, key, payload = self._result_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            if kind == "ready":
+                with self._lock:
+                    self._ready_workers.add(key)
+                    self._idle.add(key)
+                    self._restarts.pop(key, None)
+                    self._dispatch()
+                logger.info("TTS worker %s is ready", key)
+            elif kind == "init_error":
+                logger.error("TTS worker %s failed to initialize: %s", key, payload)
+            elif kind == "chunk":
+                with self._lock:
+                    entry = self._pending.get(key)
+                if entry is not None and entry[4] is not None:
+                    entry[4](payload)
+            elif kind == "spans":
+                with self._lock:
+                    entry = self._pending.get(key)
+                if entry is not None:
+                    for trace in entry[5]:
+                        trace.extend(payload)
+            elif kind in ("done", "error"):
+                with self._lock:
+                    entry = self._pending.pop(key, None)
+                    for worker_id, job_id in list(self._running.items()):
+                        if job_id == key:
+                            del self._running[worker_id]
+                            self._idle.add(worker_id)
+                    self._dispatch()
+                if entry is None:
+                    continue
+                future = entry[0]
+                if future.done():
+                    continue
+                if kind == "done":
+                    future.set_result(payload)
+                else:
+                    future.set_exception(RuntimeError(payload))
+
+    def _monitor_loop(self) -> None:
+        while not self._stopping.wait(1.0):
+            for worker_id, process in list(self._workers.items()):
+                if process.is_alive() or self._stopping.is_set():
+                    continue
+
+                del self._workers[worker_id]
+                with self._lock:
+                    self._ready_workers.discard(worker_id)
+                    self._idle.discard(worker_id)
+                self._requeue_job_of(worker_id)
+
+                restarts = self._restarts.get(worker_id, 0)
+                if restarts >= settings.TTS_WORKER_MAX_RESTARTS:
+                    self._fail(
+                        f"TTS worker {worker_id} exited with code {process.exitcode} "
+                        f"after {restarts} restart(s) without becoming ready"
+                    )
+                    continue
+                delay = min(settings.TTS_WORKER_RESTART_BACKOFF * 2 ** restarts, MAX_RESTART_BACKOFF)
+                self._restarts[worker_id] = restarts + 1
+                self._restart_at[worker_id] = time.monotonic() + delay
+                logger.warning(
+                    "TTS worker %s exited with code %s, restarting in %.1fs",
+                    worker_id, process.exitcode, delay
+                )
+
+            for worker_id, restart_at in list(self._restart_at.items()):
+                if time.monotonic() >= restart_at and not self._stopping.is_set() and self._failure is None:
+                    del self._restart_at[worker_id]
+                    self._spawn_worker(worker_id)
+
+    def _requeue_job_of(self, worker_id: int) -> None:
+        with self._lock:
+            job_id = self._running.pop(worker_id, None)
+            if job_id is None or job_id not in self._pending:
+                return
+            future, method, kwargs, attempts, on_chunk, traces = self._pending[job_id]
+            if attempts >= settings.TTS_JOB_MAX_ATTEMPTS:
+                del self._pending[job_id]
+                future.set_exception(RuntimeError(f"TTS worker crashed while running job {job_id}"))
+                return
+            self._pending[job_id] = (future, method, kwargs, attempts + 1, on_chunk, traces)
+            self._queued.appendleft(job_id)
+            self._dispatch()
+
+    def _fail(self, reason: str) -> None:
+        """
+        Stop taking jobs and fail every pending one.
+        """
+        logger.error("TTS worker pool failed: %s", reason)
+        with self._lock:
+            self._failure = reason
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._queued.clear()
+            self._running.clear()
+            self._restart_at.clear()
+        for future, *_ in pending:
+            if not future.done():
+                future.set_exception(RuntimeError(f"TTS worker pool failed: {reason}"))
+
+    def shutdown(self, timeout: float | None = None) -> None:
+        """
+        Stop all workers, failing any jobs that have not completed.
+        """
+        if not self._started:
+            return
+        timeout = settings.TTS_SHUTDOWN_TIMEOUT if timeout is None else timeout
+
+        self._stopping.set()
+        for worker_id in self._workers:
+            self._job_queues[worker_id].put(None)
+        for process in self._workers.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads.clear()
+
+        with self._lock:
+            for future, *_ in self._pending.values():
+                if not future.done():
+                    future.set_exception(RuntimeError("TTS worker pool shut down"))
+            self._pending.clear()
+            self._queued.clear()
+            self._running.clear()
+
+        for job_queue in self._job_queues.values():
+            job_queue.close()
+        self._result_queue.close()
+        self._job_queues.clear()
+        self._workers.clear()
+        self._ready_workers.clear()
+        self._idle.clear()
+        self._restarts.clear()
+        self._restart_at.clear()
+        self._started = False
+        logger.info("TTS worker pool stopped")
+
+
+_pool: TTSWorkerPool | None = None
+
+
+def get_tts_pool(num_workers: int | None = None) -> TTSWorkerPool:
+    """
+    Get the process-wide TTS worker pool, starting it on first use.
+    num_workers only applies when the pool is created (default TTS_WORKERS).
+    """
+    global _pool
+    if _pool is None:
+        _pool = TTSWorkerPool(num_workers=num_workers)
+    _pool.start()
+    return _pool
+
+
+def tts_pool_ready() -> bool:
+    """
+    Whether the process-wide TTS worker pool is running with every worker warm.
+    Does not start the pool.
+    """
+    return _pool is not None and _pool.ready
+
+
+def tts_pool_failed() -> bool:
+    """
+    Whether the process-wide TTS worker pool gave up restarting a worker.
+    """
+    return _pool is not None and _pool.failed
+
+
+def shutdown_tts_pool() -> None:
+    """
+    Shut down the process-wide TTS worker pool if it was started.
+    """
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
@@ -0,0 +1,135 @@
+import os
+import re
+from collections import Counter
+from typing import List
+
+import numpy as np
+
+from app.utils.file_processing import markdown_to_text
+
+module_name = "vocabulary_ranker"
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z'-]*[A-Za-z]|[A-Za-z]")
+_VOWEL_GROUP_RE = re.compile(r"[aeiouy]+")
+_SENTENCE_ENDS = ".!?:\n"
+
+
+def _read_lines(filename: str) -> List[str]:
+    path = os.path.join(DATA_DIR, filename)
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def count_syllables(word: str) -> int:
+    """
+    Rough syllable count: vowel groups, minus a silent trailing 'e'.
+    """
+    word = word.lower()
+    count = len(_VOWEL_GROUP_RE.findall(word))
+    if word.endswith("e") and not word.endswith(("le", "ee")) and count > 1:
+        count -= 1
+    return max(1, count)
+
+
+class VocabularyRanker:
+    """
+    Local ranking of vocabulary candidates in a lesson.
+
+    The lesson is tokenized once and every distinct word gets a row in a set of
+    NumPy feature arrays (frequency rarity, syllables, length, occurrences), which
+    are scored against the target grade in a single vectorized pass. Stopwords,
+    proper nouns and sight words of lower grades are filtered out, so only a short
+    list of plausible words needs to go to the LLM, or none at all in fast mode.
+    """
+
+    def __init__(self):
+        self.stopwords = set(_read_lines("stopwords.txt"))
+        common = _read_lines("common_words.txt")
+        self.frequency_rank = {}
+        for rank, word in enumerate(common):
+            self.frequency_rank.setdefault(word, rank)
+        self.max_rank = len(common)
+
+        self.grade_of = {}
+        for line in _read_lines("grade_words.txt"):
+            grade, words = line.split(":", 1)
+            for word in words.split():
+                self.grade_of.setdefault(word.lower(), int(grade))
+
+    def tokenize(self, markdown_text: str) -> tuple[Counter, Counter]:
+        """
+        Split a lesson into lowercase words.
+
+        Returns occurrence counts per word (in document order) and how often each
+        word was capitalized in the middle of a sentence.
+        """
+        text = markdown_to_text(markdown_text)
+        counts = Counter()
+        capitalized = Counter()
+        for match in _WORD_RE.finditer(text):
+            token = match.group(0)
+            word = token.lower()
+            counts[word] += 1
+            if token[0].isupper():
+                before = text[max(0, match.start() - 8):match.start()].rstrip(" \t\"'(")
+                if before and before[-1] not in _SENTENCE_ENDS:
+                    capitalized[word] += 1
+        return counts, capitalized
+
+    def rank(self, markdown_text: str, grade: int, top_n: int = 40) -> List[str]:
+        """
+        Return up to top_n candidate words of the lesson, best first.
+        """
+        counts, capitalized = self.tokenize(markdown_text)
+        words = [
+            word for word in counts
+            if len(word) >= 3
+            and word not in self.stopwords
+            # Mostly capitalized mid-sentence: a name or place, not vocabulary
+            and capitalized[word] / counts[word] <= 0.5
+        ]
+        if not words:
+            return []
+
+        lengths = np.array([len(word) for word in words], dtype=np.float64)
+        syllables = np.array([count_syllables(word) for word in words], dtype=np.float64)
+        occurrences = np.array([counts[word] for word in words], dtype=np.float64)
+        ranks = np.array([self.frequency_rank.get(word, self.max_rank) for word in words], dtype=np.float64)
+        listed_grades = np.array([self.grade_of.get(word, -1) for word in words], dtype=np.float64)
+
+        # 0 for the most common words, 1 for words outside the frequency list
+        rarity = np.log1p(ranks) / np.log1p(self.max_rank)
+
+        # Older students get rarer, longer words
+        target_rarity = np.clip(0.35 + 0.05 * grade, 0.4, 0.95)
+        target_syllables = 1.5 + 0.25 * grade
+        target_length = 5 + 0.4 * grade
+
+        grade_fit = 1 - np.abs(rarity - target_rarity)
+        syllable_fit = 1 / (1 + np.abs(syllables - target_syllables))
+        length_fit = 1 / (1 + np.abs(lengths - target_length) / 2)
+        # Words the lesson keeps coming back to are more worth learning
+        weight = np.log1p(occurrences)
+        weight = weight / weight.max()
+
+        scores = 0.45 * grade_fit + 0.2 * syllable_fit + 0.15 * length_fit + 0.2 * weight
+        scores -= 0.3 * ((listed_grades >= 0) & (listed_grades < grade))
+
+        # Stable sort keeps document order among equal scores
+        order = np.argsort(-scores, kind="stable")[:top_n]
+        return [words[index] for index in order]
+
+
+_ranker: VocabularyRanker | None = None
+
+
+def get_vocabulary_ranker() -> VocabularyRanker:
+    """
+    Get the process-wide vocabulary ranker (word lists are loaded once).
+    """
+    global _ranker
+    if _ranker is None:
+        _ranker = VocabularyRanker()
+    return _ranker
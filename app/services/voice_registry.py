@@ -0,0 +1,117 @@
+import os
+import logging
+from typing import Any, Dict, List
+
+from app.core.config import settings
+
+module_name = "voice_registry"
+logger = logging.getLogger(__name__)
+
+# Speaker embeddings (torch.save'd tensors), one voice per file; the file name
+# without .pt is the voice name
+VOICE_PRESET_DIR = "./chattts/voice-presets"
+VOICE_PRESET_EXTENSION = ".pt"
+
+
+def list_voices(directory: str = VOICE_PRESET_DIR) -> List[str]:
+    """
+    Names of the available voice presets. Does not load them.
+    """
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        name[:-len(VOICE_PRESET_EXTENSION)] for name in os.listdir(directory)
+        if name.endswith(VOICE_PRESET_EXTENSION)
+    )
+
+
+def parse_voice_map(value: str | None) -> Dict[str, str]:
+    """
+    Parse "Speaker=voice,Speaker=voice" into a dict.
+    Raises ValueError on malformed entries.
+    """
+    voices = {}
+    for entry in (value or "").split(","):
+        if not entry.strip():
+            continue
+        speaker, separator, voice = entry.partition("=")
+        if not separator or not speaker.strip() or not voice.strip():
+            raise ValueError(f"Invalid speaker voice '{entry.strip()}', expected Speaker=voice")
+        voices[speaker.strip()] = voice.strip()
+    return voices
+
+
+def validate_voices(voices: Dict[str, str]) -> None:
+    """
+    Raise ValueError if a mapping refers to a voice that has no preset.
+    """
+    available = list_voices()
+    unknown = sorted(set(voices.values()) - set(available))
+    if unknown:
+        raise ValueError(f"Unknown voice(s): {', '.join(unknown)}. Available: {', '.join(available)}")
+
+
+def requested_voices(value: str | None) -> Dict[str, str]:
+    """
+    Speaker to voice overrides of a request ("Student1=voice,Student2=voice"),
+    checked against the available presets. Raises ValueError.
+    """
+    voices = parse_voice_map(value)
+    validate_voices(voices)
+    return voices
+
+
+def speaker_voices(overrides: Dict[str, str] | None = None) -> Dict[str, str]:
+    """
+    Speaker to voice mapping: TTS_SPEAKER_VOICES, updated with per-request overrides.
+    """
+    voices = parse_voice_map(settings.TTS_SPEAKER_VOICES)
+    voices.update(overrides or {})
+    return voices
+
+
+def voice_for(speaker: str | None, voices: Dict[str, str] | None = None) -> str:
+    """
+    The voice a speaker's lines are synthesized with (TTS_DEFAULT_VOICE for
+    speakers without a mapping).
+    """
+    voices = speaker_voices() if voices is None else voices
+    return voices.get(speaker or "", settings.TTS_DEFAULT_VOICE)
+
+
+class VoiceRegistry:
+    """
+    All voice presets, loaded into memory once.
+
+    TTS workers keep one registry and pick the speaker embedding per call, so
+    switching voices between lines (or batches) costs nothing.
+    """
+
+    def __init__(self, directory: str = VOICE_PRESET_DIR, load: bool = True):
+        self.directory = directory
+        self.embeddings: Dict[str, Any] = {}
+        for name in list_voices(directory):
+            # Without load (stub backend) the name stands in for the embedding
+            self.embeddings[name] = self._load(name) if load else name
+        if not self.embeddings:
+            raise RuntimeError(f"No voice presets found in {directory}")
+        logger.info("Loaded %s voice preset(s): %s", len(self.embeddings), ", ".join(self.embeddings))
+
+    def _load(self, name: str) -> Any:
+        # Imported here so the API process can list voices without loading torch
+        import torch
+        path = os.path.join(self.directory, f"{name}{VOICE_PRESET_EXTENSION}")
+        return torch.load(path, map_location=torch.device('cpu'))
+
+    def names(self) -> List[str]:
+        return list(self.embeddings)
+
+    def get(self, name: str | None = None) -> Any:
+        """
+        Speaker embedding of a voice (TTS_DEFAULT_VOICE if name is None).
+        Raises ValueError for unknown voices.
+        """
+        name = name or settings.TTS_DEFAULT_VOICE
+        if name not in self.embeddings:
+            raise ValueError(f"Unknown voice: {name}")
+        return self.embeddings[name]
@@ -0,0 +1,177 @@
+import os
+import tempfile
+import soundfile
+
+from app.core.config import settings
+
+# format name -> (file extension, soundfile format, soundfile subtype, media type)
+AUDIO_FORMATS = {
+    "wav": ("wav", "WAV", "PCM_16", "audio/wav"),
+    "flac": ("flac", "FLAC", "PCM_16", "audio/flac"),
+    "ogg": ("ogg", "OGG", "VORBIS", "audio/ogg"),
+    "opus": ("opus", "OGG", "OPUS", "audio/opus"),
+    "mp3": ("mp3", "MP3", "MPEG_LAYER_III", "audio/mpeg"),
+}
+
+_EXTENSIONS = {extension: name for name, (extension, _, _, _) in AUDIO_FORMATS.items()}
+_MEDIA_TYPES = {media_type: name for name, (_, _, _, media_type) in AUDIO_FORMATS.items()}
+_MEDIA_TYPES.update({"audio/x-wav": "wav", "audio/wave": "wav", "audio/x-flac": "flac", "audio/mp3": "mp3"})
+
+
+def storage_format() -> str:
+    """
+    The configured codec for stored line audio.
+    """
+    name = settings.AUDIO_STORAGE_FORMAT.lower()
+    if name not in AUDIO_FORMATS:
+        raise ValueError(f"Unsupported AUDIO_STORAGE_FORMAT: {settings.AUDIO_STORAGE_FORMAT}")
+    return name
+
+
+def storage_extension() -> str:
+    """
+    File extension of the configured storage codec.
+    """
+    return AUDIO_FORMATS[storage_format()][0]
+
+
+def format_of(path: str) -> str:
+    """
+    Audio format of a file, from its extension (defaults to wav).
+    """
+    return _EXTENSIONS.get(os.path.splitext(path)[1].lstrip(".").lower(), "wav")
+
+
+def media_type_of(path: str) -> str:
+    """
+    Media type to serve a file with.
+    """
+    return AUDIO_FORMATS[format_of(path)][3]
+
+
+def with_format(path: str, audio_format: str) -> str:
+    """
+    Path of the same audio in another format.
+    """
+    return f"{os.path.splitext(path)[0]}.{AUDIO_FORMATS[audio_format][0]}"
+
+
+def write_audio(path: str, audio_data, sample_rate: int = 24000) -> None:
+    """
+    Write audio in the format given by the file extension.
+    """
+    _, sf_format, subtype, _ = AUDIO_FORMATS[format_of(path)]
+    soundfile.write(path, audio_data, sample_rate, format=sf_format, subtype=subtype)
+    remove_derived(path)
+
+
+def source_signature(path: str) -> str:
+    """
+    Identity of the current content of a file: inode, size and mtime.
+
+    The mtime alone is not enough: audio materialized from the TTS cache is a
+    hard link that keeps the cached file's (older) mtime.
+    """
+    stat = os.stat(path)
+    return f"{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _signature_path(dest_path: str) -> str:
+    return f"{dest_path}.source"
+
+
+def remove_derived(path: str) -> None:
+    """
+    Delete the transcoded copies of an audio file. Call whenever it is rewritten.
+    """
+    for audio_format in AUDIO_FORMATS:
+        derived = with_format(path, audio_format)
+        if derived == path:
+            continue
+        for stale in (derived, _signature_path(derived)):
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass
+
+
+def _replace_atomically(dest_path: str, write) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest_path) or ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, dest_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def transcode(src_path: str, audio_format: str) -> str:
+    """
+    Transcode an audio file next to the source and return the new path.
+
+    The result is kept as a cache, together with the signature of the source
+    it was made from (see source_signature); it is rebuilt when the source
+    changes. Files are written under a temporary name and renamed, so
+    concurrent requests never serve a partial file.
+    """
+    dest_path = with_format(src_path, audio_format)
+    signature_path = _signature_path(dest_path)
+    signature = source_signature(src_path)
+    if os.path.exists(dest_path):
+        try:
+            with open(signature_path, "r") as f:
+                if f.read() == signature:
+                    return dest_path
+        except FileNotFoundError:
+            pass
+
+    audio_data, sample_rate = soundfile.read(src_path, dtype="float32")
+    _, sf_format, subtype, _ = AUDIO_FORMATS[audio_format]
+
+    def write_signature(tmp_path: str) -> None:
+        with open(tmp_path, "w") as f:
+            f.write(signature)
+
+    _replace_atomically(
+        dest_path,
+        lambda tmp_path: soundfile.write(tmp_path, audio_data, sample_rate, format=sf_format, subtype=subtype)
+    )
+    _replace_atomically(signature_path, write_signature)
+    return dest_path
+
+
+def negotiate_format(requested: str | None, accept: str | None, default: str) -> str | None:
+    """
+    Pick the response format from an explicit ?format= value or the Accept header.
+
+    Returns None if an explicitly requested format is not supported.
+    """
+    if requested:
+        requested = requested.lower()
+        return requested if requested in AUDIO_FORMATS else None
+
+    if not accept:
+        return default
+
+    candidates = []
+    for position, part in enumerate(accept.split(",")):
+        media_range, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            candidates.append((-quality, position, media_range.lower()))
+
+    for _, _, media_range in sorted(candidates):
+        if media_range in ("*/*", "audio/*"):
+            return default
+        if media_range in _MEDIA_TYPES:
+            return _MEDIA_TYPES[media_range]
+    return default
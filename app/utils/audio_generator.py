@@ -1,18 +1,12 @@
 import os
-from fastapi import APIRouter
-from sqlalchemy.orm import Session
-import json
+import logging
 import re
-import asyncio
-from concurrent.futures import ProcessPoolExecutor
 
-from app.db.repository import GeneratedAudioRepository
-from app.services.chattts_service import ChatttsService
-from app.services.ollama_service import OllamaService
+from app.services.tts_scheduler import get_tts_scheduler
+from app.services.voice_registry import voice_for
+from app.utils.audio_formats import storage_extension
 
-router = APIRouter()
-ollama_service = OllamaService()
-chattts_service = ChatttsService()
+logger = logging.getLogger(__name__)
 
 def clean_text_for_tts(text: str) -> str:
     """Clean text for TTS processing by removing or replacing problematic characters."""
@@ -24,87 +18,61 @@ def clean_text_for_tts(text: str) -> str:
     text = re.sub(r'[^\w\s.,]', '', text)  # Remove any other special characters
     return text.strip()
 
-def generate_audio(text: str, output_dir: str, file_prefix: str) -> list[str]:
+def extract_line(conversation: dict) -> tuple[str | None, str | None]:
     """
-    Generate audio for text. This function runs in a subprocess.
+    Extract (speaker, text) from a conversation line.
     """
-    try:
-        # Initialize ChatTTS service
-        tts_service = ChatttsService()
-        
-        # Generate audio
-        wav_paths = tts_service.generateSound(
-            texts=[text],
-            savePath=output_dir,
-            filePrefix=file_prefix
-        )
-        
-        return wav_paths
-        
-    except Exception as e:
-        print(f"Error generating audio: {str(e)}")
-        return []
+    text = None
+    speaker = None
+    
+    # Try different possible conversation structures
+    if "text" in conversation:
+        # Direct text field
+        text = conversation["text"]
+        speaker = conversation.get("speaker", "unknown")
+    elif isinstance(conversation, dict) and len(conversation) > 0:
+        # Format where keys are speakers and values are their lines
+        # Extract the first speaker and text
+        for spk, txt in conversation.items():
+            if spk != "conversation_id":
+                speaker = spk
+                text = txt
+                break
+    return speaker, text
 
-async def process_conversation(db: Session, file_id: int, conversation: dict, output_dir: str, file_basename: str):
+def line_audio_path(conversation: dict, output_dir: str, file_basename: str) -> str:
     """
-    Process a conversation and generate audio.
+    Path of the audio file for a conversation line.
     """
-    try:
-        # Extract conversation data
-        conversation_id = conversation.get("conversation_id")
-        
-        # Debug the conversation structure
-        print(f"Processing conversation {conversation_id}: {conversation}")
-        
-        # Extract text from the conversation
-        text = None
-        speaker = None
-        
-        # Try different possible conversation structures
-        if "text" in conversation:
-            # Direct text field
-            text = conversation["text"]
-            speaker = conversation.get("speaker", "unknown")
-        elif isinstance(conversation, dict) and len(conversation) > 0:
-            # Format where keys are speakers and values are their lines
-            # Extract the first speaker and text
-            for spk, txt in conversation.items():
-                if spk != "conversation_id":
-                    speaker = spk
-                    text = txt
-                    break
-        
-        # Validate text
-        if not text:
-            print(f"No text found for conversation {conversation_id}")
-            return
-            
-        # Clean the text for TTS processing
-        cleaned_text = clean_text_for_tts(text)
-        print(f"Processing text for conversation {conversation_id}: '{cleaned_text}'")
-        
-        # Generate audio in subprocess
-        with ProcessPoolExecutor() as pool:
-            file_prefix = f"{file_basename}_{conversation_id}_{speaker}_"
-            wav_paths = await asyncio.get_event_loop().run_in_executor(
-                pool,
-                generate_audio,
-                cleaned_text,
-                output_dir,
-                file_prefix
-            )
+    speaker, _ = extract_line(conversation)
+    file_prefix = f"{file_basename}_{conversation.get('conversation_id')}_{speaker}_"
+    return os.path.join(output_dir, f"{file_prefix}0.{storage_extension()}")
+
+async def synthesize_line(conversation: dict, output_dir: str, file_basename: str) -> str:
+    """
+    Synthesize audio for one conversation line and return the audio file path.
+    The line's "voice" is used, or the voice mapped to its speaker.
+    
+    Raises ValueError if the line has no text and RuntimeError if no audio was produced.
+    """
+    conversation_id = conversation.get("conversation_id")
+    speaker, text = extract_line(conversation)
+    
+    # Validate text
+    if not text:
+        raise ValueError(f"No text found for conversation {conversation_id}")
         
-        # Save audio file information to database
-        for wav_path in wav_paths:
-            print(f"Saving audio file to database: {wav_path}")
-            GeneratedAudioRepository.create(
-                db=db,
-                generated_file_id=file_id,
-                generated_filepath=wav_path,
-                conversation_id=conversation_id
-            )
-            
-    except Exception as e:
-        print(f"Error processing conversation {conversation_id if 'conversation_id' in conversation else 'unknown'}: {str(e)}")
-        print(f"Conversation data: {conversation}")
-        # Continue with other conversations even if one fails
+    # Clean the text for TTS processing
+    cleaned_text = clean_text_for_tts(text)
+    logger.debug("Processing text for conversation %s: '%s'", conversation_id, cleaned_text)
+    
+    # Queue the line on the batching scheduler so it can share a batch
+    # with lines from this and other conversations
+    wav_path = await get_tts_scheduler().synthesize(
+        text=cleaned_text,
+        file_path=line_audio_path(conversation, output_dir, file_basename),
+        voice=conversation.get("voice") or voice_for(speaker)
+    )
+    if not wav_path:
+        raise RuntimeError(f"No audio generated for conversation {conversation_id}")
+    return wav_path
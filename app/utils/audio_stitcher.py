@@ -0,0 +1,114 @@
+import os
+import json
+import logging
+import numpy as np
+import soundfile
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import observe
+from app.db.models import GeneratedFile
+from app.db.repository import GeneratedAudioRepository
+from app.utils.audio_formats import storage_extension, write_audio
+from app.utils.audio_generator import extract_line
+
+logger = logging.getLogger(__name__)
+
+
+def full_track_paths(file_record: GeneratedFile) -> tuple[str, str]:
+    """
+    Paths of the stitched full-conversation track and its JSON index.
+    """
+    output_dir = os.path.dirname(file_record.generated_filepath)
+    base = os.path.join(output_dir, f"{file_record.original_filename}_full")
+    return f"{base}.{storage_extension()}", f"{base}.json"
+
+
+def stitch_lines(lines: list[dict], output_path: str, index_path: str, silence_ms: int | None = None) -> dict:
+    """
+    Concatenate per-line audio into one track with silence between lines and
+    write a JSON index of each line's start/end offsets (in seconds).
+
+    Args:
+        lines: Ordered dicts with "conversation_id", "speaker" and "path"
+    """
+    silence_ms = settings.STITCH_SILENCE_MS if silence_ms is None else silence_ms
+
+    waves = []
+    sample_rate = None
+    for line in lines:
+        data, rate = soundfile.read(line["path"], dtype="float32")
+        if sample_rate is None:
+            sample_rate = rate
+        elif rate != sample_rate:
+            raise ValueError(f"Sample rate mismatch in {line['path']}: {rate} != {sample_rate}")
+        # Mix down to mono if needed
+        waves.append(data.mean(axis=1) if data.ndim > 1 else data)
+
+    lengths = np.fromiter((len(wave) for wave in waves), dtype=np.int64, count=len(waves))
+    gap = int(sample_rate * silence_ms / 1000)
+    gaps = np.full(len(waves), gap, dtype=np.int64)
+    gaps[-1] = 0
+    starts = np.concatenate(([0], np.cumsum(lengths + gaps)[:-1]))
+    ends = starts + lengths
+
+    # One concatenate of [line, silence, line, silence, ..., line]
+    silence = np.zeros(gap, dtype=np.float32)
+    pieces = [None] * (2 * len(waves) - 1)
+    pieces[::2] = waves
+    pieces[1::2] = [silence] * (len(waves) - 1)
+    track = np.concatenate(pieces)
+
+    starts_seconds = np.round(starts / sample_rate, 3)
+    ends_seconds = np.round(ends / sample_rate, 3)
+    index = {
+        "sample_rate": sample_rate,
+        "duration": round(len(track) / sample_rate, 3),
+        "lines": [
+            {
+                "conversation_id": line["conversation_id"],
+                "speaker": line.get("speaker"),
+                "start": float(start),
+                "end": float(end)
+            }
+            for line, start, end in zip(lines, starts_seconds, ends_seconds)
+        ]
+    }
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with observe("audio_write"):
+        write_audio(output_path, track, sample_rate)
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    return index
+
+
+def stitch_generated_file(db: Session, file_record: GeneratedFile) -> dict | None:
+    """
+    Build the full-conversation track of a generated file.
+
+    Returns the timestamp index, or None if some lines have no audio yet.
+    """
+    with open(file_record.generated_filepath, 'r') as f:
+        conversations = json.load(f)["conversations"]
+
+    audio_paths = {
+        record.conversation_id: record.generated_filepath
+        for record in GeneratedAudioRepository.get_by_generated_file_id(db, file_record.id)
+    }
+
+    lines = []
+    for conversation in conversations:
+        conversation_id = conversation.get("conversation_id")
+        path = audio_paths.get(conversation_id)
+        if not path or not os.path.exists(path):
+            return None
+        speaker, _ = extract_line(conversation)
+        lines.append({"conversation_id": conversation_id, "speaker": speaker, "path": path})
+
+    if not lines:
+        return None
+
+    output_path, index_path = full_track_paths(file_record)
+    logger.info("Stitching %s lines into %s", len(lines), output_path)
+    return stitch_lines(lines, output_path, index_path)
@@ -0,0 +1,29 @@
+import struct
+import numpy as np
+
+SAMPLE_RATE = 24000
+
+
+def to_pcm16(audio: np.ndarray) -> bytes:
+    """
+    Convert float audio in [-1, 1] to little-endian 16-bit PCM bytes.
+    """
+    audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def wav_stream_header(sample_rate: int = SAMPLE_RATE, channels: int = 1) -> bytes:
+    """
+    WAV header for a 16-bit PCM stream of unknown length.
+
+    The RIFF and data sizes are set to the maximum value, which browsers and
+    common players treat as "read until the connection closes".
+    """
+    bits_per_sample = 16
+    byte_rate = sample_rate * channels * bits_per_sample // 8
+    block_align = channels * bits_per_sample // 8
+    return (
+        b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, byte_rate, block_align, bits_per_sample)
+        + b"data" + struct.pack("<I", 0xFFFFFFFF)
+    )
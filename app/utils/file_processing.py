@@ -1,10 +1,13 @@
 import os
 import re
 import json
+import tempfile
 import markdown
 from bs4 import BeautifulSoup
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
+from app.core.config import settings
+
 def extract_grade_from_filename(filename: str) -> int:
     """
     Extract grade level from filename.
@@ -45,29 +48,43 @@ def save_json_response(output_path: str, data: dict) -> str:
     # Ensure the directory exists
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
-    # Save the data to a JSON file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    # Write to a temporary file and rename it into place, so readers never see a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(output_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, output_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
     
     return output_path 
 
-# def process_markdown_text(markdown_text: str) -> list[str]:
-#     """
-#     Process markdown text and split it into chunks.
-#     """
-#     # Convert markdown to HTML
-#     html = markdown.markdown(markdown_text)
+def markdown_to_text(markdown_text: str) -> str:
+    """
+    Convert Markdown to plain text.
+    """
+    # Convert markdown to HTML
+    html = markdown.markdown(markdown_text)
     
-#     # Parse HTML and extract text
-#     soup = BeautifulSoup(html, 'html.parser')
-#     text = soup.get_text()
+    # Parse HTML and extract text
+    soup = BeautifulSoup(html, 'html.parser')
+    return soup.get_text()
+
+def process_markdown_text(markdown_text: str, chunk_size: int | None = None, chunk_overlap: int | None = None) -> list[str]:
+    """
+    Process markdown text and split it into chunks.
+    """
+    text = markdown_to_text(markdown_text)
     
-#     # Split text into chunks
-#     text_splitter = RecursiveCharacterTextSplitter(
-#         chunk_size=1000,
-#         chunk_overlap=100,
-#         length_function=len,
-#     )
+    # Split text into chunks
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size or settings.WORD_PICK_CHUNK_SIZE,
+        chunk_overlap=settings.WORD_PICK_CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap,
+        length_function=len,
+    )
     
-#     chunks = text_splitter.split_text(text)
-#     return chunks
\ No newline at end of file
+    chunks = text_splitter.split_text(text)
+    return chunks
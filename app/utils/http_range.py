@@ -0,0 +1,58 @@
+import os
+import re
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _iter_file(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            data = f.read(min(CHUNK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def range_file_response(request: Request, path: str, media_type: str) -> Response:
+    """
+    Serve a file, honouring a single-range "Range: bytes=start-end" header
+    so audio players can seek without downloading the whole file.
+    """
+    file_size = os.path.getsize(path)
+    range_header = request.headers.get("range")
+    if not range_header:
+        return FileResponse(path, media_type=media_type, headers={"Accept-Ranges": "bytes"})
+
+    match = _RANGE_PATTERN.match(range_header.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        # Multiple or malformed ranges: fall back to the whole file
+        return FileResponse(path, media_type=media_type, headers={"Accept-Ranges": "bytes"})
+
+    if match.group(1):
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else file_size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(0, file_size - int(match.group(2)))
+        end = file_size - 1
+    end = min(end, file_size - 1)
+
+    if start >= file_size or start > end:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{file_size}"})
+
+    length = end - start + 1
+    return StreamingResponse(
+        _iter_file(path, start, length),
+        status_code=206,
+        media_type=media_type,
+        headers={
+            "Accept-Ranges": "bytes",
+            "Content-Range": f"bytes {start}-{end}/{file_size}",
+            "Content-Length": str(length)
+        }
+    )
@@ -0,0 +1,86 @@
+import json
+
+from pydantic import ValidationError
+
+from app.models.conversation import ConversationLine
+
+
+class ConversationStreamParser:
+    """
+    Incremental parser for a conversation JSON document arriving in pieces.
+
+    Every object directly inside the conversation array is parsed and validated
+    as soon as its closing brace arrives, so lines are available while the model
+    is still generating, and one malformed line only loses that line instead of
+    the whole document. Text before the first '{' or '[' is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.lines: list[dict] = []
+        self.errors: list[str] = []
+        self.complete = False
+
+        self._position = 0
+        self._started = False
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._line_start: int | None = None
+        self._line_depth = 0
+
+    def feed(self, chunk: str) -> list[dict]:
+        """
+        Add the next piece of the response. Returns the lines completed by it.
+        """
+        self.buffer += chunk
+        new_lines = []
+        buffer = self.buffer
+        while self._position < len(buffer):
+            char = buffer[self._position]
+            position = self._position
+            self._position += 1
+
+            if not self._started:
+                if char not in "{[":
+                    continue
+                self._started = True
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                # Lines are objects inside the conversation array: {"conversation": [{...}]} or [{...}]
+                if char == "{" and self._stack and self._stack[-1] == "[" and len(self._stack) <= 2:
+                    self._line_start = position
+                    self._line_depth = len(self._stack)
+                self._stack.append(char)
+            elif char in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if char == "}" and self._line_start is not None and len(self._stack) == self._line_depth:
+                    line = self._parse_line(buffer[self._line_start:position + 1])
+                    self._line_start = None
+                    if line is not None:
+                        self.lines.append(line)
+                        new_lines.append(line)
+                if not self._stack:
+                    self.complete = True
+        return new_lines
+
+    def _parse_line(self, text: str) -> dict | None:
+        try:
+            line = ConversationLine.model_validate(json.loads(text))
+        except (json.JSONDecodeError, ValidationError) as e:
+            self.errors.append(f"Invalid conversation line {text[:80]!r}: {str(e).splitlines()[0]}")
+            return None
+        return line.model_dump()
@@ -0,0 +1,457 @@
+import os
+import signal
+import socket
+import asyncio
+import logging
+import functools
+import contextvars
+import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+
+from app.core.config import settings
+from app.core.logging_config import configure_logging
+from app.core.metrics import JOBS_IN_FLIGHT, mark_process_dead, observe
+from app.core.metrics_dir import setup_metrics_dir
+from app.core.profiler import profile
+from app.core.tracing import Trace, save_trace, start_trace, use_trace
+from app.db.session import init_db, session_scope
+from app.db.models import GenerationJob
+from app.db.repository import GeneratedFileRepository, GeneratedAudioRepository, GenerationJobRepository, GenerationJobVoiceRepository, TraceSpanRepository
+from app.models.file import GeneratedFileCreate
+from app.services.ollama_service import get_ollama_service
+from app.services.tts_scheduler import get_tts_scheduler, shutdown_tts_scheduler
+from app.services.tts_worker_pool import get_tts_pool, shutdown_tts_pool
+from app.services.voice_registry import speaker_voices, voice_for
+from app.utils.audio_generator import line_audio_path, synthesize_line
+from app.utils.audio_stitcher import stitch_generated_file
+from app.utils.file_processing import ensure_output_directory, save_json_response
+
+module_name = "job_worker"
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    """
+    Worker that drives persisted generation jobs through their stages:
+    pick_words -> generate_conversation -> tts -> stitch -> done.
+
+    Every stage result is written to the job row before moving on, so a job
+    picked up again after a crash or restart resumes at the stage (and, for
+    TTS, the lines) it had not finished.
+
+    Conversation lines are synthesized as soon as the LLM has produced them,
+    without waiting for the whole conversation. Several jobs run at once as a
+    pipeline: the LLM stages (word picking and conversation) and the audio
+    stages (TTS and stitching) each have their own concurrency limit, so one
+    job's words are picked while another's lines are synthesized.
+
+    Database calls run on one thread of their own (see _db), never on the
+    event loop.
+    """
+
+    def __init__(self,
+                 worker_id: str | None = None,
+                 llm_concurrency: int | None = None,
+                 tts_concurrency: int | None = None,
+                 ready=None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.ollama_service = get_ollama_service()
+        self.llm_concurrency = max(1, llm_concurrency or settings.JOB_LLM_CONCURRENCY)
+        self.tts_concurrency = max(1, tts_concurrency or settings.JOB_TTS_CONCURRENCY)
+        self._llm_slots = asyncio.Semaphore(self.llm_concurrency)
+        self._tts_slots = asyncio.Semaphore(self.tts_concurrency)
+        self._stopping: asyncio.Event | None = None
+        # Audio tasks started per job while its conversation is streamed in
+        self._early_lines: dict[int, dict[int, asyncio.Task]] = {}
+        # multiprocessing.Event set once the models are warm (see start_job_workers)
+        self.ready = ready
+        # A single thread keeps the worker's database writes in the order they were made
+        self._db_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{module_name}-db")
+
+    def stop(self) -> None:
+        """Ask the worker to stop after the jobs it is running."""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def run(self) -> None:
+        """
+        Claim and process jobs until stopped.
+        """
+        self._stopping = asyncio.Event()
+        # Enough jobs to keep both stages busy, and no more, so the rest stay
+        # claimable by other workers
+        capacity = self.llm_concurrency + self.tts_concurrency
+        active: set[asyncio.Task] = set()
+        get_tts_scheduler().start()
+        logger.info("Job worker %s started", self.worker_id)
+        # Jobs are claimed meanwhile; they just wait for the warm-up to finish
+        warm_up = asyncio.create_task(self.warm_up())
+
+        try:
+            while not self._stopping.is_set():
+                job = None
+                if len(active) < capacity:
+                    job = await self._db(self._claim)
+                if job is None:
+                    await self._wait(active)
+                    continue
+                task = asyncio.create_task(self.process_job(job))
+                active.add(task)
+                task.add_done_callback(active.discard)
+
+            if active:
+                await asyncio.gather(*active, return_exceptions=True)
+        finally:
+            warm_up.cancel()
+            await shutdown_tts_scheduler()
+            shutdown_tts_pool()
+            await self.ollama_service.aclose()
+            self._db_thread.shutdown()
+            logger.info("Job worker %s stopped", self.worker_id)
+
+    async def warm_up(self) -> None:
+        """
+        Wait until the TTS workers have loaded and warmed up the model, make one
+        tiny LLM call, then report the worker ready.
+        """
+        pool = get_tts_pool()
+        while not pool.ready and not self._stopping.is_set():
+            if pool.failed:
+                logger.error("Job worker %s is not ready: its TTS workers failed to start", self.worker_id)
+                return
+            await asyncio.sleep(0.1)
+        if settings.WARMUP_ENABLED:
+            await self.ollama_service.awarm_up()
+        if self.ready is not None:
+            self.ready.set()
+        logger.info("Job worker %s is ready", self.worker_id)
+
+    async def _wait(self, active: set[asyncio.Task]) -> None:
+        """
+        Wait for a stop request, a running job to finish, or the next poll.
+        """
+        stopping = asyncio.create_task(self._stopping.wait())
+        try:
+            await asyncio.wait(
+                [stopping, *active],
+                timeout=settings.JOB_POLL_INTERVAL,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            stopping.cancel()
+
+    async def _db(self, function, *args, **kwargs):
+        """
+        Run blocking database work on the worker's database thread. The trace
+        context goes along, so the statements still show up in the job's timeline.
+        """
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            self._db_thread, functools.partial(context.run, function, *args, **kwargs)
+        )
+
+    def _claim(self) -> GenerationJob | None:
+        with session_scope() as db:
+            return GenerationJobRepository.claim_next(db, self.worker_id, settings.JOB_STALE_AFTER)
+
+    def _write_job(self, job_id: int, fields: dict) -> None:
+        with session_scope() as db:
+            GenerationJobRepository.update(db, job_id, **fields)
+
+    async def _update(self, job_id: int, **fields) -> None:
+        await self._db(self._write_job, job_id, fields)
+
+    def _write_heartbeat(self, job_id: int) -> None:
+        with session_scope() as db:
+            GenerationJobRepository.heartbeat(db, job_id, self.worker_id)
+
+    async def _heartbeat(self, job_id: int) -> None:
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT_INTERVAL)
+            await self._db(self._write_heartbeat, job_id)
+
+    def _job_trace(self, job: GenerationJob) -> Trace | None:
+        """
+        Continue the trace of the request that queued the job (new one if there is none).
+        """
+        if not settings.TRACING_ENABLED:
+            return None
+        with session_scope() as db:
+            queued = TraceSpanRepository.get_first_by_job_id(db, job.id, name="job_queued")
+        profiled = queued is not None and bool((queued.attributes or {}).get("profile"))
+        trace = start_trace(queued.trace_id if queued is not None else None, profile=profiled)
+        trace.job_ids.append(job.id)
+        return trace
+
+    @contextmanager
+    def _stage(self, trace: Trace | None, stage: str):
+        # Stage spans are saved as each stage ends so the timeline fills in while the job runs
+        try:
+            with observe(stage):
+                yield
+        finally:
+            self._db_thread.submit(save_trace, trace)
+
+    async def process_job(self, job: GenerationJob) -> None:
+        """
+        Run the remaining stages of a claimed job.
+        """
+        logger.info("Processing job %s (stage: %s, attempt: %s)", job.id, job.stage, job.attempts)
+        if job.attempts > settings.JOB_MAX_ATTEMPTS:
+            await self._update(job.id, status="failed", error=job.error or "Exceeded maximum number of attempts")
+            return
+
+        trace = await self._db(self._job_trace, job)
+        heartbeat = asyncio.create_task(self._heartbeat(job.id))
+        JOBS_IN_FLIGHT.inc()
+        # A profile samples the whole process, including other jobs running alongside
+        profiling = profile(f"job-{job.id}") if trace is not None and trace.profile else nullcontext()
+        try:
+            with use_trace(trace), profiling:
+                if job.stage in ("pick_words", "generate_conversation"):
+                    async with self._llm_slots:
+                        if job.stage == "pick_words":
+                            with self._stage(trace, "pick_words"):
+                                await self._pick_words(job)
+                        if job.stage == "generate_conversation":
+                            with self._stage(trace, "generate_conversation"):
+                                await self._generate_conversation(job)
+                if job.stage in ("tts", "stitch"):
+                    async with self._tts_slots:
+                        if job.stage == "tts":
+                            with self._stage(trace, "tts"):
+                                await self._synthesize_lines(job)
+                        if job.stage == "stitch":
+                            with self._stage(trace, "stitch"):
+                                await asyncio.to_thread(self._stitch, job)
+
+            await self._update(job.id, status="completed", stage="done", error=None)
+            logger.info("Job %s completed", job.id)
+
+        except Exception as e:
+            retry = job.attempts < settings.JOB_MAX_ATTEMPTS
+            logger.error("Error processing job %s: %s%s", job.id, e, " (will retry)" if retry else "")
+            await self._update(job.id, status="queued" if retry else "failed", error=str(e))
+        finally:
+            JOBS_IN_FLIGHT.dec()
+            heartbeat.cancel()
+            self._discard_early_lines(job.id)
+            await self._db(save_trace, trace)
+
+    async def _pick_words(self, job: GenerationJob) -> None:
+        words = await self.ollama_service.apick_words(
+            job.markdown_text, job.grade_level, use_cache=not job.bypass_cache
+        )
+        if not words:
+            raise RuntimeError("Failed to pick vocabulary words")
+
+        job.words = words
+        job.stage = "generate_conversation"
+        await self._update(job.id, words=words, stage=job.stage)
+
+    async def _generate_conversation(self, job: GenerationJob) -> None:
+        output_dir = os.path.join(settings.OUTPUT_DIR, job.original_filename)
+        ensure_output_directory(output_dir)
+        streamed = []
+        # Conversation snapshots written while streaming; they run in order on the database thread
+        published = []
+        # Every line records its voice, so audio made later (retries, streaming) matches
+        voices = speaker_voices(await self._db(self._job_voices, job.id))
+
+        def on_line(line: dict) -> None:
+            # Publish each line as soon as it is generated and start its audio
+            # right away, so TTS overlaps the rest of the LLM generation
+            conversation = dict(line, conversation_id=len(streamed) + 1, voice=voice_for(line.get("speaker"), voices))
+            streamed.append(conversation)
+            published.append(asyncio.create_task(self._update(job.id, conversation=list(streamed))))
+            self._early_lines.setdefault(job.id, {})[conversation["conversation_id"]] = asyncio.create_task(
+                synthesize_line(conversation, output_dir, job.original_filename)
+            )
+
+        try:
+            result = await self.ollama_service.agenerate_conversation_from_words(
+                job.words, job.grade_level, use_cache=not job.bypass_cache, on_line=on_line
+            )
+        finally:
+            await asyncio.gather(*published, return_exceptions=True)
+        lines = result.get("conversation")
+        if not isinstance(lines, list) or not lines:
+            raise RuntimeError("Failed to generate a proper conversation")
+
+        # Add conversation_id and voice to each conversation
+        for conversation_id, conversation in enumerate(lines, start=1):
+            conversation["conversation_id"] = conversation_id
+            conversation["voice"] = voice_for(conversation.get("speaker"), voices)
+
+        output_path = os.path.join(output_dir, f"{job.original_filename}_generated.json")
+        save_json_response(output_path, {"words": job.words, "conversations": lines})
+
+        file_record = await self._db(self._create_file_record, job, output_path)
+
+        job.conversation = lines
+        job.generated_file_id = file_record.id
+        job.line_status = {}
+        job.stage = "tts"
+        await self._update(
+            job.id,
+            conversation=lines,
+            generated_file_id=file_record.id,
+            line_status={},
+            stage=job.stage
+        )
+
+    def _job_voices(self, job_id: int) -> dict[str, str]:
+        with session_scope() as db:
+            return GenerationJobVoiceRepository.get_voices(db, job_id)
+
+    def _create_file_record(self, job: GenerationJob, output_path: str):
+        with session_scope() as db:
+            # A regenerated file drops the audio records of its previous conversation
+            return GeneratedFileRepository.create_or_replace(
+                db=db,
+                file=GeneratedFileCreate(
+                    original_filename=job.original_filename,
+                    generated_filepath=output_path,
+                    grade_level=job.grade_level
+                )
+            )
+
+    def _record_audios(self, generated_file_id: int, audios: list[tuple[int, str]]) -> None:
+        with session_scope() as db:
+            GeneratedAudioRepository.bulk_create(db, generated_file_id, audios)
+
+    def _discard_early_lines(self, job_id: int) -> None:
+        # Audio started for a conversation that did not make it to the TTS stage
+        for task in self._early_lines.pop(job_id, {}).values():
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()
+
+    async def _synthesize_lines(self, job: GenerationJob) -> None:
+        output_dir = os.path.join(settings.OUTPUT_DIR, job.original_filename)
+        line_status = dict(job.line_status or {})
+        # Lines whose audio was started while the conversation was still being generated
+        early_lines = self._early_lines.pop(job.id, {})
+
+        async def synthesize(conversation: dict) -> None:
+            key = str(conversation["conversation_id"])
+            try:
+                early = early_lines.get(conversation["conversation_id"])
+                if early is not None:
+                    wav_path = await early
+                else:
+                    wav_path = await synthesize_line(conversation, output_dir, job.original_filename)
+                # Record the audio before the line is marked done, so its URL in the
+                # job's "audio" event resolves right away
+                await self._db(
+                    self._record_audios, job.generated_file_id, [(conversation["conversation_id"], wav_path)]
+                )
+                line_status[key] = {"status": "done"}
+            except Exception as e:
+                line_status[key] = {"status": "failed", "error": str(e)}
+            # Persist progress as each line finishes
+            await self._update(job.id, line_status=dict(line_status))
+
+        remaining = [
+            conversation for conversation in job.conversation
+            if line_status.get(str(conversation["conversation_id"]), {}).get("status") != "done"
+        ]
+        await asyncio.gather(*[synthesize(conversation) for conversation in remaining])
+
+        # Lines done in an earlier attempt may predate their audio record
+        audios = [
+            (conversation["conversation_id"], line_audio_path(conversation, output_dir, job.original_filename))
+            for conversation in job.conversation
+            if line_status.get(str(conversation["conversation_id"]), {}).get("status") == "done"
+        ]
+        await self._db(self._record_audios, job.generated_file_id, audios)
+
+        failed = [key for key, value in line_status.items() if value.get("status") == "failed"]
+        if failed:
+            raise RuntimeError(f"Audio generation failed for {len(failed)} line(s)")
+
+        job.stage = "stitch"
+        await self._update(job.id, stage=job.stage)
+
+    def _stitch(self, job: GenerationJob) -> None:
+        # Runs in a thread: NumPy concatenation and encoding are CPU bound
+        with session_scope() as db:
+            file_record = GeneratedFileRepository.get_by_generated_file_id(db, job.generated_file_id)
+            if stitch_generated_file(db, file_record) is None:
+                raise RuntimeError("Cannot stitch full conversation: some lines have no audio")
+
+
+def main(ready=None) -> None:
+    """
+    Run a job worker in the current process until SIGINT/SIGTERM.
+    ready (a multiprocessing.Event) is set once the worker's models are warm.
+    """
+    configure_logging()
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # Keeps a starting API from clearing the samples while this worker runs
+        setup_metrics_dir()
+    init_db()
+    worker = JobWorker(ready=ready)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, worker.stop)
+        await worker.run()
+
+    asyncio.run(run())
+
+
+_processes: list[mp.Process] = []
+_ready_events: list = []
+
+
+def start_job_workers(count: int | None = None) -> None:
+    """
+    Start job worker processes alongside the API (JOB_WORKERS, 0 to disable).
+    """
+    count = settings.JOB_WORKERS if count is None else count
+    ctx = mp.get_context("spawn")
+    for index in range(count):
+        ready = ctx.Event()
+        process = ctx.Process(target=main, args=(ready,), name=f"{module_name}-{index}", daemon=False)
+        process.start()
+        _processes.append(process)
+        _ready_events.append(ready)
+
+
+def job_workers_ready() -> tuple[int, int]:
+    """
+    (ready, total) job worker processes started by start_job_workers.
+    A worker counts as ready while it is alive and has warmed up its models.
+    """
+    ready = sum(
+        1 for process, event in zip(_processes, _ready_events)
+        if process.is_alive() and event.is_set()
+    )
+    return ready, len(_processes)
+
+
+def stop_job_workers(timeout: float | None = None) -> None:
+    """
+    Stop job worker processes started by start_job_workers.
+    Unfinished jobs are resumed by the next worker once their heartbeat goes stale.
+    """
+    timeout = settings.TTS_SHUTDOWN_TIMEOUT if timeout is None else timeout
+    for process in _processes:
+        if process.is_alive():
+            process.terminate()
+    for process in _processes:
+        process.join(timeout)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        mark_process_dead(process.pid)
+    _processes.clear()
+    _ready_events.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import re
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Words the canned responses fall back to when a prompt has none to offer
+DEFAULT_WORDS = [
+    "habitat", "predator", "curious", "observe", "camouflage",
+    "journey", "survive", "protect", "discover", "creature"
+]
+
+WORD_RE = re.compile(r"[A-Za-z][A-Za-z'-]{5,}")
+
+
+def _words_from(text: str, count: int) -> list[str]:
+    words = []
+    for word in WORD_RE.findall(text):
+        if word.lower() not in words:
+            words.append(word.lower())
+        if len(words) == count:
+            break
+    return words or DEFAULT_WORDS[:count]
+
+
+def _listed_words(prompt: str, marker: str) -> list[str] | None:
+    """Comma-separated words following marker on the same line, if present."""
+    position = prompt.find(marker)
+    if position < 0:
+        return None
+    line = prompt[position + len(marker):].splitlines()[0]
+    return [word.strip() for word in line.split(",") if word.strip()]
+
+
+def _conversation(words: list[str]) -> str:
+    lines = []
+    for index, word in enumerate(words or DEFAULT_WORDS):
+        speaker = "Student1" if index % 2 == 0 else "Student2"
+        lines.append({"speaker": speaker, "text": f"I think the word {word} fits what we read about today."})
+    while len(lines) < 4:
+        speaker = "Student1" if len(lines) % 2 == 0 else "Student2"
+        lines.append({"speaker": speaker, "text": "That is a good point, let us keep reading."})
+    return json.dumps({"conversation": lines})
+
+
+def canned_response(prompt: str) -> str:
+    """
+    Answer the application's prompts the way a well-behaved model would: word
+    lists for the word picking prompts, and a conversation using every requested
+    word for the conversation prompts.
+    """
+    missing = _listed_words(prompt, "have not been used yet:")
+    if missing is not None:
+        return _conversation(missing)
+    words = _listed_words(prompt, "Given these vocabulary words:")
+    if words is not None:
+        return _conversation(words)
+    if "Return ONLY a JSON object" in prompt:
+        return _conversation(DEFAULT_WORDS)
+    candidates = _listed_words(prompt, "Candidates:")
+    if candidates is not None:
+        return ", ".join(candidates[:10])
+    text = prompt.split("Text:", 1)[-1]
+    return ", ".join(_words_from(text, 15 if "List up to" in prompt else 10))
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """
+    Serves /api/generate (streaming and not) and /api/tags. Response tokens
+    are released one at a time every token_latency seconds after first_token_latency.
+    """
+
+    token_latency = 0.02
+    first_token_latency = 0.1
+    model = "llama2"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, data: dict) -> None:
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/api/tags":
+            self._send_json({"models": [{"name": self.model}]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/api/generate":
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        text = canned_response(request.get("prompt", ""))
+        # Split after whitespace and punctuation, roughly like model tokens
+        tokens = re.findall(r"\s*[^\s,{}\[\]\":]+[,{}\[\]\":]*|\s*[,{}\[\]\":]", text)
+
+        time.sleep(self.first_token_latency)
+        if not request.get("stream", True):
+            time.sleep(self.token_latency * len(tokens))
+            self._send_json({"model": self.model, "response": text, "done": True})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        for token in tokens:
+            line = json.dumps({"model": self.model, "response": token, "done": False}) + "\n"
+            self.wfile.write(line.encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.token_latency)
+        self.wfile.write((json.dumps({"model": self.model, "response": "", "done": True}) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+
+def start_fake_ollama(port: int = 0, token_latency_ms: float = 20, first_token_latency_ms: float = 100):
+    """
+    Start the fake Ollama server in a background thread.
+    Returns the server; its URL is http://127.0.0.1:<server.server_port>.
+    """
+    handler = type("ConfiguredFakeOllamaHandler", (FakeOllamaHandler,), {
+        "token_latency": token_latency_ms / 1000,
+        "first_token_latency": first_token_latency_ms / 1000
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="fake-ollama", daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Ollama API with canned responses.")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--token-latency-ms", type=float, default=20, help="Delay between response tokens")
+    parser.add_argument("--first-token-latency-ms", type=float, default=100, help="Delay before the first token")
+    args = parser.parse_args()
+
+    server = start_fake_ollama(args.port, args.token_latency_ms, args.first_token_latency_ms)
+    print(f"Fake Ollama listening on http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
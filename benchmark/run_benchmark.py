@@ -0,0 +1,469 @@
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime, timezone
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmark.fake_ollama import start_fake_ollama
+
+BASELINE_DIR = os.path.join(ROOT, "benchmark", "baselines")
+API = "/api"
+
+# Metrics compared against a baseline, and whether a higher value is better
+COMPARED = {
+    "upload.p50_ms": False,
+    "upload.p95_ms": False,
+    "job.p50_ms": False,
+    "job.p95_ms": False,
+    "job.p99_ms": False,
+    "read_conversation.p95_ms": False,
+    "read_audio.p95_ms": False,
+    "read_catalog.p95_ms": False,
+    "throughput.jobs_per_min": True,
+    "throughput.reads_per_s": True,
+    "peak_rss_mb": False,
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def process_tree_rss(pid: int) -> int | None:
+    """
+    Resident memory in bytes of a process and all its descendants (Linux /proc).
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    children: dict[int, list[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields resume after ")"
+                parent = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+class RssSampler:
+    """Samples the memory of the app's process tree and keeps the peak."""
+
+    def __init__(self, pid: int, interval: float = 0.2):
+        self.pid = pid
+        self.interval = interval
+        self.peak: int | None = None
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            rss = process_tree_rss(self.pid)
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+            self._stopping.wait(self.interval)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling; does nothing if the sampler was never started."""
+        self._stopping.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+def percentile(values: list[float], p: float) -> float | None:
+    """Percentile with linear interpolation between closest ranks."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize(latencies: list[float], errors: int) -> dict:
+    """Latency statistics in milliseconds."""
+    result = {"count": len(latencies), "errors": errors}
+    for name, p in (("p50_ms", 50), ("p95_ms", 95), ("p99_ms", 99)):
+        value = percentile(latencies, p)
+        result[name] = round(value * 1000, 1) if value is not None else None
+    result["mean_ms"] = round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None
+    result["max_ms"] = round(max(latencies) * 1000, 1) if latencies else None
+    return result
+
+
+def find_lessons(directory: str) -> list[str]:
+    lessons = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".md")
+    )
+    if not lessons:
+        raise SystemExit(f"No .md lessons found in {directory}")
+    return lessons
+
+
+def prepare_workdir() -> str:
+    """
+    Scratch directory the app runs in, so the database, caches and output of a
+    run never mix with the developer's. The model assets are linked in.
+    """
+    workdir = tempfile.mkdtemp(prefix="esl-ai-bench-")
+    os.symlink(os.path.join(ROOT, "chattts"), os.path.join(workdir, "chattts"))
+    return workdir
+
+
+def app_environment(args, ollama_url: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")])),
+        "OLLAMA_URL": ollama_url,
+        "DATABASE_URL": "sqlite:///./bench.db",
+        "LLM_CACHE_PATH": "./llm_cache.db",
+        "LLM_CACHE_ENABLED": "true" if args.cache else "false",
+        "TTS_CACHE_ENABLED": "true" if args.cache else "false",
+        "TTS_BACKEND": args.tts_backend,
+        "TTS_STUB_RTF": str(args.tts_rtf),
+        "JOB_POLL_INTERVAL": "0.1",
+        "LOG_LEVEL": "WARNING",
+    })
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    return env
+
+
+def start_app(workdir: str, port: int, env: dict) -> subprocess.Popen:
+    log = open(os.path.join(workdir, "server.log"), "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT
+    )
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 300) -> None:
+    """
+    Wait until the app reports its workers warm (/readyz).
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("The app exited during startup, see server.log in the work directory")
+        try:
+            if httpx.get(f"{base_url}/readyz", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit("The app did not start in time")
+
+
+def stop_app(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def generate_one(client: httpx.AsyncClient, lesson: str, name: str, job_timeout: float) -> tuple[float, float, int]:
+    """
+    Upload a lesson and wait for its job. Returns (upload seconds, seconds until
+    the job completed, generated file id).
+    """
+    with open(lesson, "rb") as f:
+        content = f.read()
+    start = time.perf_counter()
+    response = await client.post(f"{API}/generate-conversation", files={"file": (name, content, "text/markdown")})
+    response.raise_for_status()
+    uploaded = time.perf_counter()
+    body = response.json()
+    if not body.get("success"):
+        raise RuntimeError(body.get("message"))
+
+    deadline = start + job_timeout
+    while time.perf_counter() < deadline:
+        job = (await client.get(f"{API}/jobs/{body['job_id']}")).json()
+        if job["status"] == "completed":
+            return uploaded - start, time.perf_counter() - start, job["generated_file_id"]
+        if job["status"] == "failed":
+            raise RuntimeError(job.get("error"))
+        await asyncio.sleep(0.05)
+    raise TimeoutError(f"Job {body['job_id']} did not finish in {job_timeout}s")
+
+
+async def run_generation(client: httpx.AsyncClient, lessons: list[str], count: int, concurrency: int,
+                         job_timeout: float, name_prefix: str) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    uploads, jobs, file_ids = [], [], []
+    errors = 0
+
+    async def one(index: int) -> None:
+        nonlocal errors
+        lesson = lessons[index % len(lessons)]
+        # Unique names so every upload is a new conversation; the grade prefix is kept
+        stem = os.path.splitext(os.path.basename(lesson))[0]
+        async with semaphore:
+            try:
+                upload, job, file_id = await generate_one(client, lesson, f"{stem}-{name_prefix}{index}.md", job_timeout)
+            except Exception as e:
+                errors += 1
+                print(f"  generation {index} failed: {e}")
+                return
+        uploads.append(upload)
+        jobs.append(job)
+        file_ids.append(file_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(index) for index in range(count)])
+    return {
+        "elapsed": time.perf_counter() - start,
+        "uploads": uploads,
+        "jobs": jobs,
+        "file_ids": file_ids,
+        "errors": errors
+    }
+
+
+async def run_reads(client: httpx.AsyncClient, file_ids: list[int], count: int, concurrency: int) -> dict:
+    """
+    Mix of read traffic over the generated conversations: conversation JSON,
+    line audio and the catalog.
+    """
+    requests = []
+    for index in range(count):
+        file_id = file_ids[index % len(file_ids)]
+        kind = ("read_conversation", "read_audio", "read_catalog")[index % 3]
+        path = {
+            "read_conversation": f"{API}/conversation/{file_id}",
+            "read_audio": f"{API}/conversation/{file_id}/audio/1",
+            "read_catalog": f"{API}/conversations?limit=20",
+        }[kind]
+        requests.append((kind, path))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: dict[str, list[float]] = {kind: [] for kind, _ in requests}
+    errors: dict[str, int] = {kind: 0 for kind in latencies}
+
+    async def one(kind: str, path: str) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                await response.aread()
+                response.raise_for_status()
+            except Exception:
+                errors[kind] += 1
+                return
+            latencies[kind].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(kind, path) for kind, path in requests])
+    return {"elapsed": time.perf_counter() - start, "latencies": latencies, "errors": errors}
+
+
+async def drive(base_url: str, args, lessons: list[str]) -> dict:
+    limits = httpx.Limits(max_connections=max(args.concurrency, args.read_concurrency) + 5)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        if args.warmup:
+            print(f"Warming up with {args.warmup} generation(s)...")
+            await run_generation(client, lessons, args.warmup, args.concurrency, args.job_timeout, "warmup")
+
+        print(f"Generating {args.requests} conversation(s) at concurrency {args.concurrency}...")
+        generation = await run_generation(client, lessons, args.requests, args.concurrency, args.job_timeout, "bench")
+
+        reads = None
+        if args.reads and generation["file_ids"]:
+            print(f"Sending {args.reads} read request(s) at concurrency {args.read_concurrency}...")
+            reads = await run_reads(client, generation["file_ids"], args.reads, args.read_concurrency)
+    return {"generation": generation, "reads": reads}
+
+
+def build_report(args, runs: dict, peak_rss: int | None) -> dict:
+    generation = runs["generation"]
+    reads = runs["reads"]
+    results = {
+        "upload": summarize(generation["uploads"], generation["errors"]),
+        "job": summarize(generation["jobs"], generation["errors"]),
+    }
+    throughput = {
+        "jobs_per_min": round(len(generation["jobs"]) / (generation["elapsed"] / 60), 2) if generation["elapsed"] else None
+    }
+    if reads is not None:
+        for kind, latencies in reads["latencies"].items():
+            results[kind] = summarize(latencies, reads["errors"][kind])
+        total = sum(len(latencies) for latencies in reads["latencies"].values())
+        throughput["reads_per_s"] = round(total / reads["elapsed"], 1) if reads["elapsed"] else None
+    results["throughput"] = throughput
+    results["peak_rss_mb"] = round(peak_rss / (1024 * 1024), 1) if peak_rss is not None else None
+
+    return {
+        "name": args.name,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "reads": args.reads,
+            "read_concurrency": args.read_concurrency,
+            "token_latency_ms": args.token_latency_ms,
+            "first_token_latency_ms": args.first_token_latency_ms,
+            "tts_backend": args.tts_backend,
+            "tts_rtf": args.tts_rtf,
+            "cache": args.cache,
+            "env": args.env,
+        },
+        "results": results,
+    }
+
+
+def lookup(results: dict, key: str):
+    value = results
+    for part in key.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def print_report(report: dict) -> None:
+    results = report["results"]
+    print("\nResults")
+    print(f"  {'operation':<20}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, stats in results.items():
+        if not isinstance(stats, dict) or "count" not in stats:
+            continue
+        cells = [stats.get(key) for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")]
+        print(f"  {name:<20}{stats['count']:>7}{stats['errors']:>8}" + "".join(
+            f"{cell if cell is not None else '-':>10}" for cell in cells
+        ))
+    for key, value in results["throughput"].items():
+        print(f"  {key}: {value}")
+    print(f"  peak RSS (app and workers): {results['peak_rss_mb']} MB")
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Print the change of every compared metric and return the regressions
+    (worse than the baseline by more than threshold percent).
+    """
+    regressions = []
+    print(f"\nCompared with baseline '{baseline['name']}' ({baseline['created_at']})")
+    for key, higher_is_better in COMPARED.items():
+        current = lookup(report["results"], key)
+        previous = lookup(baseline["results"], key)
+        if current is None or not previous:
+            continue
+        change = (current - previous) / previous * 100
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(f"  {key:<28}{previous:>12}{current:>12}{change:>+9.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the API against a fake Ollama server and a stub (or real) TTS backend."
+    )
+    parser.add_argument("--lessons", default=os.path.join(ROOT, "sample"), help="Directory of .md lessons to upload")
+    parser.add_argument("-n", "--requests", type=int, default=10, help="Conversations to generate")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Concurrent uploads")
+    parser.add_argument("--reads", type=int, default=300, help="Read requests after generation (0 to skip)")
+    parser.add_argument("--read-concurrency", type=int, default=8,
+                        help="Concurrent reads; keep it within the database connection pool (5 + 10 overflow)")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured generations before the run")
+    parser.add_argument("--job-timeout", type=float, default=600)
+    parser.add_argument("--token-latency-ms", type=float, default=20, help="Fake Ollama delay between tokens")
+    parser.add_argument("--first-token-latency-ms", type=float, default=100, help="Fake Ollama delay before the first token")
+    parser.add_argument("--tts-backend", choices=("stub", "chattts"), default="stub")
+    parser.add_argument("--tts-rtf", type=float, default=0.3, help="Real-time factor of the stub TTS backend")
+    parser.add_argument("--cache", action="store_true", help="Keep the LLM and TTS caches enabled")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra app setting (repeatable)")
+    parser.add_argument("--name", default="run", help="Name of this run")
+    parser.add_argument("--save-baseline", action="store_true", help="Save the results as a baseline named --name")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare with a saved baseline; exits with 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=10, help="Allowed regression in percent")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    lessons = find_lessons(args.lessons)
+    fake_ollama = start_fake_ollama(0, args.token_latency_ms, args.first_token_latency_ms)
+    workdir = prepare_workdir()
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    print(f"Work directory: {workdir}")
+
+    try:
+        process = start_app(workdir, port, app_environment(args, f"http://127.0.0.1:{fake_ollama.server_port}"))
+        try:
+            sampler = RssSampler(process.pid)
+            try:
+                wait_until_ready(base_url, process)
+                sampler.start()
+                runs = asyncio.run(drive(base_url, args, lessons))
+            finally:
+                sampler.stop()
+        finally:
+            stop_app(process)
+    finally:
+        fake_ollama.shutdown()
+
+    report = build_report(args, runs, sampler.peak)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.name}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {path}")
+    if args.compare:
+        path = os.path.join(BASELINE_DIR, f"{args.compare}.json")
+        with open(path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+import soundfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmark.run_benchmark import percentile
+
+# Conversation-style lines of typical length, synthesized as one batch per repeat
+SENTENCES = [
+    "Hello, my name is Anna. Nice to meet you!",
+    "Could you tell me the way to the train station, please?",
+    "I usually have breakfast at seven o'clock before I go to school.",
+    "What did you do last weekend? I went hiking with my family.",
+]
+
+
+def run_profile(args) -> dict:
+    """
+    Load ChatTTS under one acceleration profile in this process, warm it up and
+    synthesize the sentences --repeats times. Runs in a fresh process per
+    profile, because thread counts, quantization and compilation are process-wide.
+    """
+    from app.services.tts_acceleration import peak_rss_bytes, thread_counts
+    from app.services.tts_backend import create_tts_service
+
+    start = time.perf_counter()
+    service = create_tts_service(acceleration=args.run_profile)
+    load_seconds = time.perf_counter() - start
+    load_rss = peak_rss_bytes()
+    warmup_seconds = service.warmUp()
+
+    sample_dir = os.path.join(args.samples, args.run_profile)
+    file_paths = [os.path.join(sample_dir, f"line{index}.wav") for index in range(len(SENTENCES))]
+    rtfs = []
+    synthesis_seconds = audio_seconds = 0.0
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        paths = service.generateSound(SENTENCES, filePaths=file_paths)
+        seconds = time.perf_counter() - start
+        if len(paths) != len(SENTENCES):
+            raise RuntimeError(f"Synthesized {len(paths)} of {len(SENTENCES)} lines")
+        audio = sum(soundfile.info(path).duration for path in paths)
+        rtfs.append(seconds / audio)
+        synthesis_seconds += seconds
+        audio_seconds += audio
+
+    intra, inter = thread_counts()
+    return {
+        "profile": args.run_profile,
+        "threads": f"{intra}/{inter}" if service.acceleration.tune_threads else "torch default",
+        "load_s": round(load_seconds, 2),
+        "warmup_s": round(warmup_seconds, 2),
+        "rtf": round(synthesis_seconds / audio_seconds, 3),
+        "rtf_p50": round(percentile(rtfs, 50), 3),
+        "rtf_max": round(max(rtfs), 3),
+        "audio_s": round(audio_seconds, 1),
+        "load_rss_mb": round(load_rss / 2**20),
+        "peak_rss_mb": round(peak_rss_bytes() / 2**20),
+        "samples": sample_dir,
+    }
+
+
+def measure(profile: str, args) -> dict:
+    """Run one profile in a child process and return its results."""
+    env = dict(os.environ)
+    env.update({
+        "TTS_ACCELERATION": profile,
+        # Every repeat has to synthesize, not hit the audio cache
+        "TTS_CACHE_ENABLED": "false",
+        "LOG_LEVEL": env.get("LOG_LEVEL", "WARNING"),
+    })
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    command = [
+        sys.executable, os.path.abspath(__file__), "--run-profile", profile,
+        "--repeats", str(args.repeats), "--samples", args.samples
+    ]
+    result = subprocess.run(command, cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        return {"profile": profile, "error": f"exited with {result.returncode}"}
+    # The results are the last line; anything before it is library output
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def print_report(results: list[dict]) -> None:
+    baseline = next((result["rtf"] for result in results if result["profile"] == "default" and "rtf" in result), None)
+    print(f"\n{'profile':<15}{'threads':>14}{'load s':>9}{'warm-up s':>11}{'RTF':>8}{'RTF p50':>9}"
+          f"{'RTF max':>9}{'speed-up':>10}{'load MB':>9}{'peak MB':>9}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['profile']:<15}  {result['error']}")
+            continue
+        speedup = f"{baseline / result['rtf']:.2f}x" if baseline and result["rtf"] else "-"
+        print(f"{result['profile']:<15}{result['threads']:>14}{result['load_s']:>9}{result['warmup_s']:>11}"
+              f"{result['rtf']:>8}{result['rtf_p50']:>9}{result['rtf_max']:>9}{speedup:>10}"
+              f"{result['load_rss_mb']:>9}{result['peak_rss_mb']:>9}")
+    print("\nListen to the samples of each profile before switching: int8 may change the voice.")
+    for result in results:
+        if "samples" in result:
+            print(f"  {result['profile']}: {result['samples']}")
+
+
+def main():
+    from app.services.tts_acceleration import PROFILES
+
+    parser = argparse.ArgumentParser(
+        description="Compare the TTS acceleration profiles: real-time factor, load time and memory per profile."
+    )
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="Comma-separated profiles to measure")
+    parser.add_argument("--repeats", type=int, default=3, help="Measured batches per profile (after one warm-up)")
+    parser.add_argument("--samples", default=os.path.join(ROOT, "output", "tts_profiles"),
+                        help="Directory the synthesized samples are kept in, one subdirectory per profile")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra app setting (repeatable)")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    parser.add_argument("--run-profile", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.samples = os.path.abspath(args.samples)
+
+    if args.run_profile:
+        print(json.dumps(run_profile(args)))
+        return
+
+    profiles = [name.strip() for name in args.profiles.split(",") if name.strip()]
+    unknown = [name for name in profiles if name not in PROFILES]
+    if unknown:
+        raise SystemExit(f"Unknown profile(s): {', '.join(unknown)}. Available: {', '.join(PROFILES)}")
+
+    results = []
+    for profile in profiles:
+        print(f"Measuring {profile}...", flush=True)
+        results.append(measure(profile, args))
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import os
+import sys
+import json
+import time
+import argparse
+import soundfile
+
+from app.core.config import settings
+from app.core.logging_config import configure_logging
+from app.db.session import SessionLocal, init_db
+from app.db.repository import GeneratedFileRepository, GeneratedAudioRepository, GenerationJobRepository
+from app.utils.file_processing import extract_grade_from_filename
+from app.workers.job_worker import start_job_workers, stop_job_workers
+
+
+def find_lessons(directory: str) -> list[str]:
+    """Find all Markdown lessons under a directory, in a stable order."""
+    lessons = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith(".md"):
+                lessons.append(os.path.join(root, name))
+    return sorted(lessons)
+
+
+def finished_audio(db, original_filename: str) -> list[str] | None:
+    """
+    Get the line audio paths of an already generated lesson, or None if its
+    conversation or any of its line audio is missing.
+    """
+    file_record = GeneratedFileRepository.get_by_assignment_name(db, original_filename)
+    if not file_record or not os.path.exists(file_record.generated_filepath):
+        return None
+
+    with open(file_record.generated_filepath, "r", encoding="utf-8") as f:
+        conversations = json.load(f).get("conversations", [])
+    # Newest record of each line, should an older one still be around
+    records = sorted(GeneratedAudioRepository.get_by_generated_file_id(db, file_record.id), key=lambda record: record.id)
+    audio_paths = {
+        record.conversation_id: record.generated_filepath
+        for record in records
+        if os.path.exists(record.generated_filepath)
+    }
+    paths = [audio_paths.get(conversation.get("conversation_id")) for conversation in conversations]
+    if not paths or None in paths:
+        return None
+    return paths
+
+
+def audio_seconds(paths: list[str]) -> float:
+    """Total duration of audio files in seconds."""
+    total = 0.0
+    for path in paths:
+        try:
+            total += soundfile.info(path).duration
+        except RuntimeError:
+            pass
+    return total
+
+
+def queue_lessons(lessons: list[str], fresh: bool) -> tuple[dict[int, str], int]:
+    """
+    Create a generation job for every lesson that is not finished yet.
+
+    Lessons with an unfinished job from an interrupted run keep that job, which
+    resumes at the stage it had reached (once its old heartbeat goes stale).
+    Returns the job ids to wait for (mapped to their lesson) and the number of
+    skipped lessons.
+    """
+    jobs = {}
+    skipped = 0
+    with SessionLocal() as db:
+        for path in lessons:
+            filename = os.path.basename(path)
+            original_filename = os.path.splitext(filename)[0]
+            if not fresh and finished_audio(db, original_filename) is not None:
+                skipped += 1
+                continue
+
+            job = GenerationJobRepository.get_unfinished_by_filename(db, original_filename)
+            if job is None:
+                with open(path, "r", encoding="utf-8") as f:
+                    markdown_text = f.read()
+                job = GenerationJobRepository.create(
+                    db=db,
+                    original_filename=original_filename,
+                    grade_level=extract_grade_from_filename(filename),
+                    markdown_text=markdown_text,
+                    bypass_cache=fresh
+                )
+            jobs[job.id] = original_filename
+    return jobs, skipped
+
+
+def wait_for_jobs(jobs: dict[int, str], completed: list[str], failed: list[str]) -> None:
+    """
+    Poll the jobs until all of them completed or failed, printing progress and
+    collecting the completed and the failed lessons.
+    """
+    pending = dict(jobs)
+    while pending:
+        time.sleep(settings.JOB_POLL_INTERVAL)
+        with SessionLocal() as db:
+            for job_id in list(pending):
+                job = GenerationJobRepository.get_by_id(db, job_id)
+                if job.status == "completed":
+                    completed.append(pending.pop(job_id))
+                    print(f"[{len(completed) + len(failed)}/{len(jobs)}] {job.original_filename}: done")
+                elif job.status == "failed":
+                    failed.append(pending.pop(job_id))
+                    print(f"[{len(completed) + len(failed)}/{len(jobs)}] {job.original_filename}: failed ({job.error})")
+
+
+def print_summary(completed: list[str], failed: list[str], skipped: int, elapsed: float) -> None:
+    """Print how many lessons were processed and the throughput of this run."""
+    with SessionLocal() as db:
+        paths = []
+        for original_filename in completed:
+            paths.extend(finished_audio(db, original_filename) or [])
+    seconds = audio_seconds(paths)
+
+    print("\nSummary")
+    print(f"  Completed: {len(completed)}, failed: {len(failed)}, skipped (already done): {skipped}")
+    print(f"  Wall-clock time: {elapsed:.1f}s")
+    if elapsed > 0:
+        print(f"  Throughput: {len(completed) / (elapsed / 60):.2f} files/min")
+        print(f"  Audio generated: {seconds:.1f}s ({seconds / elapsed:.2f} audio seconds per wall-clock second)")
+    for original_filename in failed:
+        print(f"  Failed: {original_filename}")
+
+
+def main():
+    """Generate conversations and audio for every lesson in a directory."""
+    parser = argparse.ArgumentParser(
+        description="Pre-generate conversations and audio for a directory of Markdown lessons. "
+                    "Interrupted runs resume where they stopped; finished lessons are skipped."
+    )
+    parser.add_argument("directory", nargs="?", default="sample", help="Directory of .md lessons (default: sample)")
+    parser.add_argument("-w", "--workers", type=int, default=max(1, settings.JOB_WORKERS),
+                        help="Number of job worker processes (default: JOB_WORKERS)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Regenerate finished lessons and skip cached LLM responses")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"Error: {args.directory} is not a directory.")
+        sys.exit(1)
+
+    configure_logging()
+    init_db()
+    lessons = find_lessons(args.directory)
+    jobs, skipped = queue_lessons(lessons, args.fresh)
+    print(f"Found {len(lessons)} lesson(s): {len(jobs)} to generate, {skipped} already done")
+    if not jobs:
+        return
+
+    start = time.monotonic()
+    completed, failed = [], []
+    start_job_workers(args.workers)
+    try:
+        wait_for_jobs(jobs, completed, failed)
+    except KeyboardInterrupt:
+        print("\nInterrupted; run again to resume.")
+    finally:
+        stop_job_workers()
+
+    print_summary(completed, failed, skipped, time.monotonic() - start)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
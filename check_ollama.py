@@ -7,17 +7,23 @@ from dotenv import load_dotenv
 load_dotenv()
 
 def check_ollama():
-    """Check if Ollama is running and the model is available."""
+    """Check if every Ollama host (OLLAMA_URLS, or OLLAMA_URL) is running and has the model."""
     # Get the model name from environment variables
     model = os.getenv("OLLAMA_MODEL", "llama2")
-    ollama_url = os.getenv("OLLAMA_URL", "http://localhost:11434")
+    ollama_urls = [url.strip() for url in os.getenv("OLLAMA_URLS", "").split(",") if url.strip()]
+    ollama_urls = ollama_urls or [os.getenv("OLLAMA_URL", "http://localhost:11434")]
     
+    results = [check_ollama_host(ollama_url.rstrip("/"), model) for ollama_url in ollama_urls]
+    return all(results)
+
+def check_ollama_host(ollama_url, model):
+    """Check if an Ollama host is running and the model is available."""
     # Ollama API URL
     url = f"{ollama_url}/api/tags"
     
     try:
         # Send a request to the Ollama API
-        print(f"Checking if Ollama is running...")
+        print(f"Checking if Ollama is running at {ollama_url}...")
         response = requests.get(url)
         
         # Check if the request was successful
@@ -0,0 +1,25 @@
+import os
+import tempfile
+
+# The app reads its settings at import: point its databases at a scratch directory first
+TEST_DIR = tempfile.mkdtemp(prefix="esl_ai_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+os.environ["LLM_CACHE_PATH"] = os.path.join(TEST_DIR, "llm_cache.db")
+os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+import pytest
+
+from app.db.base import Base
+from app.db.session import SessionLocal, engine, init_db
+
+
+@pytest.fixture
+def db():
+    """Session on empty tables, dropped again after the test."""
+    init_db()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
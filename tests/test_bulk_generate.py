@@ -0,0 +1,45 @@
+import json
+import os
+
+from app.db.models import GeneratedAudio
+from app.utils.audio_generator import line_audio_path
+from app.workers.job_worker import JobWorker
+from bulk_generate import finished_audio
+
+
+def generate(worker: JobWorker, output_dir: str, speakers: list[str]) -> int:
+    """Record a conversation and its line audio the way a job does."""
+    lines = [
+        {"speaker": speaker, "text": f"Line {index}", "conversation_id": index}
+        for index, speaker in enumerate(speakers, start=1)
+    ]
+    output_path = os.path.join(output_dir, "lesson_generated.json")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({"words": [], "conversations": lines}, f)
+
+    class Job:
+        original_filename = "lesson"
+        grade_level = 3
+
+    file_record = worker._create_file_record(Job, output_path)
+    audios = []
+    for line in lines:
+        path = line_audio_path(line, output_dir, "lesson")
+        open(path, "wb").close()
+        audios.append((line["conversation_id"], path))
+    worker._record_audios(file_record.id, audios)
+    return file_record.id
+
+
+def test_fresh_rerun_leaves_one_audio_record_per_line(db, tmp_path):
+    worker = JobWorker(worker_id="test")
+    file_id = generate(worker, str(tmp_path), ["Student1", "Student2"])
+    # A --fresh rerun regenerates the lesson; the first line changes speaker
+    assert generate(worker, str(tmp_path), ["Teacher", "Student2", "Student1"]) == file_id
+
+    records = db.query(GeneratedAudio).filter(GeneratedAudio.generated_file_id == file_id).all()
+    assert sorted(record.conversation_id for record in records) == [1, 2, 3]
+    assert finished_audio(db, "lesson") == [
+        os.path.join(str(tmp_path), name)
+        for name in ("lesson_1_Teacher_0.wav", "lesson_2_Student2_0.wav", "lesson_3_Student1_0.wav")
+    ]
@@ -0,0 +1,100 @@
+import json
+import os
+
+from app.services import llm_cache
+from app.services.conversation_cache import ConversationResponseCache
+from app.services.llm_cache import LLMResponseCache
+from app.services.tts_cache import TTSAudioCache
+
+
+class FileRecord:
+    def __init__(self, id: int, path: str):
+        self.id = id
+        self.generated_filepath = path
+
+
+def write_conversation(path, text: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"conversations": [{"speaker": "A", "text": text, "conversation_id": 1}]}, f)
+
+
+def test_llm_cache_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = LLMResponseCache(path=str(tmp_path / "llm.db"), max_memory_entries=2, max_disk_entries=10, ttl=60)
+    cache.set("a", ["alpha"])
+    cache.set("b", ["beta"])
+    cache.get("a")
+    cache.set("c", ["gamma"])
+
+    assert list(cache._memory) == ["a", "c"]
+    # Evicted from memory only; the disk tier still has it
+    assert cache.get("b") == ["beta"]
+    assert cache.disk_hits == 1
+
+
+def test_llm_cache_disk_tier_is_bounded(tmp_path):
+    cache = LLMResponseCache(path=str(tmp_path / "llm.db"), max_memory_entries=0, max_disk_entries=2, ttl=60)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+    assert cache.get("a") is None
+    assert cache.get("b") == "b"
+    assert cache.get("c") == "c"
+
+
+def test_llm_cache_entries_expire(tmp_path, monkeypatch):
+    cache = LLMResponseCache(path=str(tmp_path / "llm.db"), ttl=60)
+    cache.set("a", {"words": ["alpha"]})
+    assert cache.get("a") == {"words": ["alpha"]}
+
+    now = llm_cache.time.time()
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now + 120)
+    assert cache.get("a") is None
+    # Expired entries are gone from both tiers, not just hidden
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now)
+    assert cache.get("a") is None
+
+
+def test_llm_cache_returns_copies(tmp_path):
+    cache = LLMResponseCache(path=str(tmp_path / "llm.db"))
+    cache.set("a", ["alpha"])
+    cache.get("a").append("mutated")
+    assert cache.get("a") == ["alpha"]
+
+
+def test_conversation_cache_reloads_changed_files_and_evicts_lru(tmp_path):
+    cache = ConversationResponseCache(max_entries=2)
+    records = []
+    for index in range(3):
+        path = tmp_path / f"lesson{index}.json"
+        write_conversation(path, f"Hello {index}")
+        records.append(FileRecord(index, str(path)))
+
+    first = cache.get(records[0])
+    assert cache.get(records[0]) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # A rewritten file (new size) is loaded again
+    write_conversation(records[0].generated_filepath, "Hello again, zero")
+    reloaded = cache.get(records[0])
+    assert reloaded is not first
+    assert reloaded.conversations[0]["text"] == "Hello again, zero"
+    assert reloaded.etag != first.etag
+
+    cache.get(records[1])
+    cache.get(records[0])
+    cache.get(records[2])
+    assert list(cache._entries) == [0, 2]
+
+
+def test_tts_cache_evicts_least_recently_used_bytes(tmp_path):
+    cache = TTSAudioCache(directory=str(tmp_path / "cache"), max_bytes=250)
+    for name in ("a", "b", "c"):
+        source = tmp_path / f"{name}.wav"
+        source.write_bytes(b"x" * 100)
+        cache.store(name, str(source))
+        if name == "b":
+            # Touch "a" so "b" is the least recently used entry when "c" arrives
+            assert cache.fetch("a", str(tmp_path / "out" / "a.wav"))
+
+    assert not cache.fetch("b", str(tmp_path / "out" / "b.wav"))
+    assert cache.fetch("c", str(tmp_path / "out" / "c.wav"))
+    assert sorted(name for name in os.listdir(tmp_path / "cache") if name.endswith(".wav")) == ["a.wav", "c.wav"]
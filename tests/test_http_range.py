@@ -0,0 +1,56 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.utils.http_range import range_file_response
+
+DATA = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "audio.wav"
+    path.write_bytes(DATA)
+    app = FastAPI()
+
+    @app.get("/audio")
+    def audio(request: Request):
+        return range_file_response(request, str(path), "audio/wav")
+
+    return TestClient(app)
+
+
+def test_without_range_the_whole_file_is_sent(client):
+    response = client.get("/audio")
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["accept-ranges"] == "bytes"
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=100-", 100, len(DATA) - 1),
+    ("bytes=-24", len(DATA) - 24, len(DATA) - 1),
+    ("bytes=1000-5000", 1000, len(DATA) - 1),
+    ("bytes=-5000", 0, len(DATA) - 1),
+])
+def test_single_ranges(client, header, start, end):
+    response = client.get("/audio", headers={"Range": header})
+    assert response.status_code == 206
+    assert response.content == DATA[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(DATA)}"
+    assert response.headers["content-length"] == str(end - start + 1)
+
+
+@pytest.mark.parametrize("header", ["bytes=1024-", "bytes=5000-6000", "bytes=20-10"])
+def test_unsatisfiable_ranges(client, header):
+    response = client.get("/audio", headers={"Range": header})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(DATA)}"
+
+
+@pytest.mark.parametrize("header", ["bytes=0-1,5-6", "bytes=-", "items=0-10", "bytes=a-b"])
+def test_malformed_or_multiple_ranges_send_the_whole_file(client, header):
+    response = client.get("/audio", headers={"Range": header})
+    assert response.status_code == 200
+    assert response.content == DATA
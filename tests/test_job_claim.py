@@ -0,0 +1,61 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from app.db.models import GenerationJob
+from app.db.repository import GenerationJobRepository
+from app.db.session import SessionLocal
+
+
+def queue_jobs(db, count: int) -> list[int]:
+    return [GenerationJobRepository.create(db, f"lesson{index}", 3, "text").id for index in range(count)]
+
+
+def test_concurrent_workers_claim_each_job_once(db):
+    job_ids = queue_jobs(db, 20)
+    claimed = []
+    claimed_lock = threading.Lock()
+    start = threading.Barrier(4)
+
+    def worker(worker_id: str) -> None:
+        start.wait()
+        with SessionLocal() as session:
+            while True:
+                job = GenerationJobRepository.claim_next(session, worker_id, stale_after=60)
+                if job is None:
+                    # A lost race returns None as well; stop only once nothing is queued
+                    if not session.query(GenerationJob).filter(GenerationJob.status == "queued").count():
+                        return
+                    continue
+                with claimed_lock:
+                    claimed.append(job.id)
+
+    threads = [threading.Thread(target=worker, args=(f"worker{index}",)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == job_ids
+    db.expire_all()
+    jobs = db.query(GenerationJob).all()
+    assert all(job.status == "running" and job.attempts == 1 for job in jobs)
+
+
+def test_claim_takes_over_jobs_with_stale_heartbeats_only(db):
+    stale_id, alive_id = queue_jobs(db, 2)
+    now = datetime.now(timezone.utc)
+    GenerationJobRepository.update(db, stale_id, status="running", worker_id="gone", heartbeat_at=now - timedelta(minutes=5))
+    GenerationJobRepository.update(db, alive_id, status="running", worker_id="busy", heartbeat_at=now)
+
+    job = GenerationJobRepository.claim_next(db, "new", stale_after=60)
+    assert job.id == stale_id
+    assert job.worker_id == "new"
+    assert job.attempts == 1
+    assert GenerationJobRepository.claim_next(db, "new", stale_after=60) is None
+
+
+def test_claim_takes_the_oldest_queued_job_first(db):
+    first, second = queue_jobs(db, 2)
+    assert GenerationJobRepository.claim_next(db, "worker", stale_after=60).id == first
+    assert GenerationJobRepository.claim_next(db, "worker", stale_after=60).id == second
+    assert GenerationJobRepository.claim_next(db, "worker", stale_after=60) is None
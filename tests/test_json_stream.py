@@ -0,0 +1,57 @@
+import json
+
+from app.utils.json_stream import ConversationStreamParser
+
+CONVERSATION = {
+    "conversation": [
+        {"speaker": "Student1", "text": "Do you like {curly} braces?"},
+        {"speaker": "Student2", "text": "Only \"quoted\" ones, and [brackets]."},
+        {"speaker": "Student1", "text": "Me too!"}
+    ]
+}
+
+
+def test_lines_are_returned_as_their_objects_close():
+    document = json.dumps(CONVERSATION)
+    parser = ConversationStreamParser()
+    completed = []
+    for char in document:
+        completed.append(len(parser.feed(char)))
+
+    assert parser.lines == CONVERSATION["conversation"]
+    assert parser.complete
+    assert not parser.errors
+    # Each line is available right after its own closing brace, before the rest arrives
+    first_close = document.index("},") + 1
+    assert completed[first_close - 1] == 1
+    assert sum(completed[:first_close - 1]) == 0
+
+
+def test_top_level_array_and_leading_text():
+    parser = ConversationStreamParser()
+    lines = parser.feed('Sure! Here it is: [{"speaker": "A", "text": "Hi"}, ')
+    lines += parser.feed('{"speaker": "B", "text": "Hello"}]')
+    assert lines == [{"speaker": "A", "text": "Hi"}, {"speaker": "B", "text": "Hello"}]
+    assert parser.complete
+
+
+def test_an_invalid_line_is_skipped_without_losing_the_others():
+    parser = ConversationStreamParser()
+    parser.feed('{"conversation": [{"speaker": "A", "text": "Hi"}, {"speaker": "B", "text": ""}, ')
+    parser.feed('{"speaker": "A", "text": "Bye"}]}')
+    assert [line["text"] for line in parser.lines] == ["Hi", "Bye"]
+    assert len(parser.errors) == 1
+
+
+def test_nested_objects_inside_a_line_do_not_end_it():
+    parser = ConversationStreamParser()
+    parser.feed('{"conversation": [{"speaker": "A", "text": "Hi", "extra": {"mood": "happy"}}]}')
+    assert parser.lines == [{"speaker": "A", "text": "Hi"}]
+
+
+def test_incomplete_document():
+    parser = ConversationStreamParser()
+    assert parser.feed('{"conversation": [{"speaker": "A", "text": "Hi"}, {"speaker": "B", "te') == [
+        {"speaker": "A", "text": "Hi"}
+    ]
+    assert not parser.complete
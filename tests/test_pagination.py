@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.conversation import decode_cursor, encode_cursor
+from app.db.models import GeneratedFile
+from app.db.repository import GeneratedFileRepository
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm9waXBl", encode_cursor(datetime(2024, 1, 1), 1)[:-4]])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_keyset_pages_cover_every_file_once(db):
+    # Files created in the same second share created_at; the id breaks the tie
+    for index in range(7):
+        db.add(GeneratedFile(
+            original_filename=f"lesson{index}",
+            generated_filepath=f"output/lesson{index}.json",
+            grade_level=3 if index % 2 else 4,
+            created_at=datetime(2024, 1, 1 + index // 3)
+        ))
+    db.commit()
+
+    seen = []
+    after = None
+    while True:
+        page = GeneratedFileRepository.list_page(db, 3, after)
+        seen.extend(record.id for record in page)
+        if len(page) < 3:
+            break
+        after = decode_cursor(encode_cursor(page[-1].created_at, page[-1].id))
+
+    expected = [record.id for record in db.query(GeneratedFile).order_by(
+        GeneratedFile.created_at.desc(), GeneratedFile.id.desc()
+    )]
+    assert seen == expected
+    assert len(seen) == 7
+
+
+def test_pages_filter_by_grade_and_prefix(db):
+    for name, grade in (("3rd-animals", 3), ("3rd-plants", 3), ("4th-animals", 4)):
+        db.add(GeneratedFile(original_filename=name, generated_filepath=f"output/{name}.json", grade_level=grade))
+    db.commit()
+
+    assert {record.original_filename for record in GeneratedFileRepository.list_page(db, 10, grade_level=3)} == {
+        "3rd-animals", "3rd-plants"
+    }
+    assert [record.original_filename for record in GeneratedFileRepository.list_page(db, 10, prefix="4th")] == [
+        "4th-animals"
+    ]